@@ -10,3 +10,9 @@ python myenv/myproject/manage.py collectstatic --no-input
 
 # Run migrations from the nested project directory
 python myenv/myproject/manage.py migrate
+
+# Rebuild the reporting rollup so it matches the source tables
+python myenv/myproject/manage.py rebuild_daily_stats
+
+# Populate the patient ledger the first time it is deployed
+python myenv/myproject/manage.py rebuild_ledger --if-empty
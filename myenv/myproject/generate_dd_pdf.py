@@ -1,29 +1,15 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.platypus import Table, Paragraph, Spacer, PageBreak
+from myapp import pdf
 
 def generate_pdf():
     pdf_path = "C:\\Users\\duman\\Desktop\\HMS\\Data_Dictionary_Smart_HMS.pdf"
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
+    doc = pdf.document(pdf_path, bottom_margin=30)
     elements = []
     
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, 
-                                 textColor=colors.HexColor('#2c3e50'), spaceAfter=20, 
-                                 alignment=TA_CENTER, fontName='Helvetica-Bold')
-    
-    h1_style = ParagraphStyle('CustomH1', parent=styles['Heading2'], fontSize=18, 
-                              textColor=colors.HexColor('#34495e'), spaceBefore=20, spaceAfter=10, 
-                              fontName='Helvetica-Bold')
-
-    h2_style = ParagraphStyle('CustomH2', parent=styles['Heading3'], fontSize=14, 
-                              textColor=colors.HexColor('#7f8c8d'), spaceBefore=15, spaceAfter=5, 
-                              fontName='Helvetica-BoldOblique')
-                              
-    normal_style = styles['Normal']
+    title_style = pdf.STYLES['DocTitle']
+    h1_style = pdf.STYLES['DocH1']
+    h2_style = pdf.STYLES['DocH2']
 
     # --- Content Definitions ---
     
@@ -263,21 +249,8 @@ def generate_pdf():
             elements.append(Spacer(1, 5))
             
             # Create Table
-            t = Table(table_info['data'], colWidths=[1.2*inch, 1.0*inch, 0.8*inch, 1.5*inch, 2.5*inch])
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2980b9')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ecf0f1')),
-                ('GRID', (0, 0), (-1, -1), 1, colors.white),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#ecf0f1')]),
-            ]))
+            t = Table(table_info['data'], colWidths=[1.2*inch, 1.0*inch, 0.8*inch, 1.5*inch, 2.5*inch],
+                      style=pdf.DATA_DICTIONARY_TABLE)
             
             elements.append(t)
             elements.append(Spacer(1, 15))
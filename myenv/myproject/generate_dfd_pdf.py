@@ -1,11 +1,9 @@
-from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
+from reportlab.platypus import Table, Paragraph, Spacer, PageBreak
 from reportlab.graphics.shapes import Drawing, Circle, Rect, String, Line, Polygon
 from reportlab.graphics import renderPDF
+from myapp import pdf
 
 def draw_context_diagram():
     """
@@ -50,17 +48,12 @@ def draw_context_diagram():
 
 def generate_dfd_pdf():
     pdf_path = "C:\\Users\\duman\\Desktop\\HMS\\DFD_Level_0_1_Smart_HMS.pdf"
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
+    doc = pdf.document(pdf_path, bottom_margin=30)
     elements = []
     
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=20, 
-                                 textColor=colors.HexColor('#2c3e50'), spaceAfter=20, 
-                                 alignment=TA_CENTER, fontName='Helvetica-Bold')
-    
-    h1_style = ParagraphStyle('CustomH1', parent=styles['Heading2'], fontSize=16, 
-                              textColor=colors.HexColor('#34495e'), spaceBefore=15, spaceAfter=10, 
-                              fontName='Helvetica-Bold')
+    styles = pdf.STYLES
+    title_style = styles['ReportTitle']
+    h1_style = styles['DiagramH1']
 
     # --- Title Page & Level 0 ---
     elements.append(Paragraph("Data Flow Diagrams (DFD)", title_style))
@@ -157,17 +150,7 @@ def generate_dfd_pdf():
             Paragraph(p['stores'], styles['Normal'])
         ])
         
-    t = Table(data, colWidths=[0.5*inch, 1.5*inch, 1.8*inch, 1.8*inch, 1.8*inch])
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8e44ad')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f4ecf7')])
-    ]))
+    t = Table(data, colWidths=[0.5*inch, 1.5*inch, 1.8*inch, 1.8*inch, 1.8*inch], style=pdf.DFD_PROCESS_TABLE)
     
     elements.append(t)
     elements.append(Spacer(1, 20))
@@ -179,11 +162,7 @@ def generate_dfd_pdf():
         ["Data Store (D)", "Repositories where data is stored (Database Tables)."],
         ["Flows", "Movement of data between entities, processes, and stores."]
     ]
-    t_legend = Table(legend_data, colWidths=[1.5*inch, 4*inch])
-    t_legend.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-    ]))
+    t_legend = Table(legend_data, colWidths=[1.5*inch, 4*inch], style=pdf.LEGEND_TABLE)
     elements.append(t_legend)
 
     doc.build(elements)
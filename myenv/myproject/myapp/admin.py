@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Admin, Doctor, Patient, Department, Staff, OPDAppointment, IPDAdmission, Payment, OTP, Bed, DoctorSchedule
+from .models import CustomUser, Admin, Doctor, Patient, Department, Staff, OPDAppointment, IPDAdmission, Payment, OTP, Bed, DoctorSchedule, DailyStats, Sequence, TokenCounter, LedgerEntry, PatientBalance, ReportJob, OutboundMessage
 
 # Custom User Admin
 @admin.register(CustomUser)
@@ -103,7 +103,7 @@ class PaymentAdmin(admin.ModelAdmin):
 # OTP Model (Optional, for debugging)
 @admin.register(OTP)
 class OTPAdmin(admin.ModelAdmin):
-    list_display = ('user', 'otp_code', 'is_verified', 'created_at', 'expires_at')
+    list_display = ('user', 'is_verified', 'attempts', 'created_at', 'expires_at')
     search_fields = ('user__username', 'user__email')
     readonly_fields = ('otp_code', 'created_at', 'expires_at')
 
@@ -118,3 +118,46 @@ class DoctorScheduleAdmin(admin.ModelAdmin):
     list_display = ('doctor', 'day_of_week', 'start_time', 'end_time')
     list_filter = ('day_of_week', 'doctor')
 
+@admin.register(DailyStats)
+class DailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'department', 'opd_count', 'opd_fee_total', 'ipd_admissions', 'payment_count', 'payment_total')
+    list_filter = ('department',)
+    date_hierarchy = 'date'
+
+@admin.register(Sequence)
+class SequenceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'last_value')
+
+@admin.register(TokenCounter)
+class TokenCounterAdmin(admin.ModelAdmin):
+    list_display = ('day', 'doctor', 'last_token')
+    list_filter = ('doctor',)
+    date_hierarchy = 'day'
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'entry_type', 'amount', 'description', 'posted_at')
+    list_filter = ('entry_type',)
+    search_fields = ('patient__name', 'patient__patient_id', 'description')
+    raw_id_fields = ('patient', 'opd_appointment', 'ipd_admission', 'payment')
+    date_hierarchy = 'posted_at'
+
+@admin.register(PatientBalance)
+class PatientBalanceAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'billed', 'paid', 'balance', 'updated_at')
+    search_fields = ('patient__name', 'patient__patient_id')
+    raw_id_fields = ('patient',)
+    ordering = ('-balance',)
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'channel', 'recipient', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('channel', 'status')
+    search_fields = ('recipient',)
+    readonly_fields = ('created_at', 'claimed_at', 'sent_at')
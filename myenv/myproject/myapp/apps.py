@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class MyappConfig(AppConfig):
     name = 'myapp'
+
+    def ready(self):
+        from . import signals  # Connects the model signal handlers
+        from . import pdf
+        pdf.warm()  # Styles and fonts loaded at worker boot, not on the first PDF request
+        from .otp_store import get_otp_store
+        get_otp_store()  # Refuses to start with OTP_STORE='cache' on a cache without atomic incr()
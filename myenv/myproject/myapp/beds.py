@@ -0,0 +1,358 @@
+import csv
+import json
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from django.core.cache import cache
+from django.db import transaction, IntegrityError
+from django.db.models import Case, Count, DateField, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import Bed, IPDAdmission, WardAvailability
+from .stats import bump_model_version, model_versions
+
+# ============ BED ALLOCATION ============
+# A bed is claimed by locking its row (select_for_update(skip_locked=True),
+# so concurrent admissions pass over each other's beds instead of queueing)
+# and flipping it Available -> Occupied with a conditional UPDATE, all in
+# the transaction that creates the admission. Two receptionists can no
+# longer admit onto the same bed, and WardAvailability moves with it.
+
+STATUS_COUNTERS = {'Available': 'available', 'Occupied': 'occupied', 'Maintenance': 'maintenance'}
+
+
+class BedUnavailable(Exception):
+    """No free bed could be claimed"""
+
+
+def move_ward_counts(before, after):
+    """Move one bed's contribution from (ward_type, status) `before` to `after`; either may be None"""
+    if before == after:
+        return
+    delta = defaultdict(lambda: defaultdict(int))
+    for sign, state in ((-1, before), (1, after)):
+        if state:
+            ward_type, status = state
+            delta[ward_type]['total'] += sign
+            if status in STATUS_COUNTERS:
+                delta[ward_type][STATUS_COUNTERS[status]] += sign
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Fixed order so concurrent moves lock ward rows the same way
+        for ward_type in sorted(delta):
+            amounts = {field: value for field, value in delta[ward_type].items() if value}
+            if not amounts:
+                continue
+            ward = WardAvailability.objects.filter(ward_type=ward_type)
+            updates = {field: F(field) + value for field, value in amounts.items()}
+            if ward.update(updated_at=now, **updates):
+                continue
+            try:
+                with transaction.atomic():
+                    WardAvailability.objects.create(ward_type=ward_type, updated_at=now, **amounts)
+            except IntegrityError:
+                # Another transaction created the row first
+                ward.update(updated_at=now, **updates)
+
+
+def _set_status(bed, old, new):
+    """Flip one bed's status if it is still `old`; True when this call did it"""
+    if not Bed.objects.filter(pk=bed.pk, status=old).update(status=new):
+        return False
+    move_ward_counts((bed.ward_type, old), (bed.ward_type, new))
+    bed.status = new
+    transaction.on_commit(lambda: bump_model_version(Bed))
+    return True
+
+
+def claim_bed(ward_type=None, bed_id=None):
+    """
+    Mark a free bed Occupied and return it: bed `bed_id` when given,
+    otherwise the first free bed in `ward_type`. Call inside the transaction
+    that records who the bed is for. Raises BedUnavailable.
+    """
+    free = Bed.objects.select_for_update(skip_locked=True).filter(status='Available')
+    if bed_id:
+        candidates = free.filter(pk=bed_id)
+    elif ward_type:
+        candidates = free.filter(ward_type=ward_type).order_by('bed_number')[:5]
+    else:
+        raise BedUnavailable("Choose a ward or a bed.")
+
+    # The conditional UPDATE also guards backends without row locks (SQLite)
+    for bed in candidates:
+        if _set_status(bed, 'Available', 'Occupied'):
+            return bed
+    if bed_id:
+        raise BedUnavailable("That bed was just taken. Please choose another.")
+    raise BedUnavailable(f"No free bed in the {ward_type} ward.")
+
+
+def release_bed(bed_id):
+    """Return an occupied bed to Available; True if it was occupied"""
+    if not bed_id:
+        return False
+    with transaction.atomic():
+        bed = Bed.objects.select_for_update().filter(pk=bed_id).only('ward_type', 'status').first()
+        return bool(bed) and _set_status(bed, 'Occupied', 'Available')
+
+
+def admit_patient(patient_id, doctor_id, reason, admission_type, ward_type=None, bed_id=None):
+    """Claim a bed and create the IPD admission on it, atomically"""
+    with transaction.atomic():
+        bed = claim_bed(ward_type, bed_id)
+        return IPDAdmission.objects.create(
+            patient_id=patient_id,
+            doctor_id=doctor_id,
+            bed=bed,
+            ward_no=bed.ward_type,  # redundancy for easy access
+            bed_no=bed.bed_number,
+            reason=reason,
+            status='Admitted',
+            admission_type=admission_type,
+        )
+
+
+def discharge_patient(admission):
+    """
+    Discharge an admitted patient and free their bed, atomically. The status
+    moves with a conditional UPDATE, so a repeated or concurrent discharge
+    returns False and leaves the bed alone (it may have been re-let since).
+    """
+    with transaction.atomic():
+        if not IPDAdmission.objects.filter(pk=admission.pk, status='Admitted').update(status='Discharged'):
+            return False
+        admission.status = 'Discharged'
+        admission.discharge_date = admission.discharge_date or timezone.now()
+        # Saved again so the ledger, stats and version signals see the discharge
+        admission.save(update_fields=['status', 'discharge_date'])
+        release_bed(admission.bed_id)
+    return True
+
+
+# ============ AVAILABILITY READS ============
+
+def ward_availability():
+    """Total, available, occupied and maintenance beds for every ward type, from WardAvailability"""
+    counts = {row['ward_type']: row for row in WardAvailability.objects.values(
+        'ward_type', 'total', 'available', 'occupied', 'maintenance'
+    )}
+    empty = {'total': 0, 'available': 0, 'occupied': 0, 'maintenance': 0}
+    return [
+        {**empty, **counts.get(code, {}), 'ward_type': code, 'label': label}
+        for code, label in Bed.WARD_CHOICES
+    ]
+
+
+def free_beds(ward_type, limit=None):
+    """Free beds in one ward, in bed number order, read off bed_ward_status_idx"""
+    beds = Bed.objects.filter(ward_type=ward_type, status='Available').order_by('bed_number').values(
+        'id', 'bed_number', 'daily_charge'
+    )
+    return beds[:limit] if limit else beds
+
+
+def first_free_bed(ward_type):
+    return free_beds(ward_type).first()
+
+
+def rebuild_ward_availability():
+    """Recount WardAvailability from the beds themselves. Returns the number of wards."""
+    rows = Bed.objects.values('ward_type').annotate(
+        total=Count('id'),
+        **{field: Count('id', filter=Q(status=status)) for status, field in STATUS_COUNTERS.items()},
+    ).order_by()
+    now = timezone.now()
+    with transaction.atomic():
+        WardAvailability.objects.all().delete()
+        WardAvailability.objects.bulk_create([WardAvailability(updated_at=now, **row) for row in rows])
+    return len(rows)
+
+
+# ============ PROVISIONING ============
+# A ward spec gives, per ward, how many beds it should have and their daily
+# charge; bed numbers are PREFIX-NN (GEN-01, GEN-02, ...). plan_beds()
+# diffs it against the beds table in one read, and provision_beds() applies
+# the diff in one transaction: one bulk INSERT for the missing beds and one
+# UPDATE per new charge. Beds are never deleted or moved between wards, so
+# running the same spec twice changes nothing.
+
+SPEC_FIELDS = ('ward_type', 'count', 'daily_charge', 'prefix', 'start', 'digits')
+PROVISION_BATCH_SIZE = 500
+
+
+class WardSpecError(ValueError):
+    """The ward spec cannot be applied as written"""
+
+
+def load_ward_spec(path):
+    """
+    Rows of a ward spec file: a CSV with a header row, or a JSON list of
+    objects, with the columns in SPEC_FIELDS (prefix, start and digits are
+    optional).
+    """
+    with open(path, newline='') as spec:
+        if str(path).lower().endswith('.json'):
+            rows = json.load(spec)
+            if not isinstance(rows, list):
+                raise WardSpecError("A JSON ward spec must be a list of objects")
+            return rows
+        return list(csv.DictReader(spec))
+
+
+def expand_ward_spec(rows):
+    """{bed_number: (ward_type, daily_charge)} for every bed the spec asks for"""
+    wards = dict(Bed.WARD_CHOICES)
+    max_length = Bed._meta.get_field('bed_number').max_length
+    beds = {}
+    for line, row in enumerate(rows, start=1):
+        row = {key: str(value).strip() for key, value in row.items() if value not in (None, '')}
+        ward_type = row.get('ward_type', '')
+        if ward_type not in wards:
+            raise WardSpecError(f"Row {line}: unknown ward type '{ward_type}'")
+        try:
+            count = int(row.get('count', ''))
+            start = int(row.get('start', 1))
+            digits = int(row.get('digits', 2))
+            charge = Decimal(row.get('daily_charge', '')).quantize(Decimal('0.01'))
+        except (ValueError, InvalidOperation):
+            raise WardSpecError(f"Row {line}: count, start and digits must be whole numbers and daily_charge a number")
+        if count < 0 or start < 0 or charge < 0:
+            raise WardSpecError(f"Row {line}: negative count, start or daily_charge")
+
+        prefix = row.get('prefix', ward_type[:3].upper())
+        for number in range(start, start + count):
+            bed_number = f"{prefix}-{number:0{digits}d}"
+            if len(bed_number) > max_length:
+                raise WardSpecError(f"Row {line}: bed number {bed_number} is longer than {max_length} characters")
+            if bed_number in beds:
+                raise WardSpecError(f"Row {line}: bed {bed_number} is already in the spec")
+            beds[bed_number] = (ward_type, charge)
+    return beds
+
+
+def plan_beds(wanted):
+    """
+    Diff {bed_number: (ward_type, daily_charge)} against the beds table:
+    beds to create, beds to reprice as (bed_number, ward_type, old, new),
+    conflicts (bed numbers taken by another ward) and the unchanged count.
+    """
+    existing = {
+        bed_number: (ward_type, charge)
+        for bed_number, ward_type, charge in Bed.objects.filter(bed_number__in=list(wanted)).values_list(
+            'bed_number', 'ward_type', 'daily_charge'
+        ).iterator()
+    }
+    plan = {'create': [], 'reprice': [], 'conflicts': [], 'unchanged': 0}
+    for bed_number, (ward_type, charge) in sorted(wanted.items()):
+        if bed_number not in existing:
+            plan['create'].append((bed_number, ward_type, charge))
+            continue
+        current_ward, current_charge = existing[bed_number]
+        if current_ward != ward_type:
+            plan['conflicts'].append((bed_number, current_ward, ward_type))
+        elif current_charge != charge:
+            plan['reprice'].append((bed_number, ward_type, current_charge, charge))
+        else:
+            plan['unchanged'] += 1
+    return plan
+
+
+def provision_beds(rows, dry_run=False):
+    """Bring the beds table in line with a ward spec; returns the plan from plan_beds()"""
+    plan = plan_beds(expand_ward_spec(rows))
+    if dry_run or not (plan['create'] or plan['reprice']):
+        return plan
+
+    by_charge = defaultdict(list)
+    for bed_number, _, _, charge in plan['reprice']:
+        by_charge[charge].append(bed_number)
+    with transaction.atomic():
+        # Beds created concurrently since the plan are skipped, not an error
+        Bed.objects.bulk_create(
+            [Bed(bed_number=bed_number, ward_type=ward_type, daily_charge=charge, status='Available')
+             for bed_number, ward_type, charge in plan['create']],
+            ignore_conflicts=True,
+            batch_size=PROVISION_BATCH_SIZE,
+        )
+        for charge, bed_numbers in by_charge.items():
+            Bed.objects.filter(bed_number__in=bed_numbers).update(daily_charge=charge)
+        if plan['create']:
+            # bulk_create sends no post_save, so recount instead of moving counts per bed
+            rebuild_ward_availability()
+        transaction.on_commit(lambda: bump_model_version(Bed))
+    return plan
+
+
+# ============ OCCUPANCY FORECAST ============
+# Projected free beds per ward for the next N days: beds free now plus the
+# beds of admitted patients expected to leave by each day, assuming no new
+# admissions. Expected discharges come from one grouped query over admitted
+# patients. Results are cached under the IPDAdmission and Bed change
+# counters, so any admission, discharge or bed change starts a fresh entry.
+
+FORECAST_CACHE_KEY = 'beds:forecast:{days}:{today}:{versions}'
+FORECAST_TTL = 3600
+MAX_FORECAST_DAYS = 30
+
+
+def _freed_on(today):
+    """
+    Day an admitted patient's bed is expected back: their expected discharge
+    date (today if already past), or today once a discharge is requested
+    without one. NULL when nothing is known.
+    """
+    return Case(
+        When(expected_discharge_date__isnull=False, then=Greatest('expected_discharge_date', Value(today))),
+        When(is_discharge_requested=True, then=Value(today)),
+        default=None,
+        output_field=DateField(),
+    )
+
+
+def compute_bed_forecast(days=7, today=None):
+    today = today or timezone.localdate()
+    dates = [today + timedelta(days=offset) for offset in range(days)]
+    discharges = defaultdict(lambda: [0] * days)
+    rows = IPDAdmission.objects.filter(status='Admitted', bed__isnull=False).annotate(
+        freed_on=_freed_on(today)
+    ).filter(freed_on__lte=dates[-1]).values('bed__ward_type', 'freed_on').annotate(beds=Count('id')).order_by()
+    for row in rows:
+        discharges[row['bed__ward_type']][(row['freed_on'] - today).days] += row['beds']
+
+    wards = []
+    for ward in ward_availability():
+        if not ward['total']:
+            continue
+        leaving = discharges[ward['ward_type']]
+        free, running = [], ward['available']
+        for count in leaving:
+            running += count
+            free.append(running)
+        wards.append({
+            'ward_type': ward['ward_type'],
+            'label': ward['label'],
+            'total': ward['total'],
+            'free_now': ward['available'],
+            'discharges': leaving,
+            'free': free,
+        })
+    return {
+        'dates': [day.isoformat() for day in dates],
+        'wards': wards,
+        'total_free': [sum(ward['free'][offset] for ward in wards) for offset in range(days)],
+    }
+
+
+def get_bed_forecast(days=7):
+    """compute_bed_forecast() through the shared cache"""
+    days = max(1, min(days, MAX_FORECAST_DAYS))
+    today = timezone.localdate()
+    versions = '-'.join(str(version) for version in model_versions((IPDAdmission, Bed)))
+    key = FORECAST_CACHE_KEY.format(days=days, today=today.isoformat(), versions=versions)
+    forecast = cache.get(key)
+    if forecast is None:
+        forecast = compute_bed_forecast(days, today)
+        cache.set(key, forecast, FORECAST_TTL)
+    return forecast
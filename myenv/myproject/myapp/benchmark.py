@@ -0,0 +1,206 @@
+import logging
+import time
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import URLPattern, reverse
+from .models import CustomUser, Doctor, Staff, Patient, Department, Bed, OPDAppointment, IPDAdmission, Payment, Prescription, LabReport
+from . import urls
+
+# ============ QUERY BENCHMARK ============
+# Requests every named route in myapp/urls.py as the role that owns it and
+# records query count, SQL time and wall time. Comparing counts across
+# dataset sizes catches views whose queries grow with the data (N+1).
+
+# Routes that change data on GET, never finish, or call external services
+SKIPPED_ROUTES = {
+    'logout': 'ends the session',
+    'admin_delete_doctor': 'deletes on GET',
+    'admin_delete_patient': 'deletes on GET',
+    'delete_department': 'deletes on GET',
+    'delete_staff': 'deletes on GET',
+    'api_live_stats': 'endless event stream',
+    'chat_api': 'calls the AI provider',
+    'resend_otp': 'sends email',
+}
+
+# URL prefix -> role that is allowed to open it (first match wins)
+ROUTE_ROLES = [
+    ('api/admin/', 'admin'),
+    ('admin/', 'admin'),
+    ('beds/', 'admin'),
+    ('api/beds/', 'admin'),
+    ('staff/laboratory/', 'lab'),
+    ('staff/receptionist/', 'receptionist'),
+    ('staff-dashboard/', 'receptionist'),
+    ('doctor/', 'doctor'),
+    ('patient/', 'patient'),
+    ('payment/', 'patient'),
+    ('api/chat/', 'patient'),
+]
+
+
+def _route_objects(users):
+    """Sample object for each route that takes an id, owned by the requesting role where it matters"""
+    doctor = users['doctor'].doctor_profile
+    patient = users['patient'].patient_profile
+
+    def first(queryset):
+        obj = queryset.order_by('pk').first()
+        return obj.pk if obj else 0
+
+    return {
+        'admin_edit_doctor': first(Doctor.objects.all()),
+        'admin_view_doctor': first(Doctor.objects.all()),
+        'admin_view_patient': first(Patient.objects.all()),
+        'edit_department': first(Department.objects.all()),
+        'edit_staff': first(Staff.objects.all()),
+        'opd_edit': first(OPDAppointment.objects.all()),
+        'ipd_discharge': first(IPDAdmission.objects.all()),
+        'laboratory_upload_report': first(LabReport.objects.all()),
+        'receptionist_opd_slip': first(OPDAppointment.objects.all()),
+        'receptionist_discharge': first(IPDAdmission.objects.filter(status='Admitted')),
+        'receptionist_finalize_discharge': first(IPDAdmission.objects.filter(status='Admitted')),
+        'receptionist_reschedule_appt': first(OPDAppointment.objects.all()),
+        'receptionist_cancel_appt': first(OPDAppointment.objects.all()),
+        'receptionist_update_doctor_status': first(Doctor.objects.all()),
+        'prescription_print': first(Prescription.objects.filter(doctor=doctor)),
+        'discharge_print': first(IPDAdmission.objects.filter(doctor=doctor)),
+        'download_prescription': first(Prescription.objects.filter(patient=patient)),
+        'download_receipt': first(Payment.objects.filter(patient=patient)),
+        'bed_edit': first(Bed.objects.all()),
+        'bed_delete': first(Bed.objects.all()),
+    }
+
+
+def _route_kwargs(pattern, name, objects):
+    params = list(pattern.pattern.converters)
+    if not params:
+        return {}
+    return {params[0]: objects.get(name, 0)}
+
+
+def named_routes():
+    """(name, URLPattern) for every named route, first definition wins like reverse()"""
+    seen = set()
+    for pattern in urls.urlpatterns:
+        if isinstance(pattern, URLPattern) and pattern.name and pattern.name not in seen:
+            seen.add(pattern.name)
+            yield pattern.name, pattern
+
+
+def route_role(pattern):
+    path = str(pattern.pattern)
+    for prefix, role in ROUTE_ROLES:
+        if path.startswith(prefix):
+            return role
+    return None
+
+
+def benchmark_users():
+    """One user per role from the generated dataset, plus a benchmark admin"""
+    admin, _ = CustomUser.objects.get_or_create(username='bench_admin', defaults={'user_type': 'admin', 'is_staff': True})
+    return {
+        'admin': admin,
+        'receptionist': CustomUser.objects.filter(staff_profile__role='Receptionist').order_by('pk').first(),
+        'lab': CustomUser.objects.filter(staff_profile__role='Lab Technician').order_by('pk').first(),
+        # The busiest doctor and patient, so their own lists are the longest
+        'doctor': _busiest(Doctor, 'opdappointment'),
+        'patient': _busiest(Patient, 'opdappointment'),
+    }
+
+
+def _busiest(model, relation):
+    return model.objects.annotate(n=Count(relation)).order_by('-n', 'pk').first().user
+
+
+class QueryTimer:
+    """Counts queries and sums their execution time via connection.execute_wrapper"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+def measure(client, url):
+    timer = QueryTimer()
+    start = time.perf_counter()
+    with connection.execute_wrapper(timer):
+        response = client.get(url)
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+    wall = time.perf_counter() - start
+    return {
+        'status': response.status_code,
+        'queries': timer.count,
+        'sql_ms': round(timer.seconds * 1000, 2),
+        'wall_ms': round(wall * 1000, 2),
+    }
+
+
+def run_routes(log=None):
+    """Measure every named route once. Returns {name: result}."""
+    log = log or (lambda message: None)
+
+    users = benchmark_users()
+    # Broken views are recorded as 500s instead of stopping the run
+    clients = {None: Client(raise_request_exception=False)}
+    for role, user in users.items():
+        clients[role] = Client(raise_request_exception=False)
+        clients[role].force_login(user)
+    objects = _route_objects(users)
+
+    results = {}
+    # Failures are already reported by status code; keep the table readable
+    request_logger = logging.getLogger('django.request')
+    previous_level = request_logger.level
+    request_logger.setLevel(logging.CRITICAL)
+    try:
+        for name, pattern in named_routes():
+            if name in SKIPPED_ROUTES:
+                continue
+            role = route_role(pattern)
+            url = reverse(name, kwargs=_route_kwargs(pattern, name, objects))
+            # Cold cache: measure the work a view does, not whether it was cached
+            cache.clear()
+            result = measure(clients[role], url)
+            result['role'] = role or 'anonymous'
+            results[name] = result
+            log(f"{name:<36} {result['status']} {result['queries']:>5} queries {result['sql_ms']:>9} ms SQL {result['wall_ms']:>9} ms")
+    finally:
+        request_logger.setLevel(previous_level)
+    return results
+
+
+# ============ COMPARISON ============
+
+def scaling_routes(results_by_size):
+    """Routes whose query count differs between dataset sizes"""
+    sizes = sorted(results_by_size, key=int)
+    flagged = {}
+    for name in results_by_size[sizes[0]]:
+        counts = [results_by_size[size].get(name, {}).get('queries') for size in sizes]
+        if len(set(counts)) > 1:
+            flagged[name] = dict(zip(sizes, counts))
+    return flagged
+
+
+def regressions(results_by_size, baseline):
+    """(size, route, baseline queries, current queries) where the count went up"""
+    found = []
+    for size, results in results_by_size.items():
+        expected = baseline.get('sizes', {}).get(size, {})
+        for name, result in results.items():
+            before = expected.get(name, {}).get('queries')
+            if before is not None and result['queries'] > before:
+                found.append((size, name, before, result['queries']))
+    return found
@@ -0,0 +1,194 @@
+from collections import defaultdict, deque
+from django.db.models import Count, DateField, DecimalField, ExpressionWrapper, F, Func, IntegerField, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+from .models import OPDAppointment, IPDAdmission, Payment, Bed, PatientBalance
+
+# ============ BILL RECONCILIATION ============
+# There is no FK from Payment to what it pays for, so bills are matched to
+# payments by value: an OPD fee by (patient, amount, day) and an IPD stay by
+# (patient, amount) among payments described as "IPD". Payments are indexed
+# once and each one settles at most one bill, so reconciling n bills against
+# m payments is O(n + m) instead of a nested loop.
+
+
+def ipd_days(admission, today=None):
+    """Billable days of a stay (minimum one), up to today while still admitted"""
+    end = admission.discharge_date.date() if admission.discharge_date else (today or timezone.now().date())
+    return max((end - admission.admission_date.date()).days, 1)
+
+
+# ============ IPD CHARGES IN SQL ============
+# The same days x daily charge as ipd_days(), as expressions, so listings and
+# aggregates over many admissions are computed by the database.
+
+class DaysBetween(Func):
+    """Whole calendar days from the date of `start` to the date of `end`"""
+    output_field = IntegerField()
+    arity = 2
+
+    def __init__(self, start, end, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='(CAST(%(expressions)s AS DATE))',
+                              arg_joiner=' AS DATE) - CAST(', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='CAST(julianday(date(%(expressions)s)) AS INTEGER)',
+                              arg_joiner=')) - julianday(date(', **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='DATEDIFF', **extra_context)
+
+
+def billable_days(today=None):
+    """SQL twin of ipd_days() for IPDAdmission querysets"""
+    end = Coalesce(TruncDate('discharge_date'), Value(today or timezone.now().date(), output_field=DateField()))
+    return Greatest(DaysBetween(TruncDate('admission_date'), end), Value(1))
+
+
+def ipd_charge(today=None):
+    """Billable days x the bed's daily charge, NULL for stays without a bed"""
+    return ExpressionWrapper(
+        billable_days(today) * F('bed__daily_charge'),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def with_ipd_charges(admissions, today=None):
+    """Annotate billed_days and ipd_charge so listings skip the per-row Python maths"""
+    return admissions.annotate(billed_days=billable_days(today), ipd_charge=ipd_charge(today))
+
+
+def ward_revenue(start=None, end=None, today=None):
+    """
+    Admissions, bed-days and bed revenue per ward type in a single grouped
+    query, optionally limited to admissions dated start..end (inclusive).
+    """
+    admissions = IPDAdmission.objects.filter(bed__isnull=False)
+    if start:
+        admissions = admissions.filter(admission_date__date__gte=start)
+    if end:
+        admissions = admissions.filter(admission_date__date__lte=end)
+    rows = admissions.values('bed__ward_type').annotate(
+        admissions=Count('id'),
+        admitted=Count('id', filter=Q(status='Admitted')),
+        bed_days=Sum(billable_days(today)),
+        revenue=Sum(ipd_charge(today)),
+    ).order_by('bed__ward_type')
+    labels = dict(Bed.WARD_CHOICES)
+    return [{
+        'ward_type': row['bed__ward_type'],
+        'label': labels.get(row['bed__ward_type'], row['bed__ward_type']),
+        'admissions': row['admissions'],
+        'admitted': row['admitted'],
+        'bed_days': row['bed_days'] or 0,
+        'revenue': row['revenue'] or 0,
+    } for row in rows]
+
+
+def opd_bill(appointment):
+    return {
+        'id': f"OPD-{appointment.id}",
+        'type': 'OPD',
+        'date': appointment.appointment_date,
+        'description': f"Consultation - Dr. {appointment.doctor.name if appointment.doctor else 'Unknown'}",
+        'amount': appointment.fee,
+        'obj_id': appointment.id,
+        'patient_id': appointment.patient_id,
+        'source': appointment,
+    }
+
+
+def ipd_bill(admission, today=None):
+    daily_charge = admission.bed.daily_charge if admission.bed else 0
+    if hasattr(admission, 'ipd_charge'):
+        # Annotated by with_ipd_charges()
+        days, amount = admission.billed_days, admission.ipd_charge or 0
+    else:
+        days = ipd_days(admission, today)
+        amount = days * daily_charge
+    return {
+        'id': f"IPD-{admission.id}",
+        'type': 'IPD',
+        'date': admission.admission_date,
+        'description': f"Inpatient Care - {days} Days (Ward: {admission.ward_no})",
+        'amount': amount,
+        'days': days,
+        'daily_charge': daily_charge,
+        'obj_id': admission.id,
+        'patient_id': admission.patient_id,
+        'source': admission,
+    }
+
+
+class PaymentIndex:
+    """Payments bucketed by match key; take() hands each payment out once"""
+
+    def __init__(self, payments):
+        self.by_day = defaultdict(deque)
+        self.ipd_by_amount = defaultdict(deque)
+        self.used = set()
+        for payment in payments:
+            self.by_day[(payment.patient_id, payment.amount, payment.payment_date.date())].append(payment)
+            if payment.description and "IPD" in payment.description:
+                self.ipd_by_amount[(payment.patient_id, payment.amount)].append(payment)
+
+    def _take(self, bucket):
+        while bucket:
+            payment = bucket.popleft()
+            if payment.pk not in self.used:
+                self.used.add(payment.pk)
+                return payment
+        return None
+
+    def match(self, bill):
+        if bill['type'] == 'OPD':
+            key = (bill['patient_id'], bill['amount'], bill['date'].date())
+            bucket = self.by_day.get(key)
+        else:
+            bucket = self.ipd_by_amount.get((bill['patient_id'], bill['amount']))
+        return self._take(bucket) if bucket else None
+
+
+def reconcile(appointments, admissions, payments, today=None):
+    """
+    Bills for `appointments` and `admissions`, newest first, each marked Paid
+    or Pending against `payments`. Querysets should select_related('doctor')
+    and ('bed') respectively. Payments are tried in the order given.
+    """
+    index = PaymentIndex(payments)
+    bills = [opd_bill(appointment) for appointment in appointments]
+    bills += [ipd_bill(admission, today) for admission in admissions]
+    for bill in bills:
+        payment = index.match(bill)
+        bill['status'] = 'Paid' if payment else 'Pending'
+        bill['payment_id'] = payment.id if payment else None
+    bills.sort(key=lambda bill: bill['date'], reverse=True)
+    return bills
+
+
+def patient_totals(patient):
+    """billed, paid and balance from the patient's ledger: a single-row read"""
+    row = PatientBalance.objects.filter(patient=patient).values('billed', 'paid', 'balance').first()
+    return row or {'billed': 0, 'paid': 0, 'balance': 0}
+
+
+def patient_bill_summary(patient):
+    """Bills, payments and totals for one patient's bills page"""
+    payments = list(Payment.objects.filter(patient=patient).order_by('-payment_date'))
+    bills = reconcile(
+        OPDAppointment.objects.filter(patient=patient).select_related('doctor').order_by('-appointment_date'),
+        with_ipd_charges(IPDAdmission.objects.filter(patient=patient).select_related('bed')).order_by('-admission_date'),
+        payments,
+    )
+    # Totals come from the ledger, not from the matching above
+    totals = patient_totals(patient)
+    return {
+        'bill_items': bills,
+        'payments': payments,
+        'total_billed': totals['billed'],
+        'total_paid': totals['paid'],
+        'total_pending': max(totals['balance'], 0),
+    }
@@ -0,0 +1,170 @@
+import csv
+import tempfile
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Max
+from django.db.models.functions import Length
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+# ============ EXPORTS ============
+# Exports are written in one pass over a values_list().iterator(), so memory
+# does not grow with the number of rows and no model instance is built per
+# row. On PostgreSQL .iterator() reads through a named server-side cursor,
+# CSV_CHUNK_ROWS rows per fetch.
+
+CSV_CHUNK_ROWS = 2000
+CSV_LINES_PER_CHUNK = 500  # CSV lines joined into each chunk sent to the client
+
+
+class _Echo:
+    """File-like csv.writer target that hands back the formatted line"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_chunks(headers, rows):
+    writer = csv.writer(_Echo())
+    lines = [writer.writerow(headers)]
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) >= CSV_LINES_PER_CHUNK:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+async def _async_chunks(chunks):
+    # Every fetch runs on the one thread that owns the DB connection (and cursor)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+def date_range(params, start_key='from', end_key='to'):
+    """
+    (start, end) dates from query/form params, None where a key is absent or
+    blank. ValueError if either is present but not a YYYY-MM-DD date, since
+    parse_date() alone would return None and the filter would be dropped.
+    """
+    dates = []
+    for key in (start_key, end_key):
+        value = params.get(key, '').strip()
+        try:
+            parsed = parse_date(value) if value else None
+        except ValueError:
+            # Well-formed but impossible, e.g. 2024-02-30
+            parsed = None
+        if value and parsed is None:
+            raise ValueError(f"Invalid date for {key}: {value!r}")
+        dates.append(parsed)
+    return tuple(dates)
+
+
+def in_date_range(queryset, field, start=None, end=None):
+    """Rows whose datetime `field` falls on start..end (inclusive); either may be None"""
+    if start:
+        queryset = queryset.filter(**{f'{field}__date__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{field}__date__lte': end})
+    return queryset
+
+
+def csv_response(request, filename, queryset, columns):
+    """
+    Stream `queryset` as a CSV download. `columns` is a list of
+    (header, field) or (header, field, format) where format turns the value
+    into a cell; fields can span relations or name annotations.
+    """
+    headers = [column[0] for column in columns]
+    formats = [column[2] if len(column) > 2 else None for column in columns]
+    values = queryset.values_list(*[column[1] for column in columns]).iterator(chunk_size=CSV_CHUNK_ROWS)
+    rows = (
+        [format(value) if format else value for format, value in zip(formats, row)]
+        for row in values
+    )
+    return streaming_download(request, _csv_chunks(headers, rows), filename, 'text/csv')
+
+
+def streaming_download(request, chunks, filename, content_type, size=None):
+    """Attachment response that sends `chunks` (a sync iterator) as they are produced"""
+    if isinstance(request, ASGIRequest):
+        # A sync iterator would be read to the end before the first byte is sent
+        chunks = _async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if size is not None:
+        response['Content-Length'] = size
+    return response
+
+
+def day(value):
+    return value.strftime('%Y-%m-%d') if value else ''
+
+
+def minute(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else ''
+
+
+def or_na(value):
+    return 'N/A' if value in (None, '') else value
+
+
+# ============ SPREADSHEET EXPORTS ============
+# openpyxl's write-only sheets put each row straight into a temp file, and
+# the finished workbook is sent from disk by FileResponse.
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+MAX_COLUMN_WIDTH = 50
+
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill(start_color="3498DB", end_color="3498DB", fill_type="solid")
+HEADER_ALIGNMENT = Alignment(horizontal="center")
+
+
+def column_widths(queryset, headers, text_fields):
+    """
+    Width per column: the longest header or value plus padding, capped.
+    `text_fields` maps column index -> model field, measured by one
+    MAX(LENGTH()) aggregate. Other columns are sized by their header.
+    XLSX stores widths ahead of the rows, so a streamed sheet must know
+    them before its first row is written.
+    """
+    longest = queryset.order_by().aggregate(**{
+        f'c{index}': Max(Length(field)) for index, field in text_fields.items()
+    }) if text_fields else {}
+    return [
+        min(max(len(header), longest.get(f'c{index}') or 0) + 2, MAX_COLUMN_WIDTH)
+        for index, header in enumerate(headers)
+    ]
+
+
+def xlsx_response(filename, sheet_title, headers, rows, widths=None):
+    """Download of a one-sheet workbook with a styled header row, streamed from a temp file"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+    for index, width in enumerate(widths or [], start=1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = HEADER_FONT
+        cell.fill = HEADER_FILL
+        cell.alignment = HEADER_ALIGNMENT
+        header_cells.append(cell)
+    ws.append(header_cells)
+    for row in rows:
+        ws.append(row)
+
+    # Deleted when the response closes it
+    out = tempfile.TemporaryFile()
+    wb.save(out)
+    out.seek(0)
+    return FileResponse(out, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
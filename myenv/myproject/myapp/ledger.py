@@ -0,0 +1,254 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from itertools import islice
+from django.db import connection, transaction, IntegrityError
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+from .models import OPDAppointment, IPDAdmission, Payment, Bed, LedgerEntry, PatientBalance
+from .billing import ipd_days
+
+# ============ PATIENT LEDGER ============
+# Each source row (OPD appointment, IPD admission, payment) has a target
+# amount on its patient's ledger. Syncing posts the difference between that
+# target and what is already posted for the row, so edits and deletes become
+# correcting entries, and PatientBalance moves by the same amounts in the
+# same transaction.
+#
+#   OPD appointment  charge of the fee, nothing once cancelled
+#   IPD admission    one bed charge per night while admitted (accrue_ipd_charges),
+#                    trued up to days x bed charge at discharge
+#   Payment          payment of -amount
+
+
+def _opd_target(pk):
+    row = OPDAppointment.objects.filter(pk=pk).values('patient_id', 'fee', 'status').first()
+    if not row or row['status'] == 'Cancelled':
+        return {}
+    return {row['patient_id']: row['fee'] or 0}
+
+
+def _ipd_target(pk):
+    admission = IPDAdmission.objects.filter(pk=pk).select_related('bed').only(
+        'patient_id', 'status', 'admission_date', 'discharge_date', 'bed__daily_charge'
+    ).first()
+    if admission and admission.status == 'Admitted':
+        # Charges accrue nightly until discharge; leave them as posted
+        return None
+    if not admission or not admission.bed:
+        return {}
+    return {admission.patient_id: ipd_days(admission) * admission.bed.daily_charge}
+
+
+def _payment_target(pk):
+    row = Payment.objects.filter(pk=pk).values('patient_id', 'amount').first()
+    if not row:
+        return {}
+    return {row['patient_id']: -(row['amount'] or 0)}
+
+
+# model -> (LedgerEntry FK field, entry type, target, description)
+LEDGER_SOURCES = {
+    OPDAppointment: ('opd_appointment', LedgerEntry.CHARGE, _opd_target, 'Consultation (OPD-{pk})'),
+    IPDAdmission: ('ipd_admission', LedgerEntry.CHARGE, _ipd_target, 'Inpatient stay (IPD-{pk})'),
+    Payment: ('payment', LedgerEntry.PAYMENT, _payment_target, 'Payment #{pk}'),
+}
+
+
+def _move_balance(patient_id, billed, paid):
+    amounts = {'billed': F('billed') + billed, 'paid': F('paid') + paid, 'balance': F('balance') + billed - paid}
+    balance = PatientBalance.objects.filter(patient_id=patient_id)
+    if not balance.update(**amounts):
+        try:
+            with transaction.atomic():
+                PatientBalance.objects.create(patient_id=patient_id, billed=billed, paid=paid, balance=billed - paid)
+            return
+        except IntegrityError:
+            # Another transaction created the row first
+            balance.update(**amounts)
+
+
+def post_entries(entries):
+    """Insert ledger entries and move each patient's balance by their total"""
+    if not entries:
+        return
+    totals = defaultdict(lambda: [0, 0])
+    for entry in entries:
+        if entry.entry_type == LedgerEntry.PAYMENT:
+            totals[entry.patient_id][1] -= entry.amount
+        else:
+            totals[entry.patient_id][0] += entry.amount
+    with transaction.atomic():
+        LedgerEntry.objects.bulk_create(entries)
+        # Fixed order so concurrent postings lock balance rows the same way
+        for patient_id in sorted(totals):
+            _move_balance(patient_id, *totals[patient_id])
+
+
+def post_adjustment(patient, amount, description):
+    """Manual correction: positive adds to what the patient owes, negative forgives"""
+    entry = LedgerEntry(patient=patient, entry_type=LedgerEntry.ADJUSTMENT, amount=amount, description=description)
+    post_entries([entry])
+    return entry
+
+
+def sync_source(model, pk, deleting=False):
+    """Post whatever brings the ledger for one source row back to its target"""
+    field, entry_type, target_for, description = LEDGER_SOURCES[model]
+    target = {} if deleting else target_for(pk)
+    if target is None:
+        return
+    with transaction.atomic():
+        posted = dict(
+            LedgerEntry.objects.filter(**{f'{field}_id': pk}, entry_type=entry_type)
+            .values_list('patient_id').annotate(total=Sum('amount')).order_by()
+        )
+        entries = []
+        for patient_id in set(target) | set(posted):
+            delta = target.get(patient_id, 0) - (posted.get(patient_id) or 0)
+            if delta:
+                label = description.format(pk=pk)
+                if patient_id not in target:
+                    label = f"Reversal: {label}"
+                entries.append(LedgerEntry(
+                    patient_id=patient_id, entry_type=entry_type, amount=delta,
+                    description=label, **{f'{field}_id': pk},
+                ))
+        post_entries(entries)
+
+
+def top_debtors(limit=10):
+    """Patients owing the most, read off patient_balance_debt_idx"""
+    return PatientBalance.objects.filter(balance__gt=0).select_related('patient').only(
+        'balance', 'billed', 'paid', 'patient__name', 'patient__patient_id', 'patient__phone'
+    ).order_by('-balance')[:limit]
+
+
+# ============ NIGHTLY IPD ACCRUAL ============
+# One INSERT ... SELECT posts the day's bed charge for every admitted
+# patient; the ledger_ipd_accrual_day constraint and NOT EXISTS make a rerun
+# for the same day a no-op. Balances are then moved set-based as well.
+
+ACCRUAL_SQL = """
+    INSERT INTO {ledger} (patient_id, entry_type, amount, description, posted_at, service_date, ipd_admission_id)
+    SELECT a.patient_id, %s, b.daily_charge, %s, %s, %s, a.id
+    FROM {admission} a
+    JOIN {bed} b ON b.id = a.bed_id
+    WHERE a.status = 'Admitted' AND a.admission_date < %s
+      AND NOT EXISTS (SELECT 1 FROM {ledger} e WHERE e.ipd_admission_id = a.id AND e.service_date = %s)
+"""
+
+MISSING_BALANCES_SQL = """
+    INSERT INTO {balance} (patient_id, billed, paid, balance, updated_at)
+    SELECT DISTINCT e.patient_id, 0, 0, 0, %s
+    FROM {ledger} e
+    WHERE e.service_date = %s AND e.posted_at = %s
+      AND NOT EXISTS (SELECT 1 FROM {balance} pb WHERE pb.patient_id = e.patient_id)
+"""
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def accrue_ipd_charges(day=None):
+    """
+    Post `day`'s bed charge (default yesterday) for every admission still
+    admitted that was admitted by the end of that day. Returns rows posted.
+    """
+    day = day or timezone.localdate() - timedelta(days=1)
+    posted_at = timezone.now()
+    ops = connection.ops
+    tables = {
+        'ledger': LedgerEntry._meta.db_table,
+        'admission': IPDAdmission._meta.db_table,
+        'bed': Bed._meta.db_table,
+        'balance': PatientBalance._meta.db_table,
+    }
+    run_at, service_date = ops.adapt_datetimefield_value(posted_at), ops.adapt_datefield_value(day)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(ACCRUAL_SQL.format(**tables), [
+            LedgerEntry.CHARGE, f"Bed charge {day:%Y-%m-%d}", run_at, service_date,
+            ops.adapt_datetimefield_value(_day_start(day + timedelta(days=1))), service_date,
+        ])
+        posted = cursor.rowcount
+        if not posted:
+            return 0
+        cursor.execute(MISSING_BALANCES_SQL.format(**tables), [run_at, service_date, run_at])
+
+        # This run's entries only, so a partial earlier run is not counted twice
+        run = LedgerEntry.objects.filter(service_date=day, posted_at=posted_at)
+        day_total = Subquery(
+            run.filter(patient_id=OuterRef('patient_id')).values('patient_id').annotate(total=Sum('amount')).values('total')
+        )
+        PatientBalance.objects.filter(patient_id__in=run.values('patient_id')).update(
+            billed=F('billed') + day_total, balance=F('balance') + day_total, updated_at=posted_at,
+        )
+    return posted
+
+
+# ============ REBUILD ============
+
+def _source_entries():
+    """Ledger entries derived from the source tables, dated like their source"""
+    for row in OPDAppointment.objects.exclude(status='Cancelled').exclude(fee=0).values_list(
+        'id', 'patient_id', 'fee', 'appointment_date'
+    ).iterator(chunk_size=2000):
+        pk, patient_id, fee, posted_at = row
+        yield LedgerEntry(patient_id=patient_id, entry_type=LedgerEntry.CHARGE, amount=fee,
+                          description=f"Consultation (OPD-{pk})", posted_at=posted_at, opd_appointment_id=pk)
+
+    admissions = IPDAdmission.objects.filter(bed__isnull=False).select_related('bed').only(
+        'patient_id', 'status', 'admission_date', 'discharge_date', 'bed__daily_charge'
+    )
+    yesterday = timezone.localdate() - timedelta(days=1)
+    for admission in admissions.iterator(chunk_size=2000):
+        if admission.status == 'Admitted':
+            # What the nightly accrual would have posted up to yesterday
+            day = admission.admission_date.date()
+            while day <= yesterday:
+                yield LedgerEntry(patient_id=admission.patient_id, entry_type=LedgerEntry.CHARGE,
+                                  amount=admission.bed.daily_charge, description=f"Bed charge {day:%Y-%m-%d}",
+                                  posted_at=_day_start(day + timedelta(days=1)), service_date=day,
+                                  ipd_admission_id=admission.pk)
+                day += timedelta(days=1)
+            continue
+        amount = ipd_days(admission) * admission.bed.daily_charge
+        if amount:
+            yield LedgerEntry(patient_id=admission.patient_id, entry_type=LedgerEntry.CHARGE, amount=amount,
+                              description=f"Inpatient stay (IPD-{admission.pk})",
+                              posted_at=admission.discharge_date or admission.admission_date,
+                              ipd_admission_id=admission.pk)
+
+    for pk, patient_id, amount, posted_at in Payment.objects.values_list(
+        'id', 'patient_id', 'amount', 'payment_date'
+    ).iterator(chunk_size=2000):
+        yield LedgerEntry(patient_id=patient_id, entry_type=LedgerEntry.PAYMENT, amount=-amount,
+                          description=f"Payment #{pk}", posted_at=posted_at, payment_id=pk)
+
+
+def rebuild_ledger(batch_size=2000):
+    """
+    Re-derive every charge and payment entry from the source tables and
+    recompute PatientBalance from the ledger. Manual adjustments are kept.
+    Returns (entries, balances).
+    """
+    entries = _source_entries()
+    count = 0
+    with transaction.atomic():
+        LedgerEntry.objects.exclude(entry_type=LedgerEntry.ADJUSTMENT).delete()
+        while batch := list(islice(entries, batch_size)):
+            LedgerEntry.objects.bulk_create(batch)
+            count += len(batch)
+
+        PatientBalance.objects.all().delete()
+        totals = LedgerEntry.objects.values('patient_id').annotate(
+            billed=Sum('amount', filter=~Q(entry_type=LedgerEntry.PAYMENT), default=0),
+            paid=-Sum('amount', filter=Q(entry_type=LedgerEntry.PAYMENT), default=0),
+        ).order_by()
+        balances = [
+            PatientBalance(patient_id=row['patient_id'], billed=row['billed'], paid=row['paid'],
+                           balance=row['billed'] - row['paid'])
+            for row in totals
+        ]
+        PatientBalance.objects.bulk_create(balances, batch_size=batch_size)
+    return count, len(balances)
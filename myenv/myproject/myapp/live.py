@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from .stats import compute_dashboard_stats, compute_reports_stats, model_versions, STATS_GROUP_MODELS
+
+# ============ LIVE STATS (SERVER-SENT EVENTS) ============
+# Runs under the ASGI application (myproject/asgi.py). Each process keeps one
+# loop per stat group, however many browsers are subscribed. The loop only
+# re-aggregates when a change counter of a watched model moves (see
+# signals.py) and then pushes just the top-level keys that changed.
+
+logger = logging.getLogger(__name__)
+
+LIVE_STATS_CHECK_INTERVAL = getattr(settings, 'LIVE_STATS_CHECK_INTERVAL', 2)
+LIVE_STATS_KEEPALIVE = 15
+
+
+def _run_query(func, *args):
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+def stats_delta(old, new):
+    """Top-level keys of `new` that differ from `old` (timestamp excluded)"""
+    old = old or {}
+    return {key: value for key, value in new.items() if key != 'timestamp' and old.get(key) != value}
+
+
+class StatGroup:
+    """One computation loop shared by every subscriber of a stat group"""
+
+    def __init__(self, name, compute, models):
+        self.name = name
+        self.compute = compute
+        self.models = models
+        self.subscribers = set()
+        self.payload = None
+        self.versions = None
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=10)
+        if self.payload is not None:
+            queue.put_nowait(self.payload)
+        self.subscribers.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, message):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow client: replace its backlog with the full current payload
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.payload)
+
+    async def refresh(self):
+        """Recompute and publish the changed keys if a watched model has changed"""
+        versions = await sync_to_async(model_versions)(self.models)
+        if versions == self.versions:
+            return
+        payload = await sync_to_async(_run_query)(self.compute)
+        delta = stats_delta(self.payload, payload)
+        self.versions = versions
+        self.payload = payload
+        if delta:
+            delta['timestamp'] = payload['timestamp']
+            self.publish(delta)
+
+    async def run(self):
+        while self.subscribers:
+            try:
+                await self.refresh()
+            except Exception:
+                # A DB or cache error must not end the loop: subscribers
+                # would get nothing but keepalives until a new one arrived
+                logger.exception("Live stats refresh failed for %s", self.name)
+            await asyncio.sleep(LIVE_STATS_CHECK_INTERVAL)
+        # Nobody is listening: forget state so the next subscriber starts fresh
+        self.payload = None
+        self.versions = None
+
+
+STAT_GROUPS = {
+    'dashboard': StatGroup('dashboard', compute_dashboard_stats, STATS_GROUP_MODELS['dashboard']),
+    'reports': StatGroup('reports', compute_reports_stats, STATS_GROUP_MODELS['reports']),
+}
+
+
+async def event_stream(group):
+    """Yield SSE frames for `group` until the client disconnects"""
+    queue = group.subscribe()
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), LIVE_STATS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield f'event: stats\ndata: {json.dumps(message)}\n\n'
+    finally:
+        group.unsubscribe(queue)
@@ -0,0 +1,295 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import IntegerField, Max
+from django.db.models.functions import Cast, Substr
+from django.utils import timezone
+from .models import (CustomUser, Department, Doctor, Staff, Patient, Bed, OPDAppointment,
+                     IPDAdmission, Payment, Prescription, LabReport, ChatSession, ChatMessage)
+from .stats import rebuild_daily_stats
+from .ledger import rebuild_ledger
+from .beds import rebuild_ward_availability
+
+# ============ SYNTHETIC DATASET ============
+# Builds a reproducible hospital dataset with bulk_create: the same seed and
+# size always produce the same rows. Rows are inserted without model signals,
+# so the DailyStats rollup is rebuilt once at the end. Every user shares one
+# pre-computed password hash. PAT/DOC/STF IDs are reserved as one block from
+# their Sequence and bed numbers continue after the highest existing one, so
+# a dataset can be added on top of seed_data or a copy of production.
+
+DEFAULT_SEED = 1234
+DEFAULT_BATCH_SIZE = 2000
+DEFAULT_PASSWORD = 'password123'
+
+DEPARTMENTS = ['Cardiology', 'Neurology', 'Orthopedics', 'Pediatrics', 'General Medicine', 'Dermatology']
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'William', 'Elizabeth',
+               'Aarav', 'Diya', 'Vihaan', 'Ananya', 'Arjun', 'Isha', 'Rohan', 'Kavya', 'Aditya', 'Meera']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Sharma', 'Patel', 'Reddy', 'Iyer', 'Nair', 'Gupta', 'Singh', 'Das', 'Rao', 'Mehta']
+CHAT_PROMPTS = ['What are the OPD timings?', 'How do I book an appointment?', 'Is Dr. available today?',
+                'How can I download my receipt?', 'What documents are needed for admission?']
+CHAT_REPLIES = ['OPD runs from 9 AM to 5 PM, Monday to Saturday.', 'You can book from the Appointments page.',
+                'Please check the doctor schedule on the dashboard.', 'Receipts are under My Bills.',
+                'Please bring a photo ID and previous reports.']
+REASONS = ['Fever', 'Headache', 'Stomach Pain', 'Routine Checkup', 'Follow up', 'Back Pain', 'Cough']
+TESTS = ['CBC', 'X-Ray', 'Typhoid Test', 'Lipid Profile', 'Blood Sugar', 'MRI']
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'O+', 'O-', 'AB+', 'AB-']
+WARDS = [code for code, _ in Bed.WARD_CHOICES]
+
+# Rows generated per patient (or per N patients) at every size
+DOCTORS_PER_PATIENT = 1 / 200
+BEDS_PER_PATIENT = 1 / 50
+APPOINTMENTS_PER_PATIENT = 2
+ADMISSIONS_PER_PATIENT = 1 / 5
+PAYMENTS_PER_PATIENT = 1
+LAB_REPORTS_PER_PATIENT = 1 / 3
+PRESCRIPTIONS_PER_PATIENT = 1 / 2
+CHAT_SESSIONS_PER_PATIENT = 1 / 4
+MAX_MESSAGES_PER_SESSION = 10
+HISTORY_DAYS = 365
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the dates we generate instead of auto_now_add"""
+    fields = [field for model in models for field in model._meta.concrete_fields if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def next_number(model, field, prefix):
+    """1 + the highest numeric suffix of `field` values shaped like PREFIX123"""
+    highest = model.objects.filter(**{f'{field}__regex': rf'^{prefix}[0-9]+$'}).aggregate(
+        highest=Max(Cast(Substr(field, len(prefix) + 1), IntegerField()))
+    )['highest']
+    return (highest or 0) + 1
+
+
+class DatasetGenerator:
+    def __init__(self, patients, seed=DEFAULT_SEED, batch_size=DEFAULT_BATCH_SIZE, log=None):
+        self.patients = patients
+        self.seed = seed
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.password = make_password(DEFAULT_PASSWORD)
+        self.counts = {}
+
+    def rng(self, name):
+        """Independent stream per table, so adding a table never shifts another"""
+        return random.Random(f'{self.seed}:{name}')
+
+    def insert(self, model, rows):
+        """bulk_create `rows` in batches; returns the new primary keys only, to keep memory flat"""
+        pks = []
+        for batch in _batched(rows, self.batch_size):
+            pks.extend(obj.pk for obj in model.objects.bulk_create(batch))
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(pks)
+        self.log(f'{model.__name__}: {len(pks)}')
+        return pks
+
+    def insert_users(self, user_type, usernames):
+        return self.insert(CustomUser, (
+            CustomUser(username=username, password=self.password, user_type=user_type, email=f'{username.lower()}@example.com')
+            for username in usernames
+        ))
+
+
+    def name(self, rng):
+        return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+    def past(self, rng, days=HISTORY_DAYS):
+        return self.now - timedelta(days=rng.randrange(days), hours=rng.randrange(9, 18))
+
+    # --- Tables ---
+
+    def departments(self):
+        existing = {d.name: d.pk for d in Department.objects.filter(name__in=DEPARTMENTS)}
+        missing = [name for name in DEPARTMENTS if name not in existing]
+        pks = self.insert(Department, (Department(name=name) for name in missing))
+        existing.update(zip(missing, pks))
+        return [existing[name] for name in DEPARTMENTS]
+
+    def doctors(self, department_ids):
+        rng = self.rng('doctors')
+        count = max(5, int(self.patients * DOCTORS_PER_PATIENT))
+        ids = Doctor.reserve_doctor_ids(count)
+        user_ids = self.insert_users('doctor', ids)
+        return self.insert(Doctor, (
+            Doctor(user_id=user_id, doctor_id=doctor_id, first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                   department_id=rng.choice(department_ids), specialization='General Physician',
+                   phone=f'90{n:08d}', email=f'{doctor_id.lower()}@example.com', is_first_login=False)
+            for n, (user_id, doctor_id) in enumerate(zip(user_ids, ids))
+        ))
+
+    def staff(self, department_ids):
+        roles = ['Receptionist', 'Receptionist', 'Lab Technician', 'Lab Technician']
+        ids = Staff.reserve_staff_ids(len(roles))
+        user_ids = self.insert_users('staff', ids)
+        self.insert(Staff, (
+            Staff(user_id=user_id, staff_id=staff_id, name=f'{role} {n + 1}', role=role,
+                  department_id=department_ids[0], phone=f'91{n:08d}', email=f'{staff_id.lower()}@example.com')
+            for n, (user_id, staff_id, role) in enumerate(zip(user_ids, ids, roles))
+        ))
+
+    def patient_rows(self):
+        rng = self.rng('patients')
+        ids = Patient.reserve_patient_ids(self.patients)
+        user_ids = self.insert_users('patient', ids)
+        patient_ids = self.insert(Patient, (
+            Patient(user_id=user_id, patient_id=patient_id, name=self.name(rng), age=rng.randint(1, 90),
+                    gender=rng.choice(['Male', 'Female']), blood_group=rng.choice(BLOOD_GROUPS),
+                    phone=f'98{n:08d}', email=f'{patient_id.lower()}@example.com', address='123 Dummy St, City',
+                    created_at=self.past(rng))
+            for n, (user_id, patient_id) in enumerate(zip(user_ids, ids))
+        ))
+        return patient_ids, user_ids
+
+    def _bed_numbers(self, count):
+        start = next_number(Bed, 'bed_number', 'B-')
+        return [f'B-{n:05d}' for n in range(start, start + count)]
+
+    def beds(self):
+        rng = self.rng('beds')
+        count = max(20, int(self.patients * BEDS_PER_PATIENT))
+        beds = [
+            Bed(ward_type=rng.choice(WARDS), bed_number=number, daily_charge=Decimal(rng.choice([500, 1500, 3000, 8000])))
+            for number in self._bed_numbers(count)
+        ]
+        self.insert(Bed, iter(beds))  # bulk_create fills in each bed's pk
+        return beds
+
+    def appointments(self, patient_ids, doctor_ids):
+        rng = self.rng('appointments')
+        count = int(self.patients * APPOINTMENTS_PER_PATIENT)
+
+        def rows():
+            for _ in range(count):
+                # Spread over the past year plus a week of upcoming visits
+                when = self.now + timedelta(days=rng.randrange(-HISTORY_DAYS, 7), hours=rng.randrange(-8, 8))
+                status = 'Pending' if when > self.now else rng.choice(['Completed', 'Completed', 'Completed', 'Cancelled'])
+                yield OPDAppointment(patient_id=rng.choice(patient_ids), doctor_id=rng.choice(doctor_ids), appointment_date=when,
+                                     reason=rng.choice(REASONS), status=status, fee=Decimal(rng.choice([300, 500, 800])),
+                                     visit_type=rng.choice(['New', 'Follow-up']), created_at=when)
+
+        self.insert(OPDAppointment, rows())
+
+    def admissions(self, patient_ids, doctor_ids, beds):
+        rng = self.rng('admissions')
+        count = int(self.patients * ADMISSIONS_PER_PATIENT)
+        free_beds = list(beds)
+        rng.shuffle(free_beds)
+        occupied = []
+
+        def rows():
+            for _ in range(count):
+                admitted = self.past(rng)
+                # Admissions from the last week still hold a bed while any are free
+                current = bool(free_beds) and admitted > self.now - timedelta(days=7)
+                if current:
+                    bed = free_beds.pop()
+                    occupied.append(bed.pk)
+                else:
+                    bed = rng.choice(beds)
+                yield IPDAdmission(patient_id=rng.choice(patient_ids), doctor_id=rng.choice(doctor_ids), admission_date=admitted,
+                                   discharge_date=None if current else admitted + timedelta(days=rng.randint(1, 10)),
+                                   ward_no=bed.ward_type, bed_no=bed.bed_number, bed_id=bed.pk, reason=rng.choice(REASONS),
+                                   status='Admitted' if current else 'Discharged',
+                                   admission_type=rng.choice(['Emergency', 'Planned']))
+
+        self.insert(IPDAdmission, rows())
+        Bed.objects.filter(pk__in=occupied).update(status='Occupied')
+
+    def payments(self, patient_ids):
+        rng = self.rng('payments')
+        count = int(self.patients * PAYMENTS_PER_PATIENT)
+        self.insert(Payment, (
+            Payment(patient_id=rng.choice(patient_ids), amount=Decimal(rng.randrange(200, 20000)),
+                    payment_method=rng.choice(['Cash', 'Online', 'Insurance']), payment_date=self.past(rng),
+                    description=rng.choice(['Consultation', 'Medicine', 'Bed Charge', 'Lab Test']),
+                    transaction_id=f'TXN{n:09d}')
+            for n in range(count)
+        ))
+
+    def lab_reports(self, patient_ids, doctor_ids):
+        rng = self.rng('lab_reports')
+        count = int(self.patients * LAB_REPORTS_PER_PATIENT)
+        self.insert(LabReport, (
+            LabReport(patient_id=rng.choice(patient_ids), doctor_id=rng.choice(doctor_ids), test_name=rng.choice(TESTS),
+                      requested_date=self.past(rng), status=rng.choice(['Pending', 'Uploaded', 'Uploaded']))
+            for _ in range(count)
+        ))
+
+    def prescriptions(self, patient_ids, doctor_ids):
+        rng = self.rng('prescriptions')
+        count = int(self.patients * PRESCRIPTIONS_PER_PATIENT)
+        self.insert(Prescription, (
+            Prescription(patient_id=rng.choice(patient_ids), doctor_id=rng.choice(doctor_ids), diagnosis=rng.choice(REASONS),
+                         medicines='Paracetamol 500mg, twice a day, 5 days', advice='Rest and fluids',
+                         created_at=self.past(rng))
+            for _ in range(count)
+        ))
+
+    def chats(self, user_ids):
+        rng = self.rng('chats')
+        count = int(self.patients * CHAT_SESSIONS_PER_PATIENT)
+        first_session = ChatSession.objects.count()
+        started = [self.past(rng) for _ in range(count)]
+        session_ids = self.insert(ChatSession, (
+            ChatSession(user_id=rng.choice(user_ids), session_id=f'load-{self.seed}-{first_session + n}', started_at=when)
+            for n, when in enumerate(started)
+        ))
+
+        def rows():
+            for session_id, when in zip(session_ids, started):
+                for turn in range(rng.randint(1, MAX_MESSAGES_PER_SESSION // 2)):
+                    asked = when + timedelta(minutes=turn)
+                    yield ChatMessage(session_id=session_id, sender='user', message=rng.choice(CHAT_PROMPTS), timestamp=asked)
+                    yield ChatMessage(session_id=session_id, sender='bot', message=rng.choice(CHAT_REPLIES),
+                                      timestamp=asked + timedelta(seconds=5))
+
+        self.insert(ChatMessage, rows())
+
+    def run(self):
+        timestamped = (Patient, OPDAppointment, IPDAdmission, Payment, LabReport, Prescription, ChatSession, ChatMessage)
+        with transaction.atomic(), explicit_timestamps(*timestamped):
+            department_ids = self.departments()
+            doctor_ids = self.doctors(department_ids)
+            self.staff(department_ids)
+            patient_ids, patient_user_ids = self.patient_rows()
+            beds = self.beds()
+            self.appointments(patient_ids, doctor_ids)
+            self.admissions(patient_ids, doctor_ids, beds)
+            self.payments(patient_ids)
+            self.lab_reports(patient_ids, doctor_ids)
+            self.prescriptions(patient_ids, doctor_ids)
+            self.chats(patient_user_ids)
+        self.log(f'DailyStats: {rebuild_daily_stats()}')
+        self.log('Ledger entries, balances: %d, %d' % rebuild_ledger(self.batch_size))
+        self.log(f'Ward availability: {rebuild_ward_availability()} wards')
+        return self.counts
+
+
+def generate_dataset(patients, seed=DEFAULT_SEED, batch_size=DEFAULT_BATCH_SIZE, log=None):
+    """Add a deterministic dataset sized by `patients` to the database. Returns row counts."""
+    return DatasetGenerator(patients, seed, batch_size, log).run()
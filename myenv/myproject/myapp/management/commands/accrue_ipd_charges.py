@@ -0,0 +1,24 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from myapp.ledger import accrue_ipd_charges
+
+class Command(BaseCommand):
+    help = "Post each admitted patient's daily bed charge to the ledger (run nightly; reruns are no-ops)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to accrue, YYYY-MM-DD (default: yesterday)')
+        parser.add_argument('--days', type=int, default=1,
+                            help='Also accrue this many days back from --date, to catch up missed runs')
+
+    def handle(self, *args, **options):
+        day = timezone.localdate() - timedelta(days=1)
+        if options['date']:
+            day = parse_date(options['date'])
+            if day is None:
+                raise CommandError(f"Invalid date: {options['date']}")
+        for offset in reversed(range(options['days'])):
+            accrual_day = day - timedelta(days=offset)
+            posted = accrue_ipd_charges(accrual_day)
+            self.stdout.write(self.style.SUCCESS(f'{accrual_day}: posted {posted} bed charges'))
@@ -0,0 +1,71 @@
+import json
+from pathlib import Path
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment, override_settings
+from myapp.benchmark import run_routes, scaling_routes, regressions
+from myapp.loadgen import generate_dataset, DEFAULT_SEED
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'query_baseline.json'
+
+
+class Command(BaseCommand):
+    help = 'Measure query count, SQL time and wall time of every named route at several dataset sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help='Patient counts to seed (default: 1000 10000 100000)')
+        parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--write-baseline', action='store_true',
+                            help='Save these results as the new baseline instead of comparing')
+        parser.add_argument('--output', help='Also write the full results to this JSON file')
+
+    def handle(self, *args, **options):
+        baseline_path = Path(options['baseline'])
+        results_by_size = {}
+
+        # Always a throwaway database and a private cache, never the real ones
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+                for size in options['sizes']:
+                    self.stdout.write(self.style.MIGRATE_HEADING(f'Seeding {size} patients...'))
+                    call_command('flush', interactive=False, verbosity=0)
+                    generate_dataset(size, seed=options['seed'])
+                    results_by_size[str(size)] = run_routes(log=self.stdout.write)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {'seed': options['seed'], 'sizes': results_by_size}
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2, sort_keys=True))
+
+        scaling = scaling_routes(results_by_size) if len(results_by_size) > 1 else {}
+        for name, counts in sorted(scaling.items()):
+            self.stdout.write(self.style.WARNING(f'Query count grows with data: {name} {counts}'))
+
+        if options['write_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+
+        if not baseline_path.exists():
+            raise CommandError(f'No baseline at {baseline_path}; run with --write-baseline first')
+        baseline = json.loads(baseline_path.read_text())
+        found = regressions(results_by_size, baseline)
+        for size, name, before, after in found:
+            self.stdout.write(self.style.ERROR(f'{name} at {size} patients: {before} -> {after} queries'))
+        # Routes that already scaled in the baseline are known debt, not regressions
+        known = scaling_routes(baseline['sizes']) if len(baseline['sizes']) > 1 else {}
+        new_scaling = sorted(set(scaling) - set(known))
+        for name in new_scaling:
+            self.stdout.write(self.style.ERROR(f'{name} now scales with data'))
+        if found or new_scaling:
+            raise CommandError(f'{len(found)} query count regressions, {len(new_scaling)} routes newly scale with data')
+        self.stdout.write(self.style.SUCCESS('No query count regressions'))
@@ -0,0 +1,46 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from myapp.models import Patient
+from myapp.reports import receipts_zip
+
+
+class Command(BaseCommand):
+    help = 'Write a ZIP of payment receipts for a date range and/or one patient'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First payment date, YYYY-MM-DD')
+        parser.add_argument('--end', help='Last payment date, YYYY-MM-DD')
+        parser.add_argument('--patient', help='Patient ID (e.g. PAT001)')
+        parser.add_argument('--output', default='receipts.zip', help='ZIP file to write (default: receipts.zip)')
+        parser.add_argument('--processes', type=int, default=settings.RECEIPT_EXPORT_PROCESSES,
+                            help='Processes rendering receipts in parallel')
+
+    def handle(self, *args, **options):
+        dates = {}
+        for name in ('start', 'end'):
+            if options[name]:
+                dates[name] = parse_date(options[name])
+                if dates[name] is None:
+                    raise CommandError(f"Invalid date: {options[name]}")
+        patient_id = None
+        if options['patient']:
+            patient = Patient.objects.filter(patient_id__iexact=options['patient']).only('id').first()
+            if patient is None:
+                raise CommandError(f"No patient with ID {options['patient']}")
+            patient_id = patient.id
+        if not (dates or patient_id):
+            raise CommandError('Give --start/--end, --patient, or both')
+
+        started = time.perf_counter()
+        try:
+            with open(options['output'], 'wb') as out:
+                count = receipts_zip(out, patient_id=patient_id, processes=options['processes'], **dates)
+        except ValueError as exc:
+            os.remove(options['output'])
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} receipts to {options['output']} in {time.perf_counter() - started:.1f}s"
+        ))
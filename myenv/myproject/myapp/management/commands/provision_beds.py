@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from myapp.beds import load_ward_spec, provision_beds
+
+
+class Command(BaseCommand):
+    help = (
+        'Create and reprice beds from a ward spec (CSV with a header row, or a JSON list) with columns '
+        'ward_type, count, daily_charge and optionally prefix, start, digits. '
+        'Existing beds are never deleted or moved.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('spec', help='Ward spec file (.csv or .json)')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would change without writing anything')
+
+    def handle(self, *args, **options):
+        try:
+            plan = provision_beds(load_ward_spec(options['spec']), dry_run=options['dry_run'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        if options['dry_run'] or options['verbosity'] > 1:
+            for bed_number, ward_type, charge in plan['create']:
+                self.stdout.write(f"+ {bed_number:<10} {ward_type:<12} {charge}")
+            for bed_number, ward_type, old, new in plan['reprice']:
+                self.stdout.write(f"~ {bed_number:<10} {ward_type:<12} {old} -> {new}")
+        for bed_number, current_ward, ward_type in plan['conflicts']:
+            self.stdout.write(self.style.WARNING(
+                f"! {bed_number:<10} is a {current_ward} bed, the spec puts it in {ward_type}; left as is"
+            ))
+
+        created, repriced = ('to create', 'to reprice') if options['dry_run'] else ('created', 'repriced')
+        summary = (
+            f"{len(plan['create'])} beds {created}, {len(plan['reprice'])} {repriced}, "
+            f"{plan['unchanged']} unchanged, {len(plan['conflicts'])} conflicts"
+        )
+        if options['dry_run']:
+            self.stdout.write(f"Dry run: {summary}")
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from myapp.otp_utils import cleanup_expired_otps
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and used OTP rows in batches (OTP_STORE=db)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        deleted = cleanup_expired_otps(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} OTPs'))
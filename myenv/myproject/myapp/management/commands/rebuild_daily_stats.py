@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from myapp.stats import rebuild_daily_stats
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailyStats reporting rollup from OPD, IPD and Payment records'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write('Rebuilding daily stats...')
+        count = rebuild_daily_stats()
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt {count} daily stats rows'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from myapp.ledger import rebuild_ledger
+from myapp.models import LedgerEntry
+
+class Command(BaseCommand):
+    help = 'Rebuild patient ledger entries and balances from OPD, IPD and Payment records (adjustments are kept)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-empty', action='store_true',
+                            help='Only build the ledger if it has no entries yet (safe to run on every deploy)')
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and LedgerEntry.objects.exists():
+            self.stdout.write('Ledger already populated, nothing to do')
+            return
+        self.stdout.write('Rebuilding patient ledger...')
+        entries, balances = rebuild_ledger()
+        self.stdout.write(self.style.SUCCESS(f'Successfully posted {entries} ledger entries for {balances} patients'))
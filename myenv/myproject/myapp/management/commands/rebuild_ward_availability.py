@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from myapp.beds import rebuild_ward_availability
+
+class Command(BaseCommand):
+    help = 'Recount the per-ward bed availability counters from the beds table'
+
+    def handle(self, *args, **options):
+        wards = rebuild_ward_availability()
+        self.stdout.write(self.style.SUCCESS(f'Recounted beds in {wards} wards'))
@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from myapp.outbox import DELIVERERS, claim_batch, expire_messages, requeue_stale_messages, purge_finished_messages
+
+PURGE_EVERY = 3600  # seconds between sweeps of old sent/failed messages
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails and SMS from the outbox, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Messages claimed and sent per batch (one SMTP connection each)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait for new messages when the outbox is empty')
+        parser.add_argument('--stale-after', type=int, default=5,
+                            help='Requeue messages that have been sending longer than this many minutes')
+        parser.add_argument('--keep-days', type=int, default=1,
+                            help='Delete sent and failed messages after this many days')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once nothing is due instead of polling forever')
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(minutes=options['stale_after'])
+        last_purge = 0
+        self.stdout.write('Outbox worker started')
+        while True:
+            if time.monotonic() - last_purge > PURGE_EVERY:
+                purged = purge_finished_messages(timedelta(days=options['keep_days']))
+                if purged:
+                    self.stdout.write(f'Purged {purged} old messages')
+                last_purge = time.monotonic()
+            expired = expire_messages()
+            if expired:
+                self.stdout.write(self.style.WARNING(f'{expired} messages expired before delivery'))
+            requeued = requeue_stale_messages(stale_after)
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale messages'))
+
+            busy = False
+            for channel, deliver in DELIVERERS.items():
+                batch = claim_batch(channel, options['batch_size'])
+                if not batch:
+                    continue
+                busy = True
+                sent, failed = deliver(batch)
+                style = self.style.ERROR if failed else self.style.SUCCESS
+                self.stdout.write(style(f'{channel}: {sent} sent, {failed} failed'))
+
+            if not busy:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
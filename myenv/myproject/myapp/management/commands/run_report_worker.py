@@ -0,0 +1,68 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connections
+from myapp.report_worker import init_process, render_job
+from myapp.reports import claim_next_job, requeue_stale_jobs, purge_finished_jobs
+
+PURGE_EVERY = 3600  # seconds between sweeps of old finished jobs
+
+
+class Command(BaseCommand):
+    help = 'Render queued PDF report jobs in a local pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=min(os.cpu_count() or 1, 4),
+                            help='Worker processes rendering in parallel (default: CPU count, at most 4)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait for new jobs when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=30,
+                            help='Requeue jobs that have been running longer than this many minutes')
+        parser.add_argument('--keep-days', type=int, default=7,
+                            help='Delete finished jobs and their files after this many days')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling forever')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale jobs'))
+
+        # Spawned, not forked: children must not share this process's DB connections
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        running = {}
+        last_purge = 0
+        self.stdout.write(f"Report worker started with {options['processes']} processes")
+        with ProcessPoolExecutor(max_workers=options['processes'], mp_context=context, initializer=init_process) as pool:
+            while True:
+                if time.monotonic() - last_purge > PURGE_EVERY:
+                    purged = purge_finished_jobs(timedelta(days=options['keep_days']))
+                    if purged:
+                        self.stdout.write(f'Purged {purged} old jobs')
+                    last_purge = time.monotonic()
+
+                while len(running) < options['processes'] and (job := claim_next_job()):
+                    self.stdout.write(f'Job {job.id}: rendering {job.kind}')
+                    running[pool.submit(render_job, job.id)] = job.id
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        _, status = future.result()
+                    except Exception as exc:
+                        # The process itself died; the job stays running until requeued
+                        self.stdout.write(self.style.ERROR(f'Job {job_id}: worker failed: {exc}'))
+                        continue
+                    style = self.style.SUCCESS if status == 'done' else self.style.ERROR
+                    self.stdout.write(style(f'Job {job_id}: {status}'))
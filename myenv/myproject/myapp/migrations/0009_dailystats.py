@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0008_alter_admin_id_alter_bed_id_alter_bed_ward_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('opd_count', models.IntegerField(default=0)),
+                ('opd_completed', models.IntegerField(default=0)),
+                ('opd_fee_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ipd_admissions', models.IntegerField(default=0)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('payment_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='myapp.department')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('date', 'department')},
+            },
+        ),
+    ]
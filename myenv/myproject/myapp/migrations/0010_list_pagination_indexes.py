@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0009_dailystats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ipdadmission',
+            index=models.Index(fields=['-admission_date', '-id'], name='ipd_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='opdappointment',
+            index=models.Index(fields=['-appointment_date', '-id'], name='opd_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='opdappointment',
+            index=models.Index(fields=['doctor', '-appointment_date', '-id'], name='opd_doctor_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-payment_date', '-id'], name='payment_date_id_idx'),
+        ),
+    ]
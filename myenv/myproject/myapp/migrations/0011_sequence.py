@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:02
+
+from django.db import migrations, models
+from django.db.models import IntegerField, Max
+from django.db.models.functions import Cast, Substr
+
+# Sequence name -> (model, ID field, prefix)
+SEQUENCES = {
+    'patient': ('Patient', 'patient_id', 'PAT'),
+    'doctor': ('Doctor', 'doctor_id', 'DOC'),
+    'staff': ('Staff', 'staff_id', 'STF'),
+}
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each sequence at the highest ID already issued"""
+    Sequence = apps.get_model('myapp', 'Sequence')
+    for name, (model_name, field, prefix) in SEQUENCES.items():
+        model = apps.get_model('myapp', model_name)
+        highest = model.objects.filter(**{f'{field}__regex': rf'^{prefix}[0-9]+$'}).aggregate(
+            highest=Max(Cast(Substr(field, len(prefix) + 1), IntegerField()))
+        )['highest']
+        Sequence.objects.update_or_create(name=name, defaults={'last_value': highest or 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0010_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
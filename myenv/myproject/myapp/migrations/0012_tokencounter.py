@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0011_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('last_token', models.PositiveIntegerField(default=0)),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='myapp.doctor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'doctor'), name='token_counter_day_doctor'), models.UniqueConstraint(condition=models.Q(('doctor__isnull', True)), fields=('day',), name='token_counter_day_no_doctor')],
+            },
+        ),
+    ]
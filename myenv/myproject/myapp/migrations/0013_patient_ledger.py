@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0012_tokencounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientBalance',
+            fields=[
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger_balance', serialize=False, to='myapp.patient')),
+                ('billed', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-balance'], name='patient_balance_debt_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('charge', 'Charge'), ('payment', 'Payment'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('posted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ipd_admission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='myapp.ipdadmission')),
+                ('opd_appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='myapp.opdappointment')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='myapp.patient')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='myapp.payment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['patient', '-posted_at', '-id'], name='ledger_patient_posted_idx')],
+            },
+        ),
+    ]
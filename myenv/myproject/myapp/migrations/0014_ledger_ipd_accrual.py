@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0013_patient_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ledgerentry',
+            name='service_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='ledgerentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('service_date__isnull', False)), fields=('ipd_admission', 'service_date'), name='ledger_ipd_accrual_day'),
+        ),
+    ]
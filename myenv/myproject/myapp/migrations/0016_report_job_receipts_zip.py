@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0015_reportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportjob',
+            name='kind',
+            field=models.CharField(choices=[('doctors', 'All Doctors'), ('patients', 'All Patients'), ('financial', 'Financial Report'), ('receipt', 'Payment Receipt'), ('receipts', 'Payment Receipts (ZIP)')], max_length=20),
+        ),
+    ]
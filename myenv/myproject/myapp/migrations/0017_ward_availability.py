@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:30
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_beds(apps, schema_editor):
+    """Seed the counters from the beds that already exist"""
+    Bed = apps.get_model('myapp', 'Bed')
+    WardAvailability = apps.get_model('myapp', 'WardAvailability')
+    rows = Bed.objects.values('ward_type').annotate(
+        total=Count('id'),
+        available=Count('id', filter=Q(status='Available')),
+        occupied=Count('id', filter=Q(status='Occupied')),
+        maintenance=Count('id', filter=Q(status='Maintenance')),
+    ).order_by()
+    WardAvailability.objects.bulk_create([WardAvailability(**row) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0016_report_job_receipts_zip'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WardAvailability',
+            fields=[
+                ('ward_type', models.CharField(choices=[('General', 'General Ward Bed'), ('SemiPrivate', 'Semi-Private Bed'), ('Private', 'Private Room Bed'), ('Deluxe', 'Deluxe / Suite Bed'), ('ICU', 'ICU Bed'), ('CCU', 'CCU Bed'), ('NICU', 'NICU Bed'), ('PICU', 'PICU Bed'), ('HDU', 'HDU Bed'), ('Emergency', 'Emergency Bed'), ('Recovery', 'Recovery Bed'), ('PostOp', 'Post-Op Bed'), ('Orthopedic', 'Orthopedic Bed')], max_length=20, primary_key=True, serialize=False)),
+                ('total', models.IntegerField(default=0)),
+                ('available', models.IntegerField(default=0)),
+                ('occupied', models.IntegerField(default=0)),
+                ('maintenance', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='bed',
+            index=models.Index(fields=['ward_type', 'status', 'bed_number'], name='bed_ward_status_idx'),
+        ),
+        migrations.RunPython(count_beds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:38
+
+from django.db import migrations, models
+
+
+def retire_plaintext_codes(apps, schema_editor):
+    """Outstanding OTPs were stored in clear and cannot be checked against a hash"""
+    OTP = apps.get_model('myapp', 'OTP')
+    OTP.objects.filter(is_verified=False).update(is_verified=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0018_outbound_message'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='otp',
+            name='otp_code',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(condition=models.Q(('is_verified', False)), fields=['user', '-created_at'], name='otp_active_idx'),
+        ),
+        migrations.RunPython(retire_plaintext_codes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:48
+
+from django.db import migrations, models
+from django.db.models import Count
+
+STATS_FIELDS = ('opd_count', 'opd_completed', 'opd_fee_total', 'ipd_admissions', 'payment_count', 'payment_total')
+
+
+def merge_null_department_rows(apps, schema_editor):
+    """Fold duplicate (date, NULL) rows left by deleted departments into one per date"""
+    DailyStats = apps.get_model('myapp', 'DailyStats')
+    duplicated = DailyStats.objects.filter(department__isnull=True).values('date').annotate(
+        rows=Count('id')
+    ).filter(rows__gt=1).values_list('date', flat=True)
+    for day in list(duplicated):
+        keep, *extra = DailyStats.objects.filter(date=day, department__isnull=True).order_by('id')
+        for row in extra:
+            for field in STATS_FIELDS:
+                setattr(keep, field, getattr(keep, field) + getattr(row, field))
+            row.delete()
+        keep.save(update_fields=STATS_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0019_otp_hashed_codes'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='dailystats',
+            unique_together=set(),
+        ),
+        migrations.RunPython(merge_null_department_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailystats',
+            constraint=models.UniqueConstraint(fields=('date', 'department'), name='daily_stats_date_department'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('department__isnull', True)), fields=('date',), name='daily_stats_date_no_department'),
+        ),
+    ]
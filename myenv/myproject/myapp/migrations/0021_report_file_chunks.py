@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0020_daily_stats_null_department'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportjob',
+            name='kind',
+            field=models.CharField(choices=[('doctors', 'All Doctors'), ('patients', 'All Patients'), ('financial', 'Financial Report'), ('receipts', 'Payment Receipts (ZIP)')], max_length=20),
+        ),
+        migrations.RemoveField(
+            model_name='reportjob',
+            name='file',
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ReportFileChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='myapp.reportjob')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('job', 'seq'), name='report_chunk_job_seq')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from datetime import timedelta
@@ -77,13 +78,12 @@ class Doctor(models.Model):
     
     @staticmethod
     def generate_doctor_id():
-        last_doctor = Doctor.objects.all().order_by('id').last()
-        if last_doctor:
-            last_id = int(last_doctor.doctor_id[3:])
-            new_id = f"DOC{last_id + 1:03d}"
-        else:
-            new_id = "DOC001"
-        return new_id
+        return Sequence.next_ids('doctor', 'DOC')[0]
+
+    @staticmethod
+    def reserve_doctor_ids(count):
+        """Block of `count` consecutive IDs in one round trip, for bulk imports"""
+        return Sequence.next_ids('doctor', 'DOC', count)
 
     def save(self, *args, **kwargs):
         if not self.doctor_id:
@@ -110,13 +110,12 @@ class Staff(models.Model):
         
     @staticmethod
     def generate_staff_id():
-        last_staff = Staff.objects.all().order_by('id').last()
-        if last_staff:
-            last_id = int(last_staff.staff_id[3:])
-            new_id = f"STF{last_id + 1:03d}"
-        else:
-            new_id = "STF001"
-        return new_id
+        return Sequence.next_ids('staff', 'STF')[0]
+
+    @staticmethod
+    def reserve_staff_ids(count):
+        """Block of `count` consecutive IDs in one round trip, for bulk imports"""
+        return Sequence.next_ids('staff', 'STF', count)
 
     def save(self, *args, **kwargs):
         if not self.staff_id:
@@ -145,13 +144,12 @@ class Patient(models.Model):
     
     @staticmethod
     def generate_patient_id():
-        last_patient = Patient.objects.all().order_by('id').last()
-        if last_patient:
-            last_id = int(last_patient.patient_id[3:])
-            new_id = f"PAT{last_id + 1:03d}"
-        else:
-            new_id = "PAT001"
-        return new_id
+        return Sequence.next_ids('patient', 'PAT')[0]
+
+    @staticmethod
+    def reserve_patient_ids(count):
+        """Block of `count` consecutive IDs in one round trip, for bulk imports"""
+        return Sequence.next_ids('patient', 'PAT', count)
 
     def save(self, *args, **kwargs):
         if not self.patient_id:
@@ -186,6 +184,13 @@ class OPDAppointment(models.Model):
         doctor_name = self.doctor.name if self.doctor else "Unknown Doctor"
         return f"OPD - {self.patient.name} with {doctor_name}"
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the appointment lists (see pagination.py)
+            models.Index(fields=['-appointment_date', '-id'], name='opd_date_id_idx'),
+            models.Index(fields=['doctor', '-appointment_date', '-id'], name='opd_doctor_date_id_idx'),
+        ]
+
 class Bed(models.Model):
     WARD_CHOICES = (
         ('General', 'General Ward Bed'),
@@ -215,6 +220,12 @@ class Bed(models.Model):
     def __str__(self):
         return f"{self.ward_type} - {self.bed_number} ({self.status})"
 
+    class Meta:
+        indexes = [
+            # "First free bed in ward X" (beds.py)
+            models.Index(fields=['ward_type', 'status', 'bed_number'], name='bed_ward_status_idx'),
+        ]
+
 class IPDAdmission(models.Model):
     STATUS_CHOICES = (
         ('Admitted', 'Admitted'),
@@ -242,6 +253,11 @@ class IPDAdmission(models.Model):
     def __str__(self):
         return f"IPD - {self.patient.name} (Bed: {self.bed_no})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-admission_date', '-id'], name='ipd_date_id_idx'),
+        ]
+
 class Payment(models.Model):
     PAYMENT_METHOD_CHOICES = (
         ('Cash', 'Cash'),
@@ -263,9 +279,16 @@ class Payment(models.Model):
     def __str__(self):
         return f"{self.patient.name} - {self.amount}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-payment_date', '-id'], name='payment_date_id_idx'),
+        ]
+
 class OTP(models.Model):
+    """An issued OTP when settings.OTP_STORE is 'db' (see otp_store.py)"""
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='otps')
-    otp_code = models.CharField(max_length=6)
+    # HMAC of the code (otp_store.hash_otp), never the code itself
+    otp_code = models.CharField(max_length=64)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
     is_verified = models.BooleanField(default=False)
@@ -280,10 +303,14 @@ class OTP(models.Model):
         return timezone.now() > self.expires_at
     
     def __str__(self):
-        return f"OTP for {self.user.username} - {self.otp_code}"
+        return f"OTP for {self.user.username}"
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The "latest unverified OTP" lookup; used rows drop out of the index
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_verified=False), name='otp_active_idx'),
+        ]
 
 # ============ NEW MODELS FOR RECEPTIONIST DASHBOARD ============
 
@@ -354,3 +381,305 @@ class DischargeSummary(models.Model):
 
     def __str__(self):
         return f"Discharge Summary - {self.patient.name}"
+
+# ============ REPORTING ROLLUPS ============
+
+class DailyStats(models.Model):
+    """
+    Per-day, per-department totals kept current by signals (see signals.py).
+    Payments carry no department, so they land on the department=None row,
+    as do the rows of a deleted department or doctor. Rebuild from scratch with `python manage.py rebuild_daily_stats`.
+    """
+    date = models.DateField()
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True)
+    opd_count = models.IntegerField(default=0)
+    opd_completed = models.IntegerField(default=0)
+    opd_fee_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ipd_admissions = models.IntegerField(default=0)
+    payment_count = models.IntegerField(default=0)
+    payment_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Stats {self.date} - {self.department or 'All'}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'department'], name='daily_stats_date_department'),
+            # NULLs never collide in a unique index, so the no-department bucket needs its own
+            models.UniqueConstraint(fields=['date'], condition=models.Q(department__isnull=True), name='daily_stats_date_no_department'),
+        ]
+        ordering = ['-date']
+
+# ============ ID SEQUENCES ============
+
+class Sequence(models.Model):
+    """
+    Named counters behind the PAT/DOC/STF business IDs. Allocation is a
+    single UPDATE ... SET last_value = last_value + n, so concurrent
+    registrations queue on the row lock instead of reading the same
+    "last" row, and the cost does not grow with the table.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+    @classmethod
+    def reserve(cls, name, count=1):
+        """Reserve `count` consecutive values and return the first one"""
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(last_value=F('last_value') + count):
+                cls.objects.get_or_create(name=name)
+                cls.objects.filter(name=name).update(last_value=F('last_value') + count)
+            # Still holding the row lock, so this is our own increment
+            last_value = cls.objects.filter(name=name).values_list('last_value', flat=True).get()
+        return last_value - count + 1
+
+    @classmethod
+    def next_ids(cls, name, prefix, count=1):
+        """IDs in the existing PAT001 style; numbers past 999 simply grow wider"""
+        first = cls.reserve(name, count)
+        return [f"{prefix}{value:03d}" for value in range(first, first + count)]
+
+
+# ============ OPD TOKENS ============
+
+class TokenCounter(models.Model):
+    """
+    Last OPD token issued per day and doctor (doctor=None for registrations
+    without one). Each doctor's queue starts again at 1 every day.
+    """
+    day = models.DateField()
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, null=True, blank=True)
+    last_token = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} - {self.doctor or 'No doctor'}: {self.last_token}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'doctor'], name='token_counter_day_doctor'),
+            # NULLs never collide in a unique index, so the no-doctor series needs its own
+            models.UniqueConstraint(fields=['day'], condition=models.Q(doctor__isnull=True), name='token_counter_day_no_doctor'),
+        ]
+
+    @classmethod
+    def issue(cls, doctor_id, day=None):
+        """
+        Next token for `doctor_id` on `day` (default today). Call it inside the
+        transaction that creates the appointment: the counter row stays locked
+        until commit, and a rollback hands the token back.
+        """
+        day = day or timezone.localdate()
+        counter = cls.objects.filter(day=day, doctor_id=doctor_id)
+        with transaction.atomic():
+            if not counter.update(last_token=F('last_token') + 1):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(day=day, doctor_id=doctor_id, last_token=1)
+                    return 1
+                except IntegrityError:
+                    # Another registration created today's row first
+                    counter.update(last_token=F('last_token') + 1)
+            return counter.values_list('last_token', flat=True).get()
+
+
+# ============ PATIENT LEDGER ============
+
+class LedgerEntry(models.Model):
+    """
+    Append-only record of what a patient was charged and what they paid.
+    Amounts are signed (charges positive, payments negative, adjustments
+    either way) so a balance is a plain sum. Corrections post the difference
+    as a new entry instead of editing an old one; see ledger.py.
+    """
+    CHARGE = 'charge'
+    PAYMENT = 'payment'
+    ADJUSTMENT = 'adjustment'
+    ENTRY_TYPES = (
+        (CHARGE, 'Charge'),
+        (PAYMENT, 'Payment'),
+        (ADJUSTMENT, 'Adjustment'),
+    )
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='ledger_entries')
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    description = models.CharField(max_length=255, blank=True)
+    posted_at = models.DateTimeField(default=timezone.now)
+    # Day a nightly bed charge accrues for (see accrue_ipd_charges)
+    service_date = models.DateField(null=True, blank=True)
+    # What the entry is for; kept as history when the source row is deleted
+    opd_appointment = models.ForeignKey(OPDAppointment, on_delete=models.SET_NULL, null=True, blank=True)
+    ipd_admission = models.ForeignKey(IPDAdmission, on_delete=models.SET_NULL, null=True, blank=True)
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_entry_type_display()} {self.amount} - {self.patient.name}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', '-posted_at', '-id'], name='ledger_patient_posted_idx'),
+        ]
+        constraints = [
+            # One bed charge per admission per day, however often the job runs
+            models.UniqueConstraint(fields=['ipd_admission', 'service_date'], condition=models.Q(service_date__isnull=False),
+                                    name='ledger_ipd_accrual_day'),
+        ]
+
+
+class PatientBalance(models.Model):
+    """
+    Running totals of a patient's ledger, moved in the same transaction as
+    every entry posted. billed covers charges and adjustments, paid covers
+    payments, and balance = billed - paid is what the patient owes.
+    """
+    patient = models.OneToOneField(Patient, on_delete=models.CASCADE, primary_key=True, related_name='ledger_balance')
+    billed = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.patient.name}: {self.balance}"
+
+    class Meta:
+        indexes = [
+            # Top debtors on the admin billing page
+            models.Index(fields=['-balance'], name='patient_balance_debt_idx'),
+        ]
+
+
+# ============ REPORT JOBS ============
+
+class ReportJob(models.Model):
+    """
+    A PDF (or ZIP of receipts) export rendered off the request path by
+    `python manage.py run_report_worker`. The view that queues it returns the job id; the
+    client polls the status until it is done and then downloads the output
+    from its chunks.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    KIND_CHOICES = (
+        ('doctors', 'All Doctors'),
+        ('patients', 'All Patients'),
+        ('financial', 'Financial Report'),
+        ('receipts', 'Payment Receipts (ZIP)'),
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    requested_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True, related_name='report_jobs')
+    filename = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.id} ({self.status})"
+
+    class Meta:
+        indexes = [
+            # The worker's "oldest queued job" lookup
+            models.Index(fields=['status', 'created_at'], name='report_job_queue_idx'),
+        ]
+
+
+class ReportFileChunk(models.Model):
+    """
+    A finished report's output, in pieces of up to REPORT_CHUNK_BYTES. The
+    report worker and the web service run on separate machines in
+    production, so output is kept in the database rather than on the
+    worker's disk, and streamed back one chunk at a time.
+    """
+    job = models.ForeignKey(ReportJob, on_delete=models.CASCADE, related_name='chunks')
+    seq = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f"Report #{self.job_id} chunk {self.seq}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'seq'], name='report_chunk_job_seq'),
+        ]
+
+
+# ============ BED AVAILABILITY ============
+
+class WardAvailability(models.Model):
+    """
+    Bed counts per ward type, moved in the same transaction as every bed
+    claim, release, add, edit and delete (see beds.py), so free counts per
+    ward are a 13-row read. Rebuild with
+    `python manage.py rebuild_ward_availability`.
+    """
+    ward_type = models.CharField(max_length=20, choices=Bed.WARD_CHOICES, primary_key=True)
+    total = models.IntegerField(default=0)
+    available = models.IntegerField(default=0)
+    occupied = models.IntegerField(default=0)
+    maintenance = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.ward_type}: {self.available}/{self.total} free"
+
+
+# ============ OUTBOX ============
+
+class OutboundMessage(models.Model):
+    """
+    An email or SMS waiting to be sent. Views write it in their own
+    transaction and return; `python manage.py run_outbox_worker` delivers
+    it, retrying with backoff, so SMTP/Twilio latency never sits in a request.
+    """
+    EMAIL = 'email'
+    SMS = 'sms'
+    CHANNEL_CHOICES = (
+        (EMAIL, 'Email'),
+        (SMS, 'SMS'),
+    )
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)
+    sender = models.CharField(max_length=254, blank=True)
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Not worth sending after this (e.g. an OTP that has already expired)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_channel_display()} to {self.recipient} ({self.status})"
+
+    class Meta:
+        indexes = [
+            # The worker's "due pending messages" lookup
+            models.Index(fields=['status', 'channel', 'next_attempt_at'], name='outbox_queue_idx'),
+        ]
@@ -0,0 +1,153 @@
+import secrets
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+from .models import OTP
+
+# ============ OTP STORES ============
+# Where issued OTPs live between login and verification. Codes are kept only
+# as an HMAC keyed on SECRET_KEY and the user, expire after OTP_TTL, and
+# allow MAX_ATTEMPTS guesses, each counted atomically before the comparison
+# so concurrent guesses cannot exceed it. A successful check consumes the
+# code, so it works once. settings.OTP_STORE picks the store:
+#   'cache' - the shared cache, so a login writes nothing to the database.
+#             Expiry is the cache TTL; attempts use cache.incr(), which is
+#             only atomic on the backends in ATOMIC_INCR_BACKENDS, so any
+#             other backend (e.g. the file-based cache) is refused at startup.
+#             The default when REDIS_URL is set.
+#   'db'    - OTP rows, read through a partial index on unverified rows;
+#             attempts are conditional UPDATEs. Expired and used rows are
+#             removed by `manage.py purge_otps`. The default otherwise.
+
+OTP_TTL = timedelta(minutes=5)
+MAX_ATTEMPTS = 3
+
+ATOMIC_INCR_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    # Atomic, but private to one process: tests and single-process runs only
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+VERIFIED = "OTP verified successfully!"
+EXPIRED = "OTP has expired. Please request a new one."
+NO_ATTEMPTS_LEFT = "Maximum attempts reached. Please request a new OTP."
+NOT_FOUND = "No active OTP found. Please request a new one."
+
+
+def hash_otp(user_id, otp_code):
+    return salted_hmac('myapp.otp', f'{user_id}:{otp_code}', algorithm='sha256').hexdigest()
+
+
+def _invalid(attempts):
+    return False, f"Invalid OTP. {MAX_ATTEMPTS - attempts} attempts remaining."
+
+
+class OTPStore:
+    """Interface for OTP stores"""
+
+    def issue(self, user, otp_code):
+        """Store `otp_code` as the user's only valid OTP; returns when it expires"""
+        raise NotImplementedError
+
+    def verify(self, user, otp_code):
+        """(ok, message) for a guess at the user's current OTP"""
+        raise NotImplementedError
+
+
+class CacheOTPStore(OTPStore):
+    """
+    One entry per user holding the code hash and a nonce; attempts are
+    counted under a key that includes the nonce, so a new OTP starts a new
+    count. Both expire with the OTP, so nothing needs purging.
+    """
+    KEY = 'otp:{user_id}'
+    ATTEMPTS_KEY = 'otp:{user_id}:{nonce}:attempts'
+
+    def __init__(self):
+        backend = settings.CACHES['default']['BACKEND']
+        if backend not in ATOMIC_INCR_BACKENDS:
+            raise ImproperlyConfigured(
+                f"OTP_STORE='cache' needs a cache with an atomic incr() (e.g. Redis); {backend} has none. "
+                "Set REDIS_URL or use OTP_STORE='db'."
+            )
+
+    def issue(self, user, otp_code):
+        nonce = secrets.token_hex(8)
+        ttl = int(OTP_TTL.total_seconds())
+        cache.set(self.ATTEMPTS_KEY.format(user_id=user.pk, nonce=nonce), 0, ttl)
+        cache.set(self.KEY.format(user_id=user.pk), {'hash': hash_otp(user.pk, otp_code), 'nonce': nonce}, ttl)
+        return timezone.now() + OTP_TTL
+
+    def verify(self, user, otp_code):
+        key = self.KEY.format(user_id=user.pk)
+        entry = cache.get(key)
+        if entry is None:
+            return False, EXPIRED
+        try:
+            attempts = cache.incr(self.ATTEMPTS_KEY.format(user_id=user.pk, nonce=entry['nonce']))
+        except ValueError:
+            # The counter expired between the two reads
+            return False, EXPIRED
+        if attempts > MAX_ATTEMPTS:
+            return False, NO_ATTEMPTS_LEFT
+        if not constant_time_compare(entry['hash'], hash_otp(user.pk, otp_code or '')):
+            return _invalid(attempts)
+        # Only the request that removes the entry logs in
+        if not cache.delete(key):
+            return False, EXPIRED
+        return True, VERIFIED
+
+
+class DatabaseOTPStore(OTPStore):
+    """OTP rows; attempts and use are conditional UPDATEs rather than read-modify-write"""
+
+    def issue(self, user, otp_code):
+        with transaction.atomic():
+            # Invalidate any existing OTPs
+            OTP.objects.filter(user=user, is_verified=False).update(is_verified=True)
+            otp = OTP.objects.create(
+                user=user, otp_code=hash_otp(user.pk, otp_code), expires_at=timezone.now() + OTP_TTL
+            )
+        return otp.expires_at
+
+    def verify(self, user, otp_code):
+        # Served by otp_active_idx
+        otp = OTP.objects.filter(user=user, is_verified=False).order_by('-created_at').first()
+        if otp is None:
+            return False, NOT_FOUND
+        if otp.is_expired():
+            return False, EXPIRED
+        if not OTP.objects.filter(pk=otp.pk, attempts__lt=MAX_ATTEMPTS).update(attempts=F('attempts') + 1):
+            return False, NO_ATTEMPTS_LEFT
+        if not constant_time_compare(otp.otp_code, hash_otp(user.pk, otp_code or '')):
+            return _invalid(otp.attempts + 1)
+        if not OTP.objects.filter(pk=otp.pk, is_verified=False).update(is_verified=True):
+            return False, NOT_FOUND
+        return True, VERIFIED
+
+    def purge(self, batch_size=1000):
+        """Delete expired and used rows, `batch_size` at a time so no long lock is held"""
+        stale = OTP.objects.filter(Q(expires_at__lt=timezone.now()) | Q(is_verified=True))
+        total = 0
+        while True:
+            ids = list(stale.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return total
+            total += OTP.objects.filter(pk__in=ids).delete()[0]
+
+
+OTP_STORES = {
+    'cache': CacheOTPStore,
+    'db': DatabaseOTPStore,
+}
+
+
+def get_otp_store():
+    return OTP_STORES[getattr(settings, 'OTP_STORE', 'db')]()
@@ -1,14 +1,14 @@
 import random
-from django.core.mail import send_mail
-from django.utils import timezone
-from .models import OTP
+from django.db import transaction
+from .otp_store import get_otp_store, DatabaseOTPStore
+from .outbox import enqueue_email, enqueue_sms
 
 def generate_otp():
     """Generate a random 6-digit OTP"""
     return str(random.randint(100000, 999999))
 
-def send_otp_email(user, otp_code):
-    """Send OTP to user's email"""
+def send_otp_email(user, otp_code, expires_at=None):
+    """Queue the OTP email for the outbox worker"""
     subject = 'Your OTP for Hospital Management System'
     message = f'''
 Hello {user.username},
@@ -22,106 +22,35 @@ If you didn't request this, please ignore this email.
 Best regards,
 Hospital Management Team
     '''
-    
-    try:
-        send_mail(
-            subject,
-            message,
-            'noreply@hospital.com',
-            [user.email],
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
-
-from django.conf import settings
-try:
-    from twilio.rest import Client
-except ImportError:
-    Client = None
+    enqueue_email(user.email, subject, message, expires_at=expires_at)
+    return True
 
-def send_otp_sms(user, otp_code):
-    """Send OTP to user's phone via Twilio"""
+def send_otp_sms(user, otp_code, expires_at=None):
+    """Queue the OTP SMS for the outbox worker (sent via Twilio when configured)"""
     if not user.phone:
         return False
         
     message_body = f"Your OTP for Hospital Management System is: {otp_code}. Valid for 5 minutes."
-    
-    # Check if Twilio is configured
-    account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
-    auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
-    from_number = getattr(settings, 'TWILIO_FROM_NUMBER', None)
-    
-    if account_sid and auth_token and from_number and Client:
-        try:
-            client = Client(account_sid, auth_token)
-            message = client.messages.create(
-                body=message_body,
-                from_=from_number,
-                to=user.phone
-            )
-            print(f"SMS sent successfully via Twilio: {message.sid}")
-            return True
-        except Exception as e:
-            print(f"Error sending SMS via Twilio: {e}")
-            return False
-            
-    else:
-        # Fallback to Mock if keys are missing
-        print("="*50)
-        print("TWILIO CREDENTIALS MISSING - FALLING BACK TO MOCK")
-        print(f"Sending SMS to {user.phone}:")
-        print(message_body)
-        print("="*50)
-        return True
+    enqueue_sms(user.phone, message_body, expires_at=expires_at)
+    return True
 
 def create_otp(user):
-    """Create and save OTP for user"""
-    # Invalidate any existing OTPs
-    OTP.objects.filter(user=user, is_verified=False).update(is_verified=True)
-    
-    # Generate new OTP
+    """Issue a new OTP for user (replacing any earlier one) and queue it for delivery"""
     otp_code = generate_otp()
-    otp = OTP.objects.create(user=user, otp_code=otp_code)
-    
-    # Send OTP via Email and SMS
-    send_otp_email(user, otp_code)
-    # send_otp_sms(user, otp_code) # SMS disabled per user request
+    # With the database store, the OTP and its messages commit together
+    with transaction.atomic():
+        expires_at = get_otp_store().issue(user, otp_code)
+        
+        # Send OTP via Email and SMS
+        send_otp_email(user, otp_code, expires_at=expires_at)
+        # send_otp_sms(user, otp_code, expires_at=expires_at) # SMS disabled per user request
     
-    return otp
+    return expires_at
 
 def verify_otp(user, otp_code):
     """Verify OTP for user"""
-    try:
-        otp = OTP.objects.filter(
-            user=user,
-            is_verified=False
-        ).latest('created_at')
-        
-        # Check if expired
-        if otp.is_expired():
-            return False, "OTP has expired. Please request a new one."
-        
-        # Check attempts
-        if otp.attempts >= 3:
-            return False, "Maximum attempts reached. Please request a new OTP."
-        
-        # Verify code
-        if otp.otp_code == otp_code:
-            otp.is_verified = True
-            otp.save()
-            return True, "OTP verified successfully!"
-        else:
-            otp.attempts += 1
-            otp.save()
-            remaining = 3 - otp.attempts
-            return False, f"Invalid OTP. {remaining} attempts remaining."
-            
-    except OTP.DoesNotExist:
-        return False, "No active OTP found. Please request a new one."
+    return get_otp_store().verify(user, otp_code)
 
-def cleanup_expired_otps():
-    """Delete expired OTPs"""
-    OTP.objects.filter(expires_at__lt=timezone.now()).delete()
+def cleanup_expired_otps(batch_size=1000):
+    """Delete expired and used OTP rows in batches; returns how many"""
+    return DatabaseOTPStore().purge(batch_size)
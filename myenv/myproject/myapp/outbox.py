@@ -0,0 +1,180 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from .models import OutboundMessage
+
+try:
+    from twilio.rest import Client
+except ImportError:
+    Client = None
+
+logger = logging.getLogger(__name__)
+
+# ============ OUTBOX ============
+# Messages are rows written in the caller's transaction (a rolled-back login
+# sends nothing) and delivered by run_outbox_worker. A worker claims a batch
+# with select_for_update(skip_locked=True), so several workers can drain the
+# same table. Email goes out over one SMTP connection per batch. A failed
+# message is retried after RETRY_BASE_DELAY, doubling each time, until
+# MAX_ATTEMPTS or its expires_at. Bodies carry OTP codes, so they are blanked
+# as soon as a message is sent or given up on; only the envelope is kept.
+
+DEFAULT_SENDER = 'noreply@hospital.com'
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(seconds=15)
+
+
+def enqueue_email(recipient, subject, body, sender=DEFAULT_SENDER, expires_at=None):
+    return OutboundMessage.objects.create(
+        channel=OutboundMessage.EMAIL, recipient=recipient, sender=sender,
+        subject=subject, body=body, expires_at=expires_at,
+    )
+
+
+def enqueue_sms(recipient, body, expires_at=None):
+    return OutboundMessage.objects.create(
+        channel=OutboundMessage.SMS, recipient=recipient, body=body, expires_at=expires_at,
+    )
+
+
+def claim_batch(channel, size):
+    """Mark up to `size` due messages on `channel` as sending and return them, oldest first"""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(OutboundMessage.objects.select_for_update(skip_locked=True).filter(
+            status=OutboundMessage.PENDING, channel=channel, next_attempt_at__lte=now
+        ).order_by('next_attempt_at')[:size])
+        OutboundMessage.objects.filter(pk__in=[message.pk for message in batch]).update(
+            status=OutboundMessage.SENDING, claimed_at=now
+        )
+    return batch
+
+
+def _mark_sent(messages):
+    OutboundMessage.objects.filter(pk__in=[message.pk for message in messages]).update(
+        status=OutboundMessage.SENT, sent_at=timezone.now(), error='', body=''
+    )
+
+
+def _mark_failed(message, exc):
+    """Schedule a retry with backoff, or give up after MAX_ATTEMPTS / once expired"""
+    now = timezone.now()
+    attempts = message.attempts + 1
+    retry_at = now + RETRY_BASE_DELAY * 2 ** (attempts - 1)
+    expired = message.expires_at is not None and retry_at > message.expires_at
+    update = {'attempts': attempts, 'next_attempt_at': retry_at, 'error': str(exc)[:1000]}
+    if attempts >= MAX_ATTEMPTS or expired:
+        update.update(status=OutboundMessage.FAILED, body='')
+    else:
+        update.update(status=OutboundMessage.PENDING)
+    OutboundMessage.objects.filter(pk=message.pk).update(**update)
+    return update['status']
+
+
+def _drop_expired(messages):
+    """Fail messages that expired while queued; returns the rest"""
+    now = timezone.now()
+    live, expired = [], []
+    for message in messages:
+        (expired if message.expires_at and message.expires_at < now else live).append(message)
+    if expired:
+        OutboundMessage.objects.filter(pk__in=[message.pk for message in expired]).update(
+            status=OutboundMessage.FAILED, error='Expired before delivery', body=''
+        )
+    return live
+
+
+def deliver_emails(messages):
+    """
+    Send claimed email messages over one SMTP connection. Each goes through
+    send_messages() on that open connection, so a refused recipient fails
+    only its own row. Returns (sent, failed).
+    """
+    messages = _drop_expired(messages)
+    if not messages:
+        return 0, 0
+    sent, failed = [], []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for message in messages:
+            email = EmailMessage(
+                message.subject, message.body, message.sender or DEFAULT_SENDER,
+                [message.recipient], connection=connection,
+            )
+            try:
+                connection.send_messages([email])
+                sent.append(message)
+            except Exception as exc:
+                failed.append(message)
+                _mark_failed(message, exc)
+                # The session may be unusable after an error; start a new one
+                connection.close()
+                connection.open()
+    except Exception as exc:
+        # Server unreachable: whatever was not attempted waits for its retry
+        attempted = {message.pk for message in sent + failed}
+        for message in messages:
+            if message.pk not in attempted:
+                failed.append(message)
+                _mark_failed(message, exc)
+    finally:
+        connection.close()
+        _mark_sent(sent)
+    return len(sent), len(failed)
+
+
+def _send_sms(recipient, body):
+    """Send one SMS via Twilio, or log it when Twilio is not configured"""
+    account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
+    auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
+    from_number = getattr(settings, 'TWILIO_FROM_NUMBER', None)
+    if not (account_sid and auth_token and from_number and Client):
+        logger.info("Twilio not configured, SMS to %s not sent: %s", recipient, body)
+        return
+    Client(account_sid, auth_token).messages.create(body=body, from_=from_number, to=recipient)
+
+
+def deliver_sms(messages):
+    """Send claimed SMS messages; returns (sent, failed)"""
+    sent, failed = [], 0
+    for message in _drop_expired(messages):
+        try:
+            _send_sms(message.recipient, message.body)
+            sent.append(message)
+        except Exception as exc:
+            failed += 1
+            _mark_failed(message, exc)
+    _mark_sent(sent)
+    return len(sent), failed
+
+
+DELIVERERS = {
+    OutboundMessage.EMAIL: deliver_emails,
+    OutboundMessage.SMS: deliver_sms,
+}
+
+
+def requeue_stale_messages(older_than):
+    """Messages left sending by a worker that died mid-batch go back in the queue"""
+    return OutboundMessage.objects.filter(
+        status=OutboundMessage.SENDING, claimed_at__lt=timezone.now() - older_than
+    ).update(status=OutboundMessage.PENDING, claimed_at=None)
+
+
+def expire_messages():
+    """Give up on queued messages past their expires_at (e.g. while no worker ran)"""
+    return OutboundMessage.objects.filter(
+        status=OutboundMessage.PENDING, expires_at__lt=timezone.now()
+    ).update(status=OutboundMessage.FAILED, error='Expired before delivery', body='')
+
+
+def purge_finished_messages(older_than):
+    """Delete sent and failed messages (their bodies are already blank)"""
+    count, _ = OutboundMessage.objects.filter(
+        status__in=[OutboundMessage.SENT, OutboundMessage.FAILED], created_at__lt=timezone.now() - older_than
+    ).delete()
+    return count
@@ -0,0 +1,151 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# ============ KEYSET (CURSOR) PAGINATION ============
+# Pages are addressed by the sort key of their edge row instead of an OFFSET,
+# so fetching page 1,000 costs the same index range scan as page 1 no matter
+# how large the table grows. Cursor tokens are opaque to the browser.
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor, query_params):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._query_params = query_params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def _url(self, cursor):
+        params = self._query_params.copy()
+        params['cursor'] = cursor
+        return '?' + params.urlencode()
+
+    @property
+    def next_url(self):
+        return self._url(self.next_cursor) if self.has_next else None
+
+    @property
+    def previous_url(self):
+        return self._url(self.previous_cursor) if self.has_previous else None
+
+
+class KeysetPaginator:
+    """
+    Paginate `queryset` on a unique ordering, e.g. ('-appointment_date', '-id').
+    The last key must be unique (normally the primary key) and the key fields
+    must not be NULL.
+    """
+
+    def __init__(self, queryset, ordering, per_page=DEFAULT_PAGE_SIZE):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [queryset.model._meta.get_field(key.lstrip('-')) for key in self.ordering]
+
+    # --- Cursor encoding ---
+
+    def encode_cursor(self, obj, direction):
+        values = [field.value_to_string(obj) for field in self.fields]
+        raw = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, raw_values = data['d'], data['v']
+            if direction not in ('n', 'p') or len(raw_values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            values = [field.to_python(value) for field, value in zip(self.fields, raw_values)]
+        except (ValueError, KeyError, TypeError, ValidationError):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    # --- Query building ---
+
+    def _seek(self, values, forward):
+        """
+        Rows strictly after (forward) or before (backward) `values` in the
+        page ordering: (a > a0) OR (a = a0 AND b > b0) OR ...
+        """
+        condition = Q()
+        for i, key in enumerate(self.ordering):
+            descending = key.startswith('-')
+            name = key.lstrip('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[i]})
+            for prev_key, prev_value in zip(self.ordering[:i], values[:i]):
+                term &= Q(**{prev_key.lstrip('-'): prev_value})
+            condition |= term
+        return condition
+
+    def _reversed_ordering(self):
+        return [key[1:] if key.startswith('-') else f'-{key}' for key in self.ordering]
+
+    def page(self, cursor=None, query_params=None):
+        """Return the page after/before `cursor` (the first page if None)."""
+        direction, values = ('n', None)
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+        forward = direction == 'n'
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward))
+        queryset = queryset.order_by(*(self.ordering if forward else self._reversed_ordering()))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or not forward:
+                next_cursor = self.encode_cursor(rows[-1], 'n')
+            if values is not None and (forward or has_more):
+                previous_cursor = self.encode_cursor(rows[0], 'p')
+        return KeysetPage(rows, next_cursor, previous_cursor, query_params)
+
+
+def paginate_keyset(request, queryset, ordering, per_page=DEFAULT_PAGE_SIZE):
+    """Page of `queryset` selected by the request's ?cursor= (bad cursors restart at page 1)"""
+    paginator = KeysetPaginator(queryset, ordering, per_page)
+    query_params = request.GET.copy()
+    query_params.pop('cursor', None)
+    try:
+        return paginator.page(request.GET.get('cursor'), query_params)
+    except InvalidCursor:
+        return paginator.page(None, query_params)
+
+
+# Orderings used by the list views; each is backed by a composite index
+APPOINTMENT_ORDERING = ('-appointment_date', '-id')
+ADMISSION_ORDERING = ('-admission_date', '-id')
+PAYMENT_ORDERING = ('-payment_date', '-id')
+PATIENT_ORDERING = ('-id',)
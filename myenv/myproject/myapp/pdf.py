@@ -0,0 +1,323 @@
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
+from io import BytesIO
+from PIL import Image as PILImage
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+
+# ============ PDF LAYOUT REGISTRY ============
+# Paragraph styles, table themes and page furniture shared by every PDF the
+# project produces: the admin exports and receipts in reports.py and the
+# standalone generate_dd_pdf.py / generate_dfd_pdf.py scripts. Built once at
+# import and warmed from MyappConfig.ready(), so a render only lays out its
+# own content. Nothing here imports Django, so the scripts can use it as is.
+
+logger = logging.getLogger(__name__)
+
+DARK = colors.HexColor('#2c3e50')
+HEADER_BLUE = colors.HexColor('#3498db')
+STRIPE = colors.HexColor('#ecf0f1')
+
+
+# ============ PARAGRAPH STYLES ============
+
+STYLES = getSampleStyleSheet()
+
+
+def _style(name, parent, **attributes):
+    style = ParagraphStyle(name, parent=STYLES[parent], **attributes)
+    STYLES.add(style)
+    return style
+
+
+# Admin list exports and the financial report
+_style('ListTitle', 'Heading1', fontSize=24, textColor=DARK, spaceAfter=30, alignment=TA_CENTER, fontName='Helvetica-Bold')
+_style('ReportTitle', 'Heading1', fontSize=20, textColor=DARK, spaceAfter=20, alignment=TA_CENTER, fontName='Helvetica-Bold')
+_style('GeneratedFooter', 'Normal', fontSize=10, textColor=colors.grey, alignment=TA_CENTER)
+
+# Receipts
+_style('ReceiptHeader', 'Heading1', fontSize=20, textColor=colors.HexColor('#2E86C1'), alignment=TA_CENTER)
+_style('ReceiptAddress', 'Normal', fontSize=10, alignment=TA_CENTER)
+_style('ReceiptTitle', 'Heading2', fontSize=16, alignment=TA_CENTER, textColor=colors.black, spaceAfter=20)
+
+# Project documentation (data dictionary, DFDs)
+_style('DocTitle', 'Heading1', fontSize=24, textColor=DARK, spaceAfter=20, alignment=TA_CENTER, fontName='Helvetica-Bold')
+_style('DocH1', 'Heading2', fontSize=18, textColor=colors.HexColor('#34495e'), spaceBefore=20, spaceAfter=10, fontName='Helvetica-Bold')
+_style('DocH2', 'Heading3', fontSize=14, textColor=colors.HexColor('#7f8c8d'), spaceBefore=15, spaceAfter=5, fontName='Helvetica-BoldOblique')
+_style('DiagramH1', 'Heading2', fontSize=16, textColor=colors.HexColor('#34495e'), spaceBefore=15, spaceAfter=10, fontName='Helvetica-Bold')
+
+
+# ============ TABLE THEMES ============
+
+@lru_cache(maxsize=None)
+def list_table(header_font_size=12, body_font_size=10):
+    """Blue header, striped beige body: the admin doctor/patient lists"""
+    return TableStyle([
+        # Header row
+        ('BACKGROUND', (0, 0), (-1, 0), HEADER_BLUE),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('TOPPADDING', (0, 0), (-1, 0), 12),
+
+        # Data rows
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), body_font_size),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, STRIPE]),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 1), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+    ])
+
+
+SUMMARY_TABLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), HEADER_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
+    ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#e8f4f8')),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+])
+
+TRANSACTIONS_TABLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), HEADER_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, STRIPE]),
+])
+
+RECEIPT_ITEMS_TABLE = TableStyle([
+    # Header
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f2f2f2')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+    ('TOPPADDING', (0, 0), (-1, 0), 10),
+    ('GRID', (0, 0), (-1, -2), 0.5, colors.grey),  # Grid for items
+
+    # Content Alignment
+    ('ALIGN', (1, 1), (1, -1), 'LEFT'),  # Description Left
+    ('ALIGN', (-1, 1), (-1, -1), 'RIGHT'),  # Amounts Right
+    ('ALIGN', (-3, 1), (-3, -1), 'RIGHT'),  # Rate Right
+
+    # Total Row
+    ('LINEABOVE', (4, -1), (-1, -1), 1, colors.black),
+    ('FONTNAME', (4, -1), (-1, -1), 'Helvetica-Bold'),
+    ('BACKGROUND', (4, -1), (-1, -1), colors.HexColor('#f2f2f2')),
+])
+
+# Invisible two-column layouts on the receipt
+COLUMNS_LAYOUT = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+])
+SIGNATURE_LAYOUT = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+])
+
+DATA_DICTIONARY_TABLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2980b9')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+
+    ('BACKGROUND', (0, 1), (-1, -1), STRIPE),
+    ('GRID', (0, 0), (-1, -1), 1, colors.white),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, STRIPE]),
+])
+
+DFD_PROCESS_TABLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8e44ad')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f4ecf7')]),
+])
+
+LEGEND_TABLE = TableStyle([
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+])
+
+
+# ============ PAGE TEMPLATES ============
+
+def document(out, wide=False, bottom_margin=18, **kwargs):
+    """A4 (landscape when `wide`) with the project's 30pt margins"""
+    pagesize = landscape(A4) if wide else A4
+    return SimpleDocTemplate(out, pagesize=pagesize, rightMargin=30, leftMargin=30, topMargin=30,
+                             bottomMargin=bottom_margin, **kwargs)
+
+
+def title(text, style='ListTitle', space_after=12):
+    return [Paragraph(text, STYLES[style]), Spacer(1, space_after)]
+
+
+def generated_footer(detail=None):
+    """'Generated on: <UTC time>' line closing the admin exports"""
+    text = f"Generated on: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}"
+    if detail:
+        text += f" | {detail}"
+    return Paragraph(text, STYLES['GeneratedFooter'])
+
+
+HOSPITAL_NAME = "Sanjeevan Health Care"
+HOSPITAL_ADDRESS = "123 Medical Plaza, Health City, Gujarat, India - 380001"
+HOSPITAL_CONTACT = "Phone: +91 1234567890 | Email: healthcaresanjeevani433@gmail.com"
+
+
+def letterhead():
+    """Hospital name, address and contact line heading a receipt"""
+    return [
+        Paragraph(HOSPITAL_NAME, STYLES['ReceiptHeader']),
+        Paragraph(HOSPITAL_ADDRESS, STYLES['ReceiptAddress']),
+        Paragraph(HOSPITAL_CONTACT, STYLES['ReceiptAddress']),
+        Spacer(1, 20),
+    ]
+
+
+def paid_stamp(canvas, doc):
+    """Page callback drawing a rotated green PAID box, middle right"""
+    canvas.saveState()
+    canvas.setStrokeColor(colors.green)
+    canvas.setFillColor(colors.green)
+    canvas.setLineWidth(3)
+    # A4 is about 595 x 842pt
+    canvas.translate(400, 500)
+    canvas.rotate(30)
+    canvas.roundRect(-50, -20, 100, 40, 4, stroke=1, fill=0)
+    canvas.setFont('Helvetica-Bold', 20)
+    canvas.drawCentredString(0, -7, "PAID")
+    canvas.restoreState()
+
+
+IMAGE_DPI = 300  # resolution images are embedded at, for their printed size
+
+
+@lru_cache(maxsize=8)
+def _image_bytes(path, mtime_ns, width, height):
+    """
+    The image as PNG, scaled down to IMAGE_DPI at width x height points.
+    ReportLab re-encodes the pixels on every render, so a large source image
+    would otherwise cost more than the rest of the page.
+    """
+    with PILImage.open(path) as source:
+        size = (round(width / 72 * IMAGE_DPI), round(height / 72 * IMAGE_DPI))
+        if source.width <= size[0] and source.height <= size[1]:
+            with open(path, 'rb') as image:
+                return image.read()
+        scaled = BytesIO()
+        source.resize(size, PILImage.LANCZOS).save(scaled, format='PNG')
+        return scaled.getvalue()
+
+
+def image(path, width, height):
+    """Image flowable from a file prepared once per modification, or None if missing"""
+    try:
+        data = _image_bytes(path, os.stat(path).st_mtime_ns, width, height)
+    except OSError:
+        return None
+    return Image(BytesIO(data), width=width, height=height)
+
+
+# ============ STREAMED TABLES ============
+# Lists with 100k+ rows would be one giant Table laid out (and re-split per
+# page) in memory. chunked_tables() cuts the rows into page-sized tables
+# and StreamedFlowables lets build() consume them as they are produced.
+
+class StreamedFlowables(list):
+    """
+    Flowable list for doc.build() that pulls from a generator as the front
+    is consumed, so only a couple of flowables exist at any time.
+    """
+
+    def __init__(self, source, lookahead=2):
+        super().__init__()
+        self._source = iter(source)
+        self._lookahead = lookahead
+
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return super().__len__()
+
+    def __getitem__(self, index):
+        self._fill()
+        return super().__getitem__(index)
+
+
+def chunked_tables(header, rows, col_widths, style, rows_per_table, counter=None):
+    """Tables of `rows_per_table` rows with a repeated header; `counter` collects the row total"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == rows_per_table:
+            yield Table([header] + chunk, colWidths=col_widths, repeatRows=1, style=style)
+            if counter is not None:
+                counter.append(len(chunk))
+            chunk = []
+    if chunk:
+        yield Table([header] + chunk, colWidths=col_widths, repeatRows=1, style=style)
+        if counter is not None:
+            counter.append(len(chunk))
+
+
+# ============ TIMING ============
+
+def template(name):
+    """Name a renderer as a PDF template and log how long each render takes"""
+    def decorator(render):
+        @wraps(render)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return render(*args, **kwargs)
+            finally:
+                logger.info('PDF template %s rendered in %.1f ms', name, (time.perf_counter() - start) * 1000)
+        timed.template_name = name
+        return timed
+    return decorator
+
+
+def warm():
+    """Build the cached themes and lay out a throwaway page so fonts are loaded before the first request"""
+    list_table(11, 9)
+    list_table(12, 10)
+    doc = document(BytesIO())
+    doc.build(title("warm-up") + [Table([['a', 'b']], style=list_table()), generated_footer()])
@@ -0,0 +1,70 @@
+from .models import Patient, OPDAppointment, IPDAdmission, Payment, Prescription, LabReport
+
+# ============ LIST VIEW PREFETCH REGISTRY ============
+# What each list page reads per row, keyed by URL name and then by model.
+# for_view() turns an entry into select_related/prefetch_related/only() so a
+# page costs a fixed number of queries however many rows it shows.
+# Keep `only` in step with the template: a field missing here is loaded with
+# one extra query per row.
+
+PATIENT_COLUMNS = ('patient__name', 'patient__patient_id', 'patient__phone')
+DOCTOR_NAME = ('doctor__first_name', 'doctor__last_name')
+DOCTOR_DEPARTMENT = DOCTOR_NAME + ('doctor__department__name',)
+
+OPD_ROW = {
+    'select': ('patient', 'doctor__department'),
+    'only': ('appointment_date', 'reason', 'status', 'fee', 'token_no', 'visit_type') + PATIENT_COLUMNS + DOCTOR_DEPARTMENT,
+}
+IPD_ROW = {
+    'select': ('patient', 'doctor__department', 'bed'),
+    'only': ('admission_date', 'discharge_date', 'ward_no', 'bed_no', 'reason', 'status',
+             'is_discharge_requested', 'bed__daily_charge') + PATIENT_COLUMNS + DOCTOR_DEPARTMENT,
+}
+PAYMENT_ROW = {
+    'select': ('patient',),
+    'only': ('amount', 'payment_method', 'payment_date', 'description', 'transaction_id') + PATIENT_COLUMNS,
+}
+LAB_REPORT_ROW = {
+    'select': ('patient', 'doctor'),
+    'only': ('test_name', 'requested_date', 'report_file', 'status') + PATIENT_COLUMNS + DOCTOR_NAME,
+}
+PRESCRIPTION_ROW = {
+    'select': ('patient',),
+    'only': ('diagnosis', 'medicines', 'follow_up_date', 'created_at') + PATIENT_COLUMNS,
+}
+PATIENT_CHOICE = {
+    'only': ('name', 'patient_id'),
+}
+
+LIST_VIEWS = {
+    # Admin
+    'admin_appointments': {OPDAppointment: OPD_ROW},
+    'admin_billing': {Payment: PAYMENT_ROW},
+    'opd_list': {OPDAppointment: OPD_ROW},
+    'ipd_list': {IPDAdmission: IPD_ROW},
+    'payment_list': {Payment: PAYMENT_ROW},
+    # Receptionist
+    'receptionist_appointments': {OPDAppointment: OPD_ROW},
+    'receptionist_opd_list': {OPDAppointment: OPD_ROW},
+    'receptionist_ipd_list': {IPDAdmission: IPD_ROW},
+    'receptionist_billing_view': {OPDAppointment: OPD_ROW, IPDAdmission: IPD_ROW, Payment: PAYMENT_ROW},
+    # Laboratory
+    'laboratory_dashboard': {LabReport: LAB_REPORT_ROW, Patient: PATIENT_CHOICE},
+    # Doctor
+    'doctor_appointments': {OPDAppointment: OPD_ROW},
+    'doctor_prescriptions': {Prescription: PRESCRIPTION_ROW, Patient: PATIENT_CHOICE},
+    # Patient
+    'patient_appointments': {OPDAppointment: OPD_ROW},
+}
+
+
+def for_view(view_name, queryset):
+    """Apply the registered relations and columns for `view_name` to `queryset`"""
+    spec = LIST_VIEWS[view_name][queryset.model]
+    if spec.get('select'):
+        queryset = queryset.select_related(*spec['select'])
+    if spec.get('prefetch'):
+        queryset = queryset.prefetch_related(*spec['prefetch'])
+    if spec.get('only'):
+        queryset = queryset.only(*spec['only'])
+    return queryset
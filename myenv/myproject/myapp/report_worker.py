@@ -0,0 +1,31 @@
+import django
+
+# ============ REPORT WORKER PROCESSES ============
+# Entry points for the run_report_worker process pool. Pool processes are
+# spawned fresh, so nothing Django-related may be imported at module level:
+# the app registry is set up in init_process() first.
+
+
+def init_process():
+    django.setup()
+
+
+def render_job(job_id):
+    from django.db import close_old_connections
+    from .reports import run_job
+    try:
+        return job_id, run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def render_receipt(payment_id):
+    """Render one receipt into the cache for receipts_zip(); returns its path"""
+    from django.db import close_old_connections
+    from .models import Payment
+    from .reports import cached_receipt
+    try:
+        payment = Payment.objects.select_related('patient').get(id=payment_id)
+        return payment_id, cached_receipt(payment, evict=False)
+    finally:
+        close_old_connections()
@@ -0,0 +1,513 @@
+import glob
+import hashlib
+import itertools
+import json
+import mimetypes
+import multiprocessing
+import os
+import tempfile
+import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from reportlab.lib.units import inch
+from reportlab.platypus import Table, Paragraph, Spacer
+from .models import Doctor, Patient, Payment, ReportJob, ReportFileChunk
+from .stats import rollup_totals
+from .exports import streaming_download
+from . import pdf
+from .report_worker import init_process, render_receipt
+
+# ============ PDF REPORTS ============
+# Renderers write a finished PDF to `out` (any binary file object). They run
+# in report worker processes (see run_report_worker) for the admin exports,
+# and in the request for a single receipt: one page, rendered only on a
+# receipt cache miss, is cheaper than a queued job and a poll. Styles and
+# page furniture come from pdf.py; each renderer is a named template whose
+# render time is logged.
+
+TABLE_CHUNK_ROWS = 18  # rows per table, about one landscape page
+
+
+def _list_pdf(out, heading, header, rows, col_widths, table_style, total_label):
+    """Landscape title + page-sized tables + "Total ..." footer, rows read lazily"""
+    def flowables():
+        yield from pdf.title(heading)
+        counter = []
+        yield from pdf.chunked_tables(header, rows, col_widths, table_style, TABLE_CHUNK_ROWS, counter)
+        # Counted while streaming, so no separate COUNT(*)
+        yield pdf.generated_footer(f"{total_label}: {sum(counter)}")
+
+    pdf.document(out, wide=True).build(pdf.StreamedFlowables(flowables()))
+
+
+@pdf.template('doctors')
+def doctors_pdf(out):
+    """All doctors, landscape table"""
+    doctors = Doctor.objects.order_by('-id').values_list(
+        'doctor_id', 'first_name', 'last_name', 'specialization', 'department__name', 'phone', 'email', 'availability_status'
+    ).iterator(chunk_size=2000)
+    rows = ([
+        doctor_id,
+        f"{first_name} {last_name}"[:25],  # Truncate if too long
+        (specialization or '')[:20],
+        (department or 'N/A')[:15],
+        phone,
+        (email or '')[:30],  # Truncate if too long
+        status,
+    ] for doctor_id, first_name, last_name, specialization, department, phone, email, status in doctors)
+    _list_pdf(
+        out, "Hospital Management System - All Doctors",
+        ['ID', 'Name', 'Specialization', 'Department', 'Phone', 'Email', 'Status'], rows,
+        [0.8*inch, 1.8*inch, 1.5*inch, 1.2*inch, 1.2*inch, 2*inch, 1*inch],
+        pdf.list_table(11, 9), 'Total Doctors',
+    )
+
+
+@pdf.template('patients')
+def patients_pdf(out):
+    """All patients, landscape table"""
+    patients = Patient.objects.order_by('-id').values_list(
+        'patient_id', 'name', 'age', 'gender', 'phone', 'blood_group', 'email'
+    ).iterator(chunk_size=2000)
+    rows = ([
+        patient_id,
+        (name or '')[:20],  # Truncate if too long
+        str(age),
+        gender,
+        phone,
+        blood_group or 'N/A',
+        (email or '')[:25],  # Truncate if too long
+    ] for patient_id, name, age, gender, phone, blood_group, email in patients)
+    _list_pdf(
+        out, "Hospital Management System - All Patients",
+        ['ID', 'Name', 'Age', 'Gender', 'Phone', 'Blood Group', 'Email'], rows,
+        [0.8*inch, 1.8*inch, 0.6*inch, 0.8*inch, 1.2*inch, 1*inch, 2*inch],
+        pdf.list_table(12, 10), 'Total Patients',
+    )
+
+
+@pdf.template('financial')
+def financial_pdf(out):
+    """Revenue summary and the latest transactions"""
+    elements = pdf.title("Financial Report - Hospital Management System", style='ReportTitle', space_after=20)
+    
+    # Revenue Summary
+    totals = rollup_totals()
+    payment_revenue = totals['payment_total']
+    opd_revenue = totals['opd_fee_total']
+    total_revenue = float(payment_revenue) + float(opd_revenue)
+    
+    summary_data = [
+        ['Revenue Source', 'Amount (₹)'],
+        ['OPD Fees', f'{opd_revenue:.2f}'],
+        ['Other Payments', f'{payment_revenue:.2f}'],
+        ['Total Revenue', f'{total_revenue:.2f}']
+    ]
+    elements.append(Table(summary_data, colWidths=[3*inch, 2*inch], style=pdf.SUMMARY_TABLE))
+    elements.append(Spacer(1, 20))
+    
+    # Recent Payments
+    elements.append(Paragraph("Recent Transactions", pdf.STYLES['Heading2']))
+    elements.append(Spacer(1, 10))
+    
+    payments = Payment.objects.select_related('patient').order_by('-payment_date')[:10]
+    payment_data = [['Date', 'Patient', 'Amount (₹)', 'Method']]
+    for payment in payments:
+        payment_data.append([
+            payment.payment_date.strftime('%Y-%m-%d'),
+            payment.patient.name[:20],
+            f'{payment.amount:.2f}',
+            payment.payment_method
+        ])
+    elements.append(Table(payment_data, colWidths=[1.5*inch, 2*inch, 1.5*inch, 1.5*inch], style=pdf.TRANSACTIONS_TABLE))
+    
+    elements.append(Spacer(1, 20))
+    elements.append(pdf.generated_footer())
+    
+    pdf.document(out).build(elements)
+
+
+SIGNATURE_IMAGE = os.path.join(settings.BASE_DIR, 'myapp', 'static', 'images', 'signature.png')
+
+# Bump whenever receipt_pdf() changes what a receipt looks like
+RECEIPT_TEMPLATE_VERSION = 2
+
+RECEIPT_TERMS = [
+    "1. This receipt is valid as proof of payment only.",
+    "2. Consultation fees are non-refundable once the service is provided.",
+    "3. Medicines, tests, and services once billed will not be taken back or exchanged.",
+    "4. Any dispute shall be subject to Hospital Jurisdiction only.",
+    "5. This is a computer-generated receipt and does not require a physical signature.",
+    "6. For insurance claims, please submit this receipt along with the prescription/report.",
+    "7. Hospital is not responsible for loss of this receipt after issuance.",
+]
+
+
+@pdf.template('receipt')
+def receipt_pdf(out, payment):
+    """Payment receipt / tax invoice for one payment (select_related('patient'))"""
+    normal = pdf.STYLES['Normal']
+    elements = pdf.letterhead()
+    elements.append(Paragraph("PAYMENT RECEIPT / TAX INVOICE", pdf.STYLES['ReceiptTitle']))
+    elements.append(Spacer(1, 10))
+
+    # --- Customer and Invoice Details (Two Columns) ---
+    patient_info = [
+        [Paragraph("<b>BILLED TO:</b>", normal)],
+        [Paragraph(f"<b>Name:</b> {payment.patient.name}", normal)],
+        [Paragraph(f"<b>Address:</b> {payment.patient.address or 'N/A'}", normal)],
+        [Paragraph(f"<b>Phone:</b> {payment.patient.phone}", normal)],
+        [Paragraph(f"<b>Email:</b> {payment.patient.email}", normal)]
+    ]
+    invoice_info = [
+        [Paragraph(f"<b>Receipt No:</b> #{payment.id:05d}", normal)],
+        [Paragraph(f"<b>Date:</b> {payment.payment_date.strftime('%d-%b-%Y')}", normal)],
+        [Paragraph(f"<b>Payment Mode:</b> {payment.payment_method}", normal)],
+        [Paragraph(f"<b>Transaction ID:</b> {payment.transaction_id}", normal)],
+        [Paragraph(f"<b>Status:</b> PAID", normal)]
+    ]
+    info_table_data = [[Table(patient_info, colWidths=[2.5*inch]), Table(invoice_info, colWidths=[2.5*inch])]]
+    elements.append(Table(info_table_data, colWidths=[3.5*inch, 3.5*inch], style=pdf.COLUMNS_LAYOUT))
+    elements.append(Spacer(1, 20))
+
+    # --- Items Table ---
+    # Payment has no line items, so the whole payment is one line
+    table_data = [
+        ['Sr.', 'Description', 'Qty', 'Rate', 'Tax', 'Total'],
+        [
+            '1',
+            Paragraph(payment.description or "Medical Services / Hospital Bill", normal),
+            '1',
+            f"{payment.amount}",
+            '0.00',
+            f"{payment.amount}"
+        ],
+        ['', '', '', '', 'Total', f"{payment.amount}"],
+    ]
+    col_widths = [0.5*inch, 3*inch, 0.6*inch, 1*inch, 0.8*inch, 1.2*inch]
+    elements.append(Table(table_data, colWidths=col_widths, style=pdf.RECEIPT_ITEMS_TABLE))
+    elements.append(Spacer(1, 20))
+
+    elements.append(Paragraph(f"<b>Total in words:</b> Rs. {payment.amount} ONLY", normal))
+    elements.append(Spacer(1, 20))
+
+    # --- Bank Details and Signature ---
+    bank_info = [
+        [Paragraph("<b>Bank Details:</b>", normal)],
+        [Paragraph("Bank Name: HDFC Bank", normal)],
+        [Paragraph("Account No: 1234567890", normal)],
+        [Paragraph("IFSC Code: HDFC0001234", normal)],
+        [Paragraph("Branch: Health City", normal)]
+    ]
+    signature = pdf.image(SIGNATURE_IMAGE, width=1.5*inch, height=0.5*inch) or Spacer(1, 0.5*inch)
+    signature_data = [
+        [signature],
+        [Paragraph("<b>Authorized Signatory</b>", normal)]
+    ]
+    footer_table_data = [[Table(bank_info), Table(signature_data, colWidths=[2.5*inch])]]
+    elements.append(Table(footer_table_data, colWidths=[3.5*inch, 3.5*inch], style=pdf.SIGNATURE_LAYOUT))
+    elements.append(Spacer(1, 30))
+    
+    # --- Terms ---
+    elements.append(Paragraph("<b>Terms and Conditions:</b>", normal))
+    for term in RECEIPT_TERMS:
+        elements.append(Paragraph(term, normal))
+
+    doc = pdf.document(out, bottom_margin=30, title=f"Receipt #{payment.id}")
+    doc.build(elements, onFirstPage=pdf.paid_stamp, onLaterPages=pdf.paid_stamp)
+
+
+# ============ RECEIPT CACHE ============
+# A receipt never changes unless something printed on it does, so rendered
+# PDFs are kept on disk under a digest of every printed field plus the
+# template version and signature image. The digest doubles as a strong
+# ETag. Files are spread over 256 subdirectories by payment id, so finding
+# a receipt's stale versions lists one small directory. File mtimes track
+# last use; the oldest go once the cache outgrows RECEIPT_CACHE_MAX_BYTES,
+# checked every EVICT_EVERY renders rather than on each one.
+
+EVICT_EVERY = 50  # renders in one process between cache size checks
+_renders_since_evict = 0
+
+
+def receipt_digest(payment):
+    """Content hash of everything receipt_pdf() prints for `payment`"""
+    patient = payment.patient
+    try:
+        signature = os.stat(SIGNATURE_IMAGE)
+        signature = (signature.st_size, signature.st_mtime_ns)
+    except OSError:
+        signature = None
+    fields = [
+        RECEIPT_TEMPLATE_VERSION, signature,
+        payment.id, str(payment.amount), payment.payment_method, payment.payment_date.isoformat(),
+        payment.transaction_id, payment.description,
+        patient.name, patient.address, patient.phone, patient.email,
+    ]
+    return hashlib.sha256(json.dumps(fields, default=str).encode()).hexdigest()
+
+
+def _receipt_dir(payment_id):
+    return os.path.join(settings.RECEIPT_CACHE_DIR, f'{payment_id % 256:02x}')
+
+
+def _receipt_path(payment_id, digest):
+    return os.path.join(_receipt_dir(payment_id), f'{payment_id}-{digest[:32]}.pdf')
+
+
+def cached_receipt(payment, digest=None, evict=True):
+    """
+    Path of the rendered receipt, rendering it only on a miss. Bulk exports
+    pass evict=False and call evict_receipts() once when they finish.
+    """
+    global _renders_since_evict
+    digest = digest or receipt_digest(payment)
+    path = _receipt_path(payment.id, digest)
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+
+    directory = _receipt_dir(payment.id)
+    os.makedirs(directory, exist_ok=True)
+    # Versions of this receipt with older field values are dead now
+    for stale in glob.glob(os.path.join(directory, f'{payment.id}-*.pdf')):
+        _remove(stale)
+    # Render beside the target and rename, so readers never see half a file
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            receipt_pdf(tmp, payment)
+        os.replace(tmp_path, path)
+    except BaseException:
+        _remove(tmp_path)
+        raise
+    if evict:
+        _renders_since_evict += 1
+        if _renders_since_evict >= EVICT_EVERY:
+            _renders_since_evict = 0
+            evict_receipts(settings.RECEIPT_CACHE_MAX_BYTES)
+    return path
+
+
+def _cached_files(directory):
+    """DirEntry for every cached PDF under `directory`, subdirectories included"""
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _cached_files(entry.path)
+            elif entry.name.endswith('.pdf'):
+                yield entry
+
+
+def evict_receipts(max_bytes):
+    """Delete least recently used receipts until the cache is 90% of max_bytes"""
+    entries = []
+    total = 0
+    try:
+        for entry in _cached_files(settings.RECEIPT_CACHE_DIR):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    except FileNotFoundError:
+        return 0
+    if total <= max_bytes:
+        return 0
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes * 0.9:
+            break
+        _remove(path)
+        total -= size
+        evicted += 1
+    return evicted
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# ============ BULK RECEIPTS ============
+# A ZIP of every receipt for a date range and/or one patient. Receipts go
+# through the disk cache, rendered by a pool of spawned processes when there
+# are many, and each finished file is copied into the archive from disk, so
+# no more than one PDF is held in memory at a time.
+
+RECEIPTS_PER_TASK = 16  # payments handed to a pool process at once
+
+
+def receipt_payments(start=None, end=None, patient_id=None):
+    """Payments dated start..end (inclusive) and/or of one patient, oldest first"""
+    payments = Payment.objects.all()
+    if start:
+        payments = payments.filter(payment_date__date__gte=start)
+    if end:
+        payments = payments.filter(payment_date__date__lte=end)
+    if patient_id:
+        payments = payments.filter(patient_id=patient_id)
+    return payments.order_by('payment_date', 'id')
+
+
+def _rendered_receipts(payment_ids, processes):
+    """(payment id, cached receipt path) for each id, rendering misses in parallel"""
+    if processes > 1 and len(payment_ids) > RECEIPTS_PER_TASK:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=init_process) as pool:
+            yield from pool.map(render_receipt, payment_ids, chunksize=RECEIPTS_PER_TASK)
+        return
+    for payment in Payment.objects.filter(id__in=payment_ids).select_related('patient').iterator(chunk_size=500):
+        yield payment.id, cached_receipt(payment, evict=False)
+
+
+def receipts_zip(out, start=None, end=None, patient_id=None, processes=None):
+    """
+    Write a ZIP of the matching receipts to `out`. Dates may be ISO strings
+    (job params). Returns the number of receipts.
+    """
+    if isinstance(start, str):
+        start = parse_date(start)
+    if isinstance(end, str):
+        end = parse_date(end)
+    payment_ids = list(receipt_payments(start, end, patient_id).values_list('id', flat=True))
+    if not payment_ids:
+        raise ValueError("No payments match the selection")
+    processes = processes or settings.RECEIPT_EXPORT_PROCESSES
+
+    # PDFs are already compressed; deflating them again costs CPU for ~nothing
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for payment_id, path in _rendered_receipts(payment_ids, processes):
+            arcname = f'Receipt_{payment_id}.pdf'
+            try:
+                archive.write(path, arcname)
+            except FileNotFoundError:
+                # Evicted by another process between rendering and zipping
+                payment = Payment.objects.select_related('patient').get(id=payment_id)
+                archive.write(cached_receipt(payment, evict=False), arcname)
+    # Once for the whole export, not after every receipt rendered for it
+    evict_receipts(settings.RECEIPT_CACHE_MAX_BYTES)
+    return len(payment_ids)
+
+
+# kind -> (renderer, download filename); job params are passed as keyword arguments
+REPORT_KINDS = {
+    'doctors': (doctors_pdf, 'all_doctors_{created:%Y%m%d_%H%M%S}.pdf'),
+    'patients': (patients_pdf, 'all_patients_{created:%Y%m%d_%H%M%S}.pdf'),
+    'financial': (financial_pdf, 'financial_report_{created:%Y%m%d_%H%M%S}.pdf'),
+    'receipts': (receipts_zip, 'receipts_{created:%Y%m%d_%H%M%S}.zip'),
+}
+
+
+def report_filename(kind, created, **params):
+    return REPORT_KINDS[kind][1].format(created=created, **params)
+
+
+# ============ REPORT JOBS ============
+# The worker renders into a temp file and copies it into ReportFileChunk
+# rows, so the web service can serve it without sharing the worker's disk.
+
+REPORT_CHUNK_BYTES = 1024 * 1024
+
+
+def queue_report(request, kind, **params):
+    """
+    Queue a report for the worker and answer at once: JSON with the job id
+    for API clients, otherwise a redirect to the page that polls it.
+    """
+    job = ReportJob.objects.create(kind=kind, params=params, requested_by=request.user)
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse(job_status(job), status=202)
+    return redirect('report_job', job_id=job.id)
+
+
+def job_status(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'status_url': reverse('report_job_status', args=[job.id]),
+        'download_url': reverse('report_job_download', args=[job.id]) if job.status == ReportJob.DONE else None,
+        'error': job.error if job.status == ReportJob.FAILED else None,
+    }
+
+
+def claim_next_job():
+    """Mark the oldest queued job running and return it, or None"""
+    with transaction.atomic():
+        job = ReportJob.objects.select_for_update(skip_locked=True).filter(
+            status=ReportJob.QUEUED
+        ).order_by('created_at').first()
+        if job:
+            job.status = ReportJob.RUNNING
+            job.started_at = timezone.now()
+            job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def requeue_stale_jobs(older_than):
+    """Jobs left running by a worker that died mid-render go back in the queue"""
+    return ReportJob.objects.filter(
+        status=ReportJob.RUNNING, started_at__lt=timezone.now() - older_than
+    ).update(status=ReportJob.QUEUED, started_at=None)
+
+
+def purge_finished_jobs(older_than):
+    """Delete finished jobs and their output once nobody will download them"""
+    jobs = ReportJob.objects.filter(status__in=[ReportJob.DONE, ReportJob.FAILED], finished_at__lt=timezone.now() - older_than)
+    return jobs.delete()[1].get(ReportJob._meta.label, 0)
+
+
+def _store_output(job, tmp):
+    """Copy a rendered file into the job's chunks, replacing any earlier ones; returns its size"""
+    size = 0
+    with transaction.atomic():
+        job.chunks.all().delete()
+        for seq, data in enumerate(iter(lambda: tmp.read(REPORT_CHUNK_BYTES), b'')):
+            ReportFileChunk.objects.create(job=job, seq=seq, data=data)
+            size += len(data)
+    return size
+
+
+def run_job(job_id):
+    """Render a claimed job into the database. Runs in a worker process."""
+    job = ReportJob.objects.get(pk=job_id)
+    renderer = REPORT_KINDS[job.kind][0]
+    try:
+        job.filename = report_filename(job.kind, job.created_at, **job.params)
+        with tempfile.TemporaryFile() as tmp:
+            renderer(tmp, **job.params)
+            tmp.seek(0)
+            job.size = _store_output(job, tmp)
+        job.status = ReportJob.DONE
+    except Exception as exc:
+        job.status = ReportJob.FAILED
+        job.error = ''.join(traceback.format_exception_only(exc)).strip()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['filename', 'size', 'status', 'error', 'finished_at'])
+    return job.status
+
+
+def _job_chunks(job_id):
+    # One query per chunk, so only one is ever held in memory
+    for seq in itertools.count():
+        data = ReportFileChunk.objects.filter(job_id=job_id, seq=seq).values_list('data', flat=True).first()
+        if data is None:
+            return
+        yield bytes(data)
+
+
+def job_download(request, job):
+    """Stream a finished job's output as an attachment"""
+    content_type = mimetypes.guess_type(job.filename)[0] or 'application/octet-stream'
+    return streaming_download(request, _job_chunks(job.id), job.filename, content_type, job.size)
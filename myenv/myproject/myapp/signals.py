@@ -0,0 +1,236 @@
+from django.db import transaction, IntegrityError
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.utils import timezone
+from django.db.models import QuerySet
+from .models import CustomUser, Patient, Doctor, Staff, Department, OPDAppointment, IPDAdmission, Payment, Bed, DailyStats
+from .stats import bump_model_version
+from .ledger import LEDGER_SOURCES, sync_source
+from .beds import move_ward_counts
+
+# ============ DAILY STATS ROLLUP ============
+# Every save/delete of a tracked row moves its contribution from the old
+# (date, department) bucket to the new one. Contributions are read back from
+# the database so values posted as strings by the views are normalised.
+# OPD/IPD rows are bucketed by their doctor's department, so a doctor who
+# changes department or is deleted takes their rows' totals along.
+
+def _local_date(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def _opd_contribution(pk):
+    row = OPDAppointment.objects.filter(pk=pk).values(
+        'appointment_date', 'status', 'fee', 'doctor__department_id'
+    ).first()
+    if not row:
+        return {}
+    key = (_local_date(row['appointment_date']), row['doctor__department_id'])
+    return {key: {
+        'opd_count': 1,
+        'opd_completed': 1 if row['status'] == 'Completed' else 0,
+        'opd_fee_total': row['fee'] or 0,
+    }}
+
+
+def _ipd_contribution(pk):
+    row = IPDAdmission.objects.filter(pk=pk).values('admission_date', 'doctor__department_id').first()
+    if not row:
+        return {}
+    key = (_local_date(row['admission_date']), row['doctor__department_id'])
+    return {key: {'ipd_admissions': 1}}
+
+
+def _payment_contribution(pk):
+    row = Payment.objects.filter(pk=pk).values('payment_date', 'amount').first()
+    if not row:
+        return {}
+    key = (_local_date(row['payment_date']), None)
+    return {key: {'payment_count': 1, 'payment_total': row['amount'] or 0}}
+
+
+STATS_SOURCES = {
+    OPDAppointment: _opd_contribution,
+    IPDAdmission: _ipd_contribution,
+    Payment: _payment_contribution,
+}
+
+
+def apply_stats_delta(before, after):
+    """Subtract the `before` contribution and add the `after` one"""
+    delta = {}
+    for sign, contribution in ((-1, before), (1, after)):
+        for key, amounts in contribution.items():
+            bucket = delta.setdefault(key, {})
+            for field, value in amounts.items():
+                bucket[field] = bucket.get(field, 0) + sign * value
+
+    with transaction.atomic():
+        for (day, department_id), amounts in delta.items():
+            add_daily_stats(day, department_id, {field: value for field, value in amounts.items() if value})
+
+
+def add_daily_stats(day, department_id, amounts):
+    """Add `amounts` to one (date, department) bucket, creating it if needed"""
+    if not amounts:
+        return
+    bucket = DailyStats.objects.filter(date=day, department_id=department_id)
+    updates = {field: F(field) + value for field, value in amounts.items()}
+    if bucket.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            DailyStats.objects.create(date=day, department_id=department_id, **amounts)
+    except IntegrityError:
+        # Another transaction created the bucket first
+        bucket.update(**updates)
+
+
+STATS_FIELDS = ('opd_count', 'opd_completed', 'opd_fee_total', 'ipd_admissions', 'payment_count', 'payment_total')
+
+
+def fold_department_stats(sender, instance, **kwargs):
+    """
+    A deleted department's rows would all become (date, NULL) and collide
+    with the existing NULL buckets, so add them to those buckets first.
+    """
+    with transaction.atomic():
+        rows = DailyStats.objects.filter(department=instance)
+        for row in rows.values('date', *STATS_FIELDS):
+            day = row.pop('date')
+            add_daily_stats(day, None, {field: value for field, value in row.items() if value})
+        rows.delete()
+
+
+def _doctor_stats(doctor_id):
+    """{date: amounts} the doctor's OPD and IPD rows contribute to their department's buckets"""
+    days = {}
+    opd = OPDAppointment.objects.filter(doctor_id=doctor_id).annotate(day=TruncDate('appointment_date')).values('day').annotate(
+        opd_count=Count('id'), opd_completed=Count('id', filter=Q(status='Completed')), opd_fee_total=Sum('fee'),
+    ).order_by()
+    ipd = IPDAdmission.objects.filter(doctor_id=doctor_id).annotate(day=TruncDate('admission_date')).values('day').annotate(
+        ipd_admissions=Count('id'),
+    ).order_by()
+    for rows in (opd, ipd):
+        for row in rows:
+            amounts = days.setdefault(row.pop('day'), {})
+            amounts.update({field: value for field, value in row.items() if value})
+    return days
+
+
+def move_doctor_stats(doctor_id, from_department_id, to_department_id):
+    """Move the doctor's contributions from one department's buckets to another's"""
+    if from_department_id == to_department_id:
+        return
+    with transaction.atomic():
+        for day, amounts in _doctor_stats(doctor_id).items():
+            add_daily_stats(day, from_department_id, {field: -value for field, value in amounts.items()})
+            add_daily_stats(day, to_department_id, amounts)
+
+
+def snapshot_doctor_department(sender, instance, **kwargs):
+    instance._department_before = (
+        Doctor.objects.filter(pk=instance.pk).values_list('department_id', flat=True).first() if instance.pk else None
+    )
+
+
+def move_stats_on_doctor_save(sender, instance, created=False, **kwargs):
+    if not created:
+        move_doctor_stats(instance.pk, getattr(instance, '_department_before', None), instance.department_id)
+
+
+def fold_doctor_stats(sender, instance, **kwargs):
+    """
+    Deleting a doctor NULLs the doctor on their appointments and admissions
+    with a bulk UPDATE that sends no signals, so move their contributions
+    to the no-department buckets first.
+    """
+    department_id = Doctor.objects.filter(pk=instance.pk).values_list('department_id', flat=True).first()
+    move_doctor_stats(instance.pk, department_id, None)
+
+
+def snapshot_stats(sender, instance, **kwargs):
+    instance._stats_before = STATS_SOURCES[sender](instance.pk) if instance.pk else {}
+
+
+def update_stats_on_save(sender, instance, **kwargs):
+    apply_stats_delta(getattr(instance, '_stats_before', {}), STATS_SOURCES[sender](instance.pk))
+
+
+def update_stats_on_delete(sender, instance, **kwargs):
+    apply_stats_delta(getattr(instance, '_stats_before', {}), {})
+
+
+for model in STATS_SOURCES:
+    pre_save.connect(snapshot_stats, sender=model, dispatch_uid=f'stats_pre_save_{model.__name__}')
+    post_save.connect(update_stats_on_save, sender=model, dispatch_uid=f'stats_post_save_{model.__name__}')
+    pre_delete.connect(snapshot_stats, sender=model, dispatch_uid=f'stats_pre_delete_{model.__name__}')
+    post_delete.connect(update_stats_on_delete, sender=model, dispatch_uid=f'stats_post_delete_{model.__name__}')
+pre_delete.connect(fold_department_stats, sender=Department, dispatch_uid='stats_fold_department')
+pre_save.connect(snapshot_doctor_department, sender=Doctor, dispatch_uid='stats_pre_save_doctor')
+post_save.connect(move_stats_on_doctor_save, sender=Doctor, dispatch_uid='stats_post_save_doctor')
+pre_delete.connect(fold_doctor_stats, sender=Doctor, dispatch_uid='stats_fold_doctor')
+
+
+# ============ PATIENT LEDGER ============
+# Saves post whatever the ledger is missing; deletes post a reversal while
+# the row still exists. When the patient itself is being deleted their
+# ledger goes with them, so nothing is posted.
+
+def _deleting_patient(origin):
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, (Patient, CustomUser))
+
+
+def sync_ledger_on_save(sender, instance, **kwargs):
+    sync_source(sender, instance.pk)
+
+
+def sync_ledger_on_delete(sender, instance, origin=None, **kwargs):
+    if not _deleting_patient(origin):
+        sync_source(sender, instance.pk, deleting=True)
+
+
+for model in LEDGER_SOURCES:
+    post_save.connect(sync_ledger_on_save, sender=model, dispatch_uid=f'ledger_post_save_{model.__name__}')
+    pre_delete.connect(sync_ledger_on_delete, sender=model, dispatch_uid=f'ledger_pre_delete_{model.__name__}')
+
+
+# ============ WARD AVAILABILITY ============
+# Beds added, edited or deleted through the ORM move their ward's counters.
+# Claims and releases in beds.py use conditional UPDATEs and move the
+# counters themselves.
+
+def snapshot_bed(sender, instance, **kwargs):
+    instance._ward_before = Bed.objects.filter(pk=instance.pk).values_list('ward_type', 'status').first() if instance.pk else None
+
+
+def update_wards_on_save(sender, instance, **kwargs):
+    move_ward_counts(getattr(instance, '_ward_before', None), (instance.ward_type, instance.status))
+
+
+def update_wards_on_delete(sender, instance, **kwargs):
+    move_ward_counts(getattr(instance, '_ward_before', None), None)
+
+
+pre_save.connect(snapshot_bed, sender=Bed, dispatch_uid='wards_pre_save_Bed')
+post_save.connect(update_wards_on_save, sender=Bed, dispatch_uid='wards_post_save_Bed')
+pre_delete.connect(snapshot_bed, sender=Bed, dispatch_uid='wards_pre_delete_Bed')
+post_delete.connect(update_wards_on_delete, sender=Bed, dispatch_uid='wards_post_delete_Bed')
+
+
+# ============ CHANGE COUNTERS ============
+# Live stats streams and conditional GETs watch these counters; bump them
+# only once the change is committed and visible to other connections.
+
+VERSIONED_MODELS = (Patient, Doctor, Staff, Department, OPDAppointment, IPDAdmission, Payment, Bed)
+
+
+def bump_version_on_change(sender, **kwargs):
+    transaction.on_commit(lambda: bump_model_version(sender))
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_version_on_change, sender=model, dispatch_uid=f'version_post_save_{model.__name__}')
+    post_delete.connect(bump_version_on_change, sender=model, dispatch_uid=f'version_post_delete_{model.__name__}')
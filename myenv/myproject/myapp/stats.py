@@ -0,0 +1,258 @@
+from django.conf import settings
+from django.core.cache import cache
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Sum, Count, Q, F
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+from .models import Patient, Doctor, Staff, Department, OPDAppointment, IPDAdmission, Payment, Bed, DailyStats, WardAvailability
+
+# ============ CHANGE COUNTERS ============
+# A per-model counter in the shared cache, bumped by signals.py after every
+# committed save/delete. Readers compare counters instead of re-aggregating.
+
+MODEL_VERSION_KEY = 'stats:version:{}'
+
+
+def bump_model_version(model):
+    key = MODEL_VERSION_KEY.format(model._meta.label_lower)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, None)
+
+
+def model_versions(models):
+    """Current counters for `models`, as a tuple in the same order"""
+    keys = [MODEL_VERSION_KEY.format(model._meta.label_lower) for model in models]
+    found = cache.get_many(keys)
+    return tuple(found.get(key, 0) for key in keys)
+
+
+# Models each stats payload is derived from
+STATS_GROUP_MODELS = {
+    'dashboard': (Patient, Doctor, Staff, OPDAppointment, IPDAdmission, Payment, Bed),
+    'reports': (Patient, Department, OPDAppointment, IPDAdmission, Payment),
+}
+
+
+def stats_etag(group):
+    """
+    ETag function for django.views.decorators.http.etag.
+    Built from change counters only, so a matching If-None-Match is answered
+    with 304 before any aggregation runs. The date is part of the tag because
+    "today" figures roll over at midnight without any row changing.
+    Only admins may read the stats, so anyone else gets no ETag: the view's
+    403 carries no validator and can never be turned into a 304.
+    """
+    def etag_func(request, *args, **kwargs):
+        if request.user.user_type != 'admin':
+            return None
+        versions = model_versions(STATS_GROUP_MODELS[group])
+        return '-'.join([group, timezone.localdate().strftime('%Y%m%d')] + [str(v) for v in versions])
+    return etag_func
+
+
+# ============ DASHBOARD AGGREGATES ============
+# Each helper below hits its table exactly once, using conditional
+# aggregates (Count/Sum with filter=Q(...)) instead of one query per number.
+# Appointment and revenue totals come from the DailyStats rollup, which is
+# O(days) rather than O(all transactions).
+
+DASHBOARD_STATS_CACHE_KEY = 'stats:dashboard'
+DASHBOARD_STATS_TTL = getattr(settings, 'DASHBOARD_STATS_TTL', 15)
+
+
+def get_status_badge(status):
+    """Helper function to return Bootstrap badge class for appointment status"""
+    status_map = {
+        'Pending': 'warning',
+        'Completed': 'success',
+        'Cancelled': 'danger',
+        'Confirmed': 'info',
+    }
+    return status_map.get(status, 'secondary')
+
+
+def rollup_totals(**filters):
+    """Sum DailyStats rows (one per day and department) matching `filters`"""
+    totals = DailyStats.objects.filter(**filters).aggregate(
+        opd_count=Sum('opd_count'),
+        opd_completed=Sum('opd_completed'),
+        opd_fee_total=Sum('opd_fee_total'),
+        ipd_admissions=Sum('ipd_admissions'),
+        payment_count=Sum('payment_count'),
+        payment_total=Sum('payment_total'),
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+def bed_stats():
+    """Bed counts by status, summed over the per-ward counters"""
+    totals = WardAvailability.objects.aggregate(
+        total=Sum('total'),
+        available=Sum('available'),
+        occupied=Sum('occupied'),
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+def doctor_stats():
+    """Doctor headcount and availability in one query"""
+    return Doctor.objects.aggregate(
+        total=Count('id'),
+        available=Count('id', filter=Q(availability_status='Available')),
+    )
+
+
+def recent_appointments(limit=10):
+    appointments = OPDAppointment.objects.select_related(
+        'patient', 'doctor'
+    ).order_by('-appointment_date')[:limit]
+
+    return [{
+        'patient_name': appointment.patient.name,
+        'doctor_name': appointment.doctor.name if appointment.doctor else 'N/A',
+        'date': appointment.appointment_date.strftime('%b %d, %Y'),
+        'time': appointment.appointment_date.strftime('%I:%M %p'),
+        'status': appointment.status,
+        'status_badge': get_status_badge(appointment.status)
+    } for appointment in appointments]
+
+
+def compute_dashboard_stats():
+    """Build the admin dashboard payload straight from the database"""
+    today = timezone.localdate()
+
+    totals = rollup_totals()
+    today_totals = rollup_totals(date=today)
+    beds = bed_stats()
+    doctors = doctor_stats()
+
+    total_revenue = float(totals['payment_total']) + float(totals['opd_fee_total'])
+    today_revenue = float(today_totals['payment_total']) + float(today_totals['opd_fee_total'])
+
+    return {
+        'counts': {
+            'total_patients': Patient.objects.count(),
+            'total_doctors': doctors['total'],
+            'total_staff': Staff.objects.count(),
+            'total_appointments': totals['opd_count'],
+            'today_appointments': today_totals['opd_count'],
+            'opd_count': totals['opd_count'],
+            'ipd_count': IPDAdmission.objects.filter(status='Admitted').count(),
+            'available_doctors': doctors['available'],
+        },
+        'beds': {
+            'total': beds['total'],
+            'available': beds['available'],
+            'occupied': beds['occupied'],
+        },
+        'revenue': {
+            'total': round(total_revenue, 2),
+            'today': round(today_revenue, 2),
+        },
+        'recent_appointments': recent_appointments(),
+        'timestamp': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def get_dashboard_stats():
+    """
+    Dashboard payload served from the shared cache.
+    All workers read the same entry, so N open dashboards cost one
+    computation per DASHBOARD_STATS_TTL seconds instead of N. The key carries
+    the change counters, so any committed change is picked up immediately.
+    """
+    versions = model_versions(STATS_GROUP_MODELS['dashboard'])
+    key = f"{DASHBOARD_STATS_CACHE_KEY}:{'-'.join(str(v) for v in versions)}"
+    return cache.get_or_set(key, compute_dashboard_stats, DASHBOARD_STATS_TTL)
+
+
+# ============ REPORTS AGGREGATES ============
+
+def compute_reports_stats():
+    """Build the reports & analytics payload from the DailyStats rollup"""
+    today = timezone.localdate()
+    totals = rollup_totals()
+
+    total_revenue = float(totals['payment_total']) + float(totals['opd_fee_total'])
+    total_appointments = totals['opd_count']
+    satisfaction_rate = round((totals['opd_completed'] / total_appointments * 100) if total_appointments > 0 else 0, 1)
+
+    # Department-wise statistics
+    department_stats = DailyStats.objects.filter(
+        department__isnull=False
+    ).values(name=F('department__name')).annotate(
+        appointment_count=Sum('opd_count')
+    ).order_by('-appointment_count')[:5]
+
+    # Monthly revenue trend (last 6 months)
+    six_months_ago = today - timedelta(days=180)
+    monthly_revenue = DailyStats.objects.filter(
+        date__gte=six_months_ago
+    ).annotate(
+        month=TruncMonth('date')
+    ).values('month').annotate(
+        revenue=Sum('payment_total')
+    ).order_by('month')
+
+    return {
+        'stats': {
+            'total_revenue': round(total_revenue, 2),
+            'total_patients': Patient.objects.count(),
+            'total_appointments': total_appointments,
+            'satisfaction_rate': satisfaction_rate,
+        },
+        'department_stats': list(department_stats),
+        'monthly_revenue': [{
+            'month': item['month'].strftime('%b %Y'),
+            'revenue': float(item['revenue'] or 0)
+        } for item in monthly_revenue],
+        'timestamp': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+# ============ ROLLUP REBUILD ============
+
+def rebuild_daily_stats():
+    """Recompute every DailyStats row from the source tables. Returns the row count."""
+    buckets = {}
+
+    def add(rows, fields):
+        for row in rows:
+            bucket = buckets.setdefault((row['day'], row.get('department_id')), {})
+            for field in fields:
+                bucket[field] = bucket.get(field, 0) + (row[field] or 0)
+
+    add(OPDAppointment.objects.annotate(day=TruncDate('appointment_date')).values(
+        'day', department_id=F('doctor__department_id')
+    ).annotate(
+        opd_count=Count('id'),
+        opd_completed=Count('id', filter=Q(status='Completed')),
+        opd_fee_total=Sum('fee'),
+    ).order_by(), ('opd_count', 'opd_completed', 'opd_fee_total'))
+
+    add(IPDAdmission.objects.annotate(day=TruncDate('admission_date')).values(
+        'day', department_id=F('doctor__department_id')
+    ).annotate(
+        ipd_admissions=Count('id'),
+    ).order_by(), ('ipd_admissions',))
+
+    # Payments carry no department
+    add(Payment.objects.annotate(day=TruncDate('payment_date')).values(
+        'day'
+    ).annotate(
+        payment_count=Count('id'),
+        payment_total=Sum('amount'),
+    ).order_by(), ('payment_count', 'payment_total'))
+
+    with transaction.atomic():
+        DailyStats.objects.all().delete()
+        DailyStats.objects.bulk_create([
+            DailyStats(date=day, department_id=department_id, **amounts)
+            for (day, department_id), amounts in buckets.items()
+        ], batch_size=1000)
+    return len(buckets)
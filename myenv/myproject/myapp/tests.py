@@ -1,3 +1,464 @@
-from django.test import TestCase
+import asyncio
+from datetime import date, timedelta
+from decimal import Decimal
+from smtplib import SMTPException
+from unittest import mock
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from .models import (
+    CustomUser, Patient, Doctor, Department, DailyStats, Bed, IPDAdmission, OPDAppointment, Payment, OTP,
+    Sequence, TokenCounter, LedgerEntry, PatientBalance, WardAvailability, OutboundMessage, ReportJob,
+)
+from . import outbox, reports
+from .live import StatGroup
+from .beds import BedUnavailable, admit_patient, discharge_patient
+from .otp_store import CacheOTPStore, DatabaseOTPStore, MAX_ATTEMPTS, VERIFIED, EXPIRED, NO_ATTEMPTS_LEFT, NOT_FOUND
+from .pagination import InvalidCursor, KeysetPaginator, paginate_keyset
+from .stats import rebuild_daily_stats
 
-# Create your tests here.
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'myapp-tests'}}
+
+
+def make_patient(username='patient'):
+    user = CustomUser.objects.create_user(username, f'{username}@example.com', 'pw', user_type='patient')
+    return Patient.objects.create(user=user, name=username.title(), age=40, gender='Female', phone='5550100', email=user.email)
+
+
+def make_doctor(username='doctor'):
+    user = CustomUser.objects.create_user(username, f'{username}@example.com', 'pw', user_type='doctor')
+    return Doctor.objects.create(user=user, first_name='Ann', last_name=username.title(), specialization='General',
+                                 phone='5550101', email=user.email)
+
+
+# ============ OUTBOX ============
+
+class OutboxTests(TestCase):
+    def claimed(self):
+        return outbox.claim_batch(OutboundMessage.EMAIL, 10)
+
+    def test_claim_batch_takes_oldest_due_messages_once(self):
+        first, second, third = [outbox.enqueue_email(f'u{i}@example.com', 'Subject', 'Body') for i in range(3)]
+        batch = outbox.claim_batch(OutboundMessage.EMAIL, 2)
+        self.assertEqual([message.pk for message in batch], [first.pk, second.pk])
+        self.assertEqual(OutboundMessage.objects.filter(status=OutboundMessage.SENDING).count(), 2)
+        self.assertEqual([message.pk for message in self.claimed()], [third.pk])
+        self.assertEqual(self.claimed(), [])
+
+    def test_deliver_emails_sends_batch_and_blanks_bodies(self):
+        for i in range(3):
+            outbox.enqueue_email(f'u{i}@example.com', 'Subject', 'Your OTP is 123456')
+        self.assertEqual(outbox.deliver_emails(self.claimed()), (3, 0))
+        self.assertEqual(sorted(email.to[0] for email in mail.outbox), ['u0@example.com', 'u1@example.com', 'u2@example.com'])
+        for message in OutboundMessage.objects.all():
+            self.assertEqual(message.status, OutboundMessage.SENT)
+            self.assertEqual(message.body, '')
+            self.assertIsNotNone(message.sent_at)
+
+    @mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SMTPException('refused'))
+    def test_failure_is_retried_with_backoff(self, send_messages):
+        message = outbox.enqueue_email('u@example.com', 'Subject', 'Body')
+        before = timezone.now()
+        self.assertEqual(outbox.deliver_emails(self.claimed()), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboundMessage.PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.body, 'Body')
+        self.assertGreaterEqual(message.next_attempt_at, before + outbox.RETRY_BASE_DELAY)
+        # Not due again until the backoff has passed
+        self.assertEqual(self.claimed(), [])
+
+        OutboundMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        before = timezone.now()
+        outbox.deliver_emails(self.claimed())
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 2)
+        self.assertGreaterEqual(message.next_attempt_at, before + outbox.RETRY_BASE_DELAY * 2)
+
+    @mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SMTPException('refused'))
+    def test_gives_up_after_max_attempts(self, send_messages):
+        message = outbox.enqueue_email('u@example.com', 'Subject', 'Body')
+        OutboundMessage.objects.filter(pk=message.pk).update(attempts=outbox.MAX_ATTEMPTS - 1)
+        outbox.deliver_emails(self.claimed())
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboundMessage.FAILED)
+        self.assertEqual(message.attempts, outbox.MAX_ATTEMPTS)
+        self.assertEqual(message.body, '')
+        self.assertIn('refused', message.error)
+
+    @mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SMTPException('refused'))
+    def test_gives_up_when_retry_would_land_after_expiry(self, send_messages):
+        message = outbox.enqueue_email('u@example.com', 'Subject', 'Body', expires_at=timezone.now() + timedelta(seconds=5))
+        outbox.deliver_emails(self.claimed())
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboundMessage.FAILED)
+        self.assertEqual(message.body, '')
+
+    def test_expired_messages_are_not_sent(self):
+        past = timezone.now() - timedelta(minutes=1)
+        claimed = outbox.enqueue_email('late@example.com', 'Subject', 'Body', expires_at=past)
+        queued = outbox.enqueue_sms('5550100', 'Body', expires_at=past)
+        self.assertEqual(outbox.deliver_emails(self.claimed()), (0, 0))
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(outbox.expire_messages(), 1)
+        for message in (claimed, queued):
+            message.refresh_from_db()
+            self.assertEqual(message.status, OutboundMessage.FAILED)
+            self.assertEqual(message.body, '')
+
+    def test_stale_sending_messages_are_requeued(self):
+        message = outbox.enqueue_email('u@example.com', 'Subject', 'Body')
+        self.claimed()
+        OutboundMessage.objects.filter(pk=message.pk).update(claimed_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(outbox.requeue_stale_messages(timedelta(minutes=5)), 1)
+        self.assertEqual([claimed.pk for claimed in self.claimed()], [message.pk])
+
+
+# ============ OTP STORES ============
+
+class OTPStoreChecks:
+    """Behaviour both stores share; subclasses provide make_store()"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('otpuser', 'otp@example.com', 'pw', user_type='admin')
+        self.store = self.make_store()
+
+    def test_correct_code_verifies_once(self):
+        self.store.issue(self.user, '123456')
+        self.assertEqual(self.store.verify(self.user, '123456'), (True, VERIFIED))
+        self.assertFalse(self.store.verify(self.user, '123456')[0])
+
+    def test_wrong_codes_use_up_attempts(self):
+        self.store.issue(self.user, '123456')
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            ok, message = self.store.verify(self.user, '000000')
+            self.assertFalse(ok)
+            self.assertIn(f'{MAX_ATTEMPTS - attempt} attempts remaining', message)
+        self.assertEqual(self.store.verify(self.user, '123456'), (False, NO_ATTEMPTS_LEFT))
+
+    def test_new_code_replaces_old_one_and_its_attempts(self):
+        self.store.issue(self.user, '111111')
+        for _ in range(MAX_ATTEMPTS):
+            self.store.verify(self.user, '000000')
+        self.store.issue(self.user, '222222')
+        self.assertFalse(self.store.verify(self.user, '111111')[0])
+        self.assertEqual(self.store.verify(self.user, '222222'), (True, VERIFIED))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CacheOTPStoreTests(OTPStoreChecks, TestCase):
+    def make_store(self):
+        return CacheOTPStore()
+
+    def test_unknown_user_has_no_code(self):
+        self.assertEqual(self.store.verify(self.user, '123456'), (False, EXPIRED))
+
+    def test_refuses_cache_without_atomic_incr(self):
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/myapp-tests'}}
+        with override_settings(CACHES=caches):
+            with self.assertRaises(ImproperlyConfigured):
+                CacheOTPStore()
+
+
+class DatabaseOTPStoreTests(OTPStoreChecks, TestCase):
+    def make_store(self):
+        return DatabaseOTPStore()
+
+    def test_unknown_user_has_no_code(self):
+        self.assertEqual(self.store.verify(self.user, '123456'), (False, NOT_FOUND))
+
+    def test_code_is_stored_hashed(self):
+        self.store.issue(self.user, '123456')
+        self.assertNotEqual(OTP.objects.get(user=self.user).otp_code, '123456')
+
+    def test_expired_code_is_refused(self):
+        self.store.issue(self.user, '123456')
+        OTP.objects.filter(user=self.user).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.store.verify(self.user, '123456'), (False, EXPIRED))
+
+    def test_purge_removes_used_and_expired_rows(self):
+        self.store.issue(self.user, '111111')
+        self.store.issue(self.user, '222222')
+        self.assertEqual(self.store.purge(batch_size=1), 1)
+        self.assertEqual(OTP.objects.count(), 1)
+
+
+# ============ STATS API ============
+
+class StatsEtagTests(TestCase):
+    def test_admin_gets_304_for_unchanged_stats(self):
+        self.client.force_login(CustomUser.objects.create_user('admin', 'admin@example.com', 'pw', user_type='admin'))
+        response = self.client.get(reverse('api_dashboard_stats'))
+        self.assertEqual(response.status_code, 200)
+        again = self.client.get(reverse('api_dashboard_stats'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_non_admin_gets_403_without_validator(self):
+        self.client.force_login(make_patient().user)
+        for name in ('api_dashboard_stats', 'api_reports_stats'):
+            response = self.client.get(reverse(name), HTTP_IF_NONE_MATCH='*')
+            self.assertEqual(response.status_code, 403)
+            self.assertFalse(response.has_header('ETag'))
+
+
+# ============ LIVE STATS ============
+
+class StatGroupTests(SimpleTestCase):
+    async def test_loop_survives_a_failed_refresh(self):
+        state = {'version': 1, 'calls': 0}
+
+        def compute():
+            state['calls'] += 1
+            if state['calls'] == 1:
+                raise RuntimeError('database went away')
+            return {'version': state['version'], 'timestamp': 'now'}
+
+        group = StatGroup('test', compute, ())
+        with mock.patch('myapp.live.model_versions', lambda models: state['version']), \
+                mock.patch('myapp.live.LIVE_STATS_CHECK_INTERVAL', 0.01), \
+                self.assertLogs('myapp.live', 'ERROR') as logs:
+            queue = group.subscribe()
+            self.assertEqual((await asyncio.wait_for(queue.get(), 5))['version'], 1)
+            state['version'] = 2
+            self.assertEqual((await asyncio.wait_for(queue.get(), 5))['version'], 2)
+            group.unsubscribe(queue)
+            await asyncio.wait_for(group.task, 5)
+        self.assertIn('database went away', logs.output[0])
+
+
+# ============ BED ALLOCATION ============
+
+class BedTests(TestCase):
+    def setUp(self):
+        self.patient = make_patient()
+        self.bed = Bed.objects.create(ward_type='General', bed_number='G-001', daily_charge=Decimal('1000.00'))
+
+    def assertWard(self, available, occupied):
+        ward = WardAvailability.objects.get(ward_type='General')
+        self.assertEqual((ward.total, ward.available, ward.occupied), (1, available, occupied))
+
+    def admit(self, patient=None):
+        return admit_patient((patient or self.patient).pk, None, 'Observation', 'Planned', ward_type='General')
+
+    def test_claim_occupies_bed_and_moves_counters(self):
+        self.assertWard(available=1, occupied=0)
+        admission = self.admit()
+        self.assertEqual(admission.bed_id, self.bed.pk)
+        self.bed.refresh_from_db()
+        self.assertEqual(self.bed.status, 'Occupied')
+        self.assertWard(available=0, occupied=1)
+
+    def test_double_claim_is_refused(self):
+        self.admit()
+        with self.assertRaises(BedUnavailable):
+            admit_patient(self.patient.pk, None, 'Observation', 'Planned', bed_id=self.bed.pk)
+        with self.assertRaises(BedUnavailable):
+            self.admit()
+        self.assertEqual(IPDAdmission.objects.count(), 1)
+        self.assertWard(available=0, occupied=1)
+
+    def test_discharge_releases_bed_once(self):
+        admission = self.admit()
+        self.assertTrue(discharge_patient(admission))
+        admission.refresh_from_db()
+        self.assertEqual(admission.status, 'Discharged')
+        self.assertIsNotNone(admission.discharge_date)
+        self.assertWard(available=1, occupied=0)
+        self.assertFalse(discharge_patient(admission))
+        self.assertWard(available=1, occupied=0)
+
+    def test_repeat_discharge_leaves_relet_bed_occupied(self):
+        first = self.admit()
+        discharge_patient(first)
+        second = self.admit(make_patient('second'))
+        self.assertFalse(discharge_patient(IPDAdmission.objects.get(pk=first.pk)))
+        self.bed.refresh_from_db()
+        self.assertEqual(self.bed.status, 'Occupied')
+        self.assertWard(available=0, occupied=1)
+        self.assertTrue(discharge_patient(second))
+        self.assertWard(available=1, occupied=0)
+
+
+# ============ REPORT JOBS ============
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user('admin', 'admin@example.com', 'pw', user_type='admin')
+        self.client.force_login(self.admin)
+
+    @mock.patch('myapp.reports.REPORT_CHUNK_BYTES', 1000)
+    def test_output_is_stored_in_chunks_and_streamed_back(self):
+        make_doctor()
+        job = ReportJob.objects.create(kind='doctors', requested_by=self.admin)
+        self.assertEqual(reports.run_job(job.id), ReportJob.DONE)
+        job.refresh_from_db()
+        self.assertGreater(job.chunks.count(), 1)
+        response = self.client.get(reverse('report_job_download', args=[job.id]))
+        body = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(len(body), job.size)
+        self.assertTrue(body.startswith(b'%PDF'))
+
+    def test_failed_render_stores_nothing(self):
+        job = ReportJob.objects.create(kind='receipts', params={'patient_id': 0}, requested_by=self.admin)
+        self.assertEqual(reports.run_job(job.id), ReportJob.FAILED)
+        self.assertFalse(job.chunks.exists())
+        self.assertEqual(self.client.get(reverse('report_job_download', args=[job.id])).status_code, 404)
+
+
+# ============ DAILY STATS ROLLUP ============
+
+class DailyStatsTests(TestCase):
+    def rollup(self):
+        """Non-empty DailyStats rows as comparable tuples"""
+        fields = ('opd_count', 'opd_completed', 'opd_fee_total', 'ipd_admissions', 'payment_count', 'payment_total')
+        return sorted(
+            (row['date'], row['department_id'] or 0, *(row[field] for field in fields))
+            for row in DailyStats.objects.values('date', 'department_id', *fields)
+            if any(row[field] for field in fields)
+        )
+
+    def assertMatchesRebuild(self):
+        maintained = self.rollup()
+        rebuild_daily_stats()
+        self.assertEqual(maintained, self.rollup())
+        self.assertFalse(DailyStats.objects.filter(opd_count__lt=0).exists())
+
+    def test_doctor_delete_and_department_change_follow_their_rows(self):
+        cardiology, neurology = Department.objects.create(name='Cardiology'), Department.objects.create(name='Neurology')
+        leaving, moving = make_doctor('leaving'), make_doctor('moving')
+        Doctor.objects.filter(pk__in=[leaving.pk, moving.pk]).update(department=cardiology)
+        patient = make_patient()
+        now = timezone.now()
+        appointments = [
+            OPDAppointment.objects.create(patient=patient, doctor=doctor, appointment_date=now - timedelta(days=days),
+                                          reason='Checkup', fee=Decimal('400.00'), status=status)
+            for doctor in (leaving, moving) for days, status in ((0, 'Completed'), (1, 'Pending'))
+        ]
+        IPDAdmission.objects.create(patient=patient, doctor=leaving, ward_no='General', bed_no='G-1', reason='Observation')
+        Payment.objects.create(patient=patient, amount=Decimal('150.00'), payment_method='Cash')
+        self.assertMatchesRebuild()
+
+        # As admin_delete_doctor does it: the doctor, then their user
+        leaving = Doctor.objects.get(pk=leaving.pk)
+        user = leaving.user
+        leaving.delete()
+        user.delete()
+        moving = Doctor.objects.get(pk=moving.pk)
+        moving.department = neurology
+        moving.save()
+        self.assertMatchesRebuild()
+
+        # Later edits of the orphaned rows land in the buckets they now count in
+        orphan = OPDAppointment.objects.get(pk=appointments[0].pk)
+        orphan.fee = Decimal('250.00')
+        orphan.save()
+        self.assertMatchesRebuild()
+
+
+# ============ PATIENT LEDGER ============
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.patient = make_patient()
+
+    def balance(self):
+        balance = PatientBalance.objects.get(patient=self.patient)
+        return balance.billed, balance.paid, balance.balance
+
+    def test_appointment_edits_post_the_difference(self):
+        appointment = OPDAppointment.objects.create(
+            patient=self.patient, appointment_date=timezone.now(), reason='Checkup', fee=Decimal('500.00')
+        )
+        self.assertEqual(self.balance(), (500, 0, 500))
+        appointment.fee = Decimal('300.00')
+        appointment.save()
+        self.assertEqual(self.balance(), (300, 0, 300))
+        appointment.status = 'Cancelled'
+        appointment.save()
+        self.assertEqual(self.balance(), (0, 0, 0))
+        amounts = LedgerEntry.objects.filter(opd_appointment=appointment).order_by('id').values_list('amount', flat=True)
+        self.assertEqual(list(amounts), [500, -200, -300])
+
+    def test_deleting_payment_posts_a_reversal(self):
+        payment = Payment.objects.create(patient=self.patient, amount=Decimal('250.00'), payment_method='Cash')
+        self.assertEqual(self.balance(), (0, 250, -250))
+        payment.delete()
+        self.assertEqual(self.balance(), (0, 0, 0))
+        reversal = LedgerEntry.objects.order_by('-id').first()
+        self.assertEqual(reversal.amount, 250)
+        self.assertTrue(reversal.description.startswith('Reversal:'))
+        self.assertIsNone(reversal.payment_id)
+
+
+# ============ ID SEQUENCES AND OPD TOKENS ============
+
+class SequenceTests(TestCase):
+    def test_reserve_hands_out_consecutive_blocks(self):
+        self.assertEqual(Sequence.reserve('test'), 1)
+        self.assertEqual(Sequence.reserve('test', 3), 2)
+        self.assertEqual(Sequence.reserve('test'), 5)
+        self.assertEqual(Sequence.reserve('other'), 1)
+
+    def test_next_ids_keep_prefix_style(self):
+        self.assertEqual(Sequence.next_ids('test', 'PAT', 2), ['PAT001', 'PAT002'])
+        Sequence.objects.filter(name='test').update(last_value=999)
+        self.assertEqual(Sequence.next_ids('test', 'PAT'), ['PAT1000'])
+
+    def test_patients_get_sequence_ids(self):
+        first, second = make_patient('first'), make_patient('second')
+        self.assertEqual(int(second.patient_id[3:]), int(first.patient_id[3:]) + 1)
+
+
+class TokenCounterTests(TestCase):
+    def test_tokens_count_per_doctor_and_day(self):
+        doctor, other = make_doctor('first'), make_doctor('second')
+        today, tomorrow = date(2026, 1, 5), date(2026, 1, 6)
+        self.assertEqual([TokenCounter.issue(doctor.pk, today) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(TokenCounter.issue(other.pk, today), 1)
+        self.assertEqual(TokenCounter.issue(doctor.pk, tomorrow), 1)
+
+    def test_registrations_without_doctor_share_one_series(self):
+        self.assertEqual([TokenCounter.issue(None) for _ in range(2)], [1, 2])
+        self.assertEqual(TokenCounter.objects.filter(doctor__isnull=True).count(), 1)
+
+
+# ============ KEYSET PAGINATION ============
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        # Ties on daily_charge, so the id tiebreaker has to do its job
+        for number, charge in enumerate([500, 500, 400, 400, 400, 300, 200]):
+            Bed.objects.create(ward_type='General', bed_number=f'G-{number:03d}', daily_charge=charge)
+        self.ordering = ('-daily_charge', 'id')
+        self.expected = list(Bed.objects.order_by(*self.ordering).values_list('id', flat=True))
+        self.paginator = KeysetPaginator(Bed.objects.all(), self.ordering, per_page=3)
+
+    def ids(self, page):
+        return [bed.id for bed in page]
+
+    def test_next_cursors_walk_every_row_once(self):
+        first = self.paginator.page()
+        self.assertFalse(first.has_previous)
+        second = self.paginator.page(first.next_cursor)
+        third = self.paginator.page(second.next_cursor)
+        self.assertFalse(third.has_next)
+        self.assertEqual(self.ids(first) + self.ids(second) + self.ids(third), self.expected)
+
+    def test_previous_cursor_returns_the_same_page(self):
+        first = self.paginator.page()
+        second = self.paginator.page(first.next_cursor)
+        third = self.paginator.page(second.next_cursor)
+        back = self.paginator.page(third.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertEqual(self.ids(self.paginator.page(back.previous_cursor)), self.ids(first))
+
+    def test_bad_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            self.paginator.page('not-a-cursor')
+        request = RequestFactory().get('/beds/', {'cursor': 'not-a-cursor', 'ward': 'General'})
+        page = paginate_keyset(request, Bed.objects.all(), self.ordering, per_page=3)
+        self.assertEqual(self.ids(page), self.expected[:3])
+        self.assertIn('ward=General', page.next_url)
@@ -15,9 +15,17 @@ urlpatterns = [
     # API URLs
     path('api/admin/dashboard-stats/', api_views.dashboard_stats_api, name="api_dashboard_stats"),
     path('api/admin/reports-stats/', api_views.reports_stats_api, name="api_reports_stats"),
+    path('api/admin/ward-revenue/', api_views.ward_revenue_api, name="api_ward_revenue"),
+    path('api/beds/availability/', api_views.bed_availability_api, name="api_bed_availability"),
+    path('api/beds/free/', api_views.free_beds_api, name="api_free_beds"),
+    path('api/beds/forecast/', api_views.bed_forecast_api, name="api_bed_forecast"),
+    path('api/admin/live/<str:group>/', api_views.live_stats_stream, name="api_live_stats"),
     path('api/admin/reports/financial-pdf/', api_views.financial_report_pdf, name="financial_report_pdf"),
     path('api/admin/reports/patient-excel/', api_views.patient_records_excel, name="patient_records_excel"),
     path('api/admin/reports/staff-csv/', api_views.staff_performance_csv, name="staff_performance_csv"),
+    path('api/admin/reports/payments-csv/', api_views.payments_csv, name="payments_csv"),
+    path('api/admin/reports/opd-csv/', api_views.opd_appointments_csv, name="opd_appointments_csv"),
+    path('api/admin/reports/ipd-csv/', api_views.ipd_admissions_csv, name="ipd_admissions_csv"),
     
     # Admin URLs
     path('admin/dashboard/', views.admin_dashboard, name="admin_dashboard"),
@@ -32,8 +40,12 @@ urlpatterns = [
     path('admin/patients/view/<int:id>/', views.admin_view_patient, name="admin_view_patient"),
     path('admin/patients/delete/<int:id>/', views.admin_delete_patient, name="admin_delete_patient"),
     path('admin/patients/pdf/', views.admin_patients_pdf, name="admin_patients_pdf"),
+    path('admin/reports/jobs/<int:job_id>/', views.report_job, name="report_job"),
+    path('admin/reports/jobs/<int:job_id>/status/', views.report_job_status, name="report_job_status"),
+    path('admin/reports/jobs/<int:job_id>/download/', views.report_job_download, name="report_job_download"),
     path('admin/appointments/', views.admin_appointments, name="admin_appointments"),
     path('admin/billing/', views.admin_billing, name="admin_billing"),
+    path('admin/billing/receipts-export/', views.admin_receipts_export, name="admin_receipts_export"),
     path('admin/reports/', views.admin_reports, name="admin_reports"),
     path('admin/profile/', views.admin_profile, name="admin_profile"),
 
@@ -4,10 +4,19 @@ from django.db.models import Sum, Count, Q
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from .models import *
 from .otp_utils import create_otp, verify_otp
+from .stats import rollup_totals, compute_reports_stats
+from .querysets import for_view
+from .billing import reconcile, patient_bill_summary, with_ipd_charges
+from .ledger import top_debtors
+from .beds import admit_patient, discharge_patient, ward_availability, get_bed_forecast
+from .reports import queue_report, job_status, job_download, receipt_digest, cached_receipt
+from .exports import date_range
+from .pagination import paginate_keyset, APPOINTMENT_ORDERING, ADMISSION_ORDERING, PAYMENT_ORDERING, PATIENT_ORDERING
 from django.contrib.auth.hashers import make_password
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from django.http import JsonResponse
 from django.core.mail import send_mail
 import razorpay
@@ -186,26 +195,28 @@ def patient_register_view(request):
         if CustomUser.objects.filter(email=email).exists():
             return render(request, 'myapp/auth/patient_register.html', {'error': 'Email already registered'})
         
+        # Allocated outside the transaction so the sequence row is not locked while the password hashes
         patient_id = Patient.generate_patient_id()
-        user = CustomUser.objects.create_user(
-            username=patient_id,
-            email=email,
-            password=password,
-            user_type='patient',
-            phone=phone
-        )
-        
-        Patient.objects.create(
-            user=user,
-            patient_id=patient_id,
-            name=name,
-            age=age,
-            gender=gender,
-            blood_group=blood_group,
-            phone=phone,
-            email=email,
-            address=address
-        )
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(
+                username=patient_id,
+                email=email,
+                password=password,
+                user_type='patient',
+                phone=phone
+            )
+            
+            Patient.objects.create(
+                user=user,
+                patient_id=patient_id,
+                name=name,
+                age=age,
+                gender=gender,
+                blood_group=blood_group,
+                phone=phone,
+                email=email,
+                address=address
+            )
         
         return render(request, 'myapp/auth/patient_register.html', {
             'success': f'Registration successful! Your Patient ID is: {patient_id}. Please login.'
@@ -227,14 +238,13 @@ def admin_dashboard(request):
     today = timezone.localdate()
     
     # Stats
+    totals = rollup_totals()
     total_doctors = Doctor.objects.count()
     total_patients = Patient.objects.count()
-    total_appointments = OPDAppointment.objects.count()
+    total_appointments = totals['opd_count']
     
-    # Revenue Calculation
-    pay_rev = Payment.objects.aggregate(Sum('amount'))['amount__sum'] or 0
-    opd_rev = OPDAppointment.objects.aggregate(Sum('fee'))['fee__sum'] or 0
-    total_revenue = pay_rev + opd_rev
+    # Revenue Calculation (from the DailyStats rollup)
+    total_revenue = totals['payment_total'] + totals['opd_fee_total']
     
     # Recent Data
     recent_appointments = OPDAppointment.objects.filter(appointment_date__date=today).order_by('-appointment_date')[:10]
@@ -248,7 +258,7 @@ def admin_dashboard(request):
         'recent_appointments': recent_appointments,
         'recent_patients': recent_patients,
         'opd_count': total_appointments,
-        'ipd_count': IPDAdmission.objects.count(),
+        'ipd_count': totals['ipd_admissions'],
     }
     
     return render(request, "myapp/admin/admin_dashboard.html", context)
@@ -456,115 +466,18 @@ def admin_delete_doctor(request, id):
 
 @login_required
 def admin_doctors_pdf(request):
-    """Generate PDF of all doctors"""
+    """Queue a PDF of all doctors"""
     if request.user.user_type != 'admin':
         return redirect('login')
     
-    from django.http import HttpResponse
-    from reportlab.lib.pagesizes import A4, landscape
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.enums import TA_CENTER
-    from io import BytesIO
-    
-    # Create PDF buffer
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#2c3e50'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Add title
-    title = Paragraph("Hospital Management System - All Doctors", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-    
-    # Get all doctors
-    doctors = Doctor.objects.all().order_by('-id')
-    
-    # Prepare table data
-    data = [['ID', 'Name', 'Specialization', 'Department', 'Phone', 'Email', 'Status']]
-    
-    for doctor in doctors:
-        data.append([
-            doctor.doctor_id,
-            doctor.name[:25],  # Truncate if too long
-            doctor.specialization[:20],
-            (doctor.department.name[:15] if doctor.department else 'N/A'),
-            doctor.phone,
-            doctor.email[:30],  # Truncate if too long
-            doctor.availability_status
-        ])
-    
-    # Create table
-    table = Table(data, colWidths=[0.8*inch, 1.8*inch, 1.5*inch, 1.2*inch, 1.2*inch, 2*inch, 1*inch])
-    
-    # Style the table
-    table.setStyle(TableStyle([
-        # Header row
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('TOPPADDING', (0, 0), (-1, 0), 12),
-        
-        # Data rows
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#ecf0f1')]),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('TOPPADDING', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-    ]))
-    
-    elements.append(table)
-    
-    # Add footer info
-    elements.append(Spacer(1, 20))
-    footer_style = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=10, textColor=colors.grey, alignment=TA_CENTER)
-    footer_text = f"Generated on: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')} | Total Doctors: {doctors.count()}"
-    footer = Paragraph(footer_text, footer_style)
-    elements.append(footer)
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Get PDF from buffer
-    pdf = buffer.getvalue()
-    buffer.close()
-    
-    # Create response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="all_doctors_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
-    response.write(pdf)
-    
-    return response
+    return queue_report(request, 'doctors')
 
 
 @login_required
 def admin_patients(request):
     if request.user.user_type != 'admin':
         return redirect('login')
-    patients = Patient.objects.all().order_by('-id')
+    patients = paginate_keyset(request, Patient.objects.all(), PATIENT_ORDERING)
     return render(request, "myapp/admin/patients.html", {'patients': patients})
 
 @login_required
@@ -572,7 +485,7 @@ def admin_appointments(request):
     if request.user.user_type != 'admin':
         return redirect('login')
     # Fetch all appointments ordered by date (newest first)
-    appointments = OPDAppointment.objects.all().order_by('-appointment_date')
+    appointments = paginate_keyset(request, for_view('admin_appointments', OPDAppointment.objects.all()), APPOINTMENT_ORDERING)
     return render(request, "myapp/admin/appointments.html", {'appointments': appointments})
 
 @login_required
@@ -580,34 +493,81 @@ def admin_billing(request):
     if request.user.user_type != 'admin':
         return redirect('login')
     # Fetch all payments ordered by date (newest first)
-    payments = Payment.objects.all().order_by('-payment_date')
-    return render(request, "myapp/admin/billing.html", {'payments': payments})
+    payments = paginate_keyset(request, for_view('admin_billing', Payment.objects.all()), PAYMENT_ORDERING)
+    return render(request, "myapp/admin/billing.html", {'payments': payments, 'debtors': top_debtors()})
+
+@login_required
+def admin_receipts_export(request):
+    """Queue a ZIP of receipts for a date range and/or one patient"""
+    if request.user.user_type != 'admin':
+        return redirect('login')
+    if request.method != 'POST':
+        return redirect('admin_billing')
+    
+    try:
+        start, end = date_range(request.POST, 'start', 'end')
+    except ValueError:
+        messages.error(request, 'Invalid date.')
+        return redirect('admin_billing')
+    patient = None
+    patient_code = request.POST.get('patient', '').strip()
+    if patient_code:
+        patient = Patient.objects.filter(patient_id__iexact=patient_code).only('id').first()
+        if patient is None:
+            messages.error(request, f'No patient with ID {patient_code}.')
+            return redirect('admin_billing')
+    if not (start or end or patient):
+        messages.error(request, 'Choose a date range or a patient to export receipts for.')
+        return redirect('admin_billing')
+    
+    return queue_report(
+        request, 'receipts',
+        start=start.isoformat() if start else None,
+        end=end.isoformat() if end else None,
+        patient_id=patient.id if patient else None,
+    )
 
 @login_required
 def admin_reports(request):
     if request.user.user_type != 'admin':
         return redirect('login')
     
-    # Calculate statistics for initial page load
-    payment_revenue = Payment.objects.aggregate(Sum('amount'))['amount__sum'] or 0
-    opd_revenue = OPDAppointment.objects.aggregate(Sum('fee'))['fee__sum'] or 0
-    total_revenue = float(payment_revenue) + float(opd_revenue)
+    # Calculate statistics for initial page load (same payload as the live API)
+    context = compute_reports_stats()['stats']
     
-    total_patients = Patient.objects.count()
-    total_appointments = OPDAppointment.objects.count()
+    return render(request, "myapp/admin/reports.html", context)
+
+# ============ REPORT JOBS ============
+
+@login_required
+def report_job(request, job_id):
+    """Waits for a queued report and links the download"""
+    if request.user.user_type != 'admin':
+        return redirect('login')
     
-    # Calculate satisfaction rate
-    completed_appts = OPDAppointment.objects.filter(status='Completed').count()
-    satisfaction_rate = round((completed_appts / total_appointments * 100) if total_appointments > 0 else 0, 1)
+    job = get_object_or_404(ReportJob, id=job_id)
+    return render(request, "myapp/admin/report_job.html", {'job': job, 'status': job_status(job)})
+
+@login_required
+def report_job_status(request, job_id):
+    """Polled by the report page until the job is done or failed"""
+    if request.user.user_type != 'admin':
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
     
-    context = {
-        'total_revenue': total_revenue,
-        'total_patients': total_patients,
-        'total_appointments': total_appointments,
-        'satisfaction_rate': satisfaction_rate,
-    }
+    job = get_object_or_404(ReportJob, id=job_id)
+    return JsonResponse(job_status(job))
+
+@login_required
+def report_job_download(request, job_id):
+    if request.user.user_type != 'admin':
+        return redirect('login')
     
-    return render(request, "myapp/admin/reports.html", context)
+    from django.http import Http404
+    job = get_object_or_404(ReportJob, id=job_id, status=ReportJob.DONE)
+    if job.size is None:
+        raise Http404("Report file is gone")
+    # Content type follows the filename: PDF, or ZIP for bulk receipts
+    return job_download(request, job)
 
 @login_required
 def admin_profile(request):
@@ -670,7 +630,7 @@ def admin_add_patient(request):
         
         # Validation
         if Patient.objects.filter(phone=phone).exists():
-            patients = Patient.objects.all().order_by('-id')
+            patients = paginate_keyset(request, Patient.objects.all(), PATIENT_ORDERING)
             return render(request, "myapp/admin/patients.html", {
                 'patients': patients,
                 'error': 'Patient with this phone already exists.'
@@ -701,13 +661,13 @@ def admin_add_patient(request):
                 address=address
             )
             
-            patients = Patient.objects.all().order_by('-id')
+            patients = paginate_keyset(request, Patient.objects.all(), PATIENT_ORDERING)
             return render(request, "myapp/admin/patients.html", {
                 'patients': patients,
                 'success': f'Patient created successfully! ID: {patient_id}'
             })
         except Exception as e:
-            patients = Patient.objects.all().order_by('-id')
+            patients = paginate_keyset(request, Patient.objects.all(), PATIENT_ORDERING)
             return render(request, "myapp/admin/patients.html", {
                 'patients': patients,
                 'error': f'Error creating patient: {str(e)}'
@@ -760,108 +720,11 @@ def admin_delete_patient(request, id):
 
 @login_required
 def admin_patients_pdf(request):
-    """Generate PDF of all patients"""
+    """Queue a PDF of all patients"""
     if request.user.user_type != 'admin':
         return redirect('login')
     
-    from django.http import HttpResponse
-    from reportlab.lib.pagesizes import A4, landscape
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT
-    from io import BytesIO
-    
-    # Create PDF buffer
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#2c3e50'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Add title
-    title = Paragraph("Hospital Management System - All Patients", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-    
-    # Get all patients
-    patients = Patient.objects.all().order_by('-id')
-    
-    # Prepare table data
-    data = [['ID', 'Name', 'Age', 'Gender', 'Phone', 'Blood Group', 'Email']]
-    
-    for patient in patients:
-        data.append([
-            patient.patient_id,
-            patient.name[:20],  # Truncate if too long
-            str(patient.age),
-            patient.gender,
-            patient.phone,
-            patient.blood_group or 'N/A',
-            patient.email[:25]  # Truncate if too long
-        ])
-    
-    # Create table
-    table = Table(data, colWidths=[0.8*inch, 1.8*inch, 0.6*inch, 0.8*inch, 1.2*inch, 1*inch, 2*inch])
-    
-    # Style the table
-    table.setStyle(TableStyle([
-        # Header row
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('TOPPADDING', (0, 0), (-1, 0), 12),
-        
-        # Data rows
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#ecf0f1')]),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('TOPPADDING', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-    ]))
-    
-    elements.append(table)
-    
-    # Add footer info
-    elements.append(Spacer(1, 20))
-    footer_style = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=10, textColor=colors.grey, alignment=TA_CENTER)
-    footer_text = f"Generated on: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')} | Total Patients: {patients.count()}"
-    footer = Paragraph(footer_text, footer_style)
-    elements.append(footer)
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Get PDF from buffer
-    pdf = buffer.getvalue()
-    buffer.close()
-    
-    # Create response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="all_patients_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
-    response.write(pdf)
-    
-    return response
+    return queue_report(request, 'patients')
 
 
 # ============ DEPARTMENT VIEWS ============
@@ -988,7 +851,7 @@ def delete_staff(request, id):
 def opd_list(request):
     if request.user.user_type != 'admin':
         return redirect('login')
-    appointments = OPDAppointment.objects.all().order_by('-appointment_date')
+    appointments = paginate_keyset(request, for_view('opd_list', OPDAppointment.objects.all()), APPOINTMENT_ORDERING)
     return render(request, "myapp/admin/opd/list.html", {'appointments': appointments})
 
 @login_required
@@ -1037,7 +900,7 @@ def opd_edit(request, id):
 def ipd_list(request):
     if request.user.user_type != 'admin':
         return redirect('login')
-    admissions = IPDAdmission.objects.all().order_by('-admission_date')
+    admissions = paginate_keyset(request, for_view('ipd_list', IPDAdmission.objects.all()), ADMISSION_ORDERING)
     return render(request, "myapp/admin/ipd/list.html", {'admissions': admissions})
 
 @login_required
@@ -1070,9 +933,9 @@ def ipd_discharge(request, id):
         return redirect('login')
     admission = IPDAdmission.objects.get(id=id)
     if request.method == 'POST':
-        admission.status = 'Discharged'
-        admission.discharge_date = timezone.now()
-        admission.save()
+        if admission.status == 'Admitted':
+            admission.discharge_date = timezone.now()
+        discharge_patient(admission)
         return redirect('ipd_list')
     return render(request, "myapp/admin/ipd/discharge.html", {'admission': admission})
 
@@ -1082,7 +945,7 @@ def ipd_discharge(request, id):
 def payment_list(request):
     if request.user.user_type != 'admin':
         return redirect('login')
-    payments = Payment.objects.all().order_by('-payment_date')
+    payments = paginate_keyset(request, for_view('payment_list', Payment.objects.all()), PAYMENT_ORDERING)
     return render(request, "myapp/admin/payments/list.html", {'payments': payments})
 
 @login_required
@@ -1139,11 +1002,11 @@ def laboratory_dashboard(request):
     completed_today = LabReport.objects.filter(status='Uploaded', requested_date__date=timezone.localdate()).count()
     
     # Lists
-    pending_tests = LabReport.objects.filter(status='Pending').order_by('requested_date')
-    recent_uploads = LabReport.objects.filter(status='Uploaded').order_by('-requested_date')[:5]
+    pending_tests = for_view('laboratory_dashboard', LabReport.objects.filter(status='Pending')).order_by('requested_date')
+    recent_uploads = for_view('laboratory_dashboard', LabReport.objects.filter(status='Uploaded')).order_by('-requested_date')[:5]
     
     # For Add Test Modal
-    patients = Patient.objects.all().order_by('name')
+    patients = for_view('laboratory_dashboard', Patient.objects.all()).order_by('name')
     doctors = Doctor.objects.filter(availability_status='Available')
     
     context = {
@@ -1251,7 +1114,7 @@ def receptionist_appointments(request):
     if request.user.user_type != 'staff' or request.user.staff_profile.role != 'Receptionist':
         return redirect('login')
     # Reuse admin or doctor logic later, placeholder for now
-    appointments = OPDAppointment.objects.all().order_by('-appointment_date')
+    appointments = paginate_keyset(request, for_view('receptionist_appointments', OPDAppointment.objects.all()), APPOINTMENT_ORDERING)
     return render(request, "myapp/staff/receptionist/appointments.html", {'appointments': appointments})
 
 @login_required
@@ -1280,27 +1143,28 @@ def receptionist_add_patient(request):
         password = phone 
         
         try:
-            user = CustomUser.objects.create_user(
-                username=patient_id,
-                email=email,
-                password=password,
-                user_type='patient',
-                phone=phone
-            )
-            
-            Patient.objects.create(
-                user=user,
-                patient_id=patient_id,
-                name=name,
-                age=age,
-                gender=gender,
-                blood_group=blood_group,
-                phone=phone,
-                email=email,
-                address=address,
-                emergency_contact=emergency_contact,
-                id_proof_number=id_proof
-            )
+            with transaction.atomic():
+                user = CustomUser.objects.create_user(
+                    username=patient_id,
+                    email=email,
+                    password=password,
+                    user_type='patient',
+                    phone=phone
+                )
+            
+                Patient.objects.create(
+                    user=user,
+                    patient_id=patient_id,
+                    name=name,
+                    age=age,
+                    gender=gender,
+                    blood_group=blood_group,
+                    phone=phone,
+                    email=email,
+                    address=address,
+                    emergency_contact=emergency_contact,
+                    id_proof_number=id_proof
+                )
             
             return render(request, "myapp/staff/receptionist/add_patient.html", {'success': f'Patient Registered Successfully! ID: {patient_id}'})
             
@@ -1326,21 +1190,20 @@ def receptionist_opd_register(request):
         fee = request.POST.get('fee', '500') # Default fee
         
         try:
-             # Generate Token (Simple auto-increment for the day)
-            today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            token_count = OPDAppointment.objects.filter(appointment_date__gte=today_start).count()
-            token_no = token_count + 1
-            
-            appointment = OPDAppointment.objects.create(
-                patient_id=patient_id,
-                doctor_id=doctor_id,
-                appointment_date=timezone.now(),
-                reason=reason,
-                status='Pending',
-                fee=fee,
-                visit_type=visit_type,
-                token_no=token_no
-            )
+            # Token from the doctor's own series for today, issued with the appointment
+            with transaction.atomic():
+                token_no = TokenCounter.issue(doctor_id or None)
+                
+                appointment = OPDAppointment.objects.create(
+                    patient_id=patient_id,
+                    doctor_id=doctor_id,
+                    appointment_date=timezone.now(),
+                    reason=reason,
+                    status='Pending',
+                    fee=fee,
+                    visit_type=visit_type,
+                    token_no=token_no
+                )
             
             return redirect('receptionist_opd_slip', id=appointment.id)
             
@@ -1363,8 +1226,19 @@ def receptionist_opd_slip(request, id):
     if request.user.user_type != 'staff' or request.user.staff_profile.role != 'Receptionist':
         return redirect('login')
     
-    appointment = OPDAppointment.objects.get(id=id)
-    return render(request, "myapp/staff/receptionist/opd_slip.html", {'appointment': appointment})
+    appointment = OPDAppointment.objects.select_related('patient', 'doctor__department').get(id=id)
+    
+    # Patients still waiting ahead of this token in the same doctor's queue
+    day_start = timezone.localtime(appointment.appointment_date).replace(hour=0, minute=0, second=0, microsecond=0)
+    patients_ahead = OPDAppointment.objects.filter(
+        doctor_id=appointment.doctor_id,
+        appointment_date__gte=day_start,
+        appointment_date__lt=day_start + timedelta(days=1),
+        status='Pending',
+        token_no__lt=appointment.token_no or 0,
+    ).count()
+    
+    return render(request, "myapp/staff/receptionist/opd_slip.html", {'appointment': appointment, 'patients_ahead': patients_ahead})
 
 @login_required
 def receptionist_opd_list(request):
@@ -1372,15 +1246,17 @@ def receptionist_opd_list(request):
         return redirect('login')
     
     query = request.GET.get('search', '')
-    appointments = OPDAppointment.objects.all().order_by('-appointment_date')
+    appointments = for_view('receptionist_opd_list', OPDAppointment.objects.all())
     
     if query:
         appointments = appointments.filter(
             Q(patient__name__icontains=query) |
             Q(patient__patient_id__icontains=query) |
-            Q(doctor__name__icontains=query) |
+            Q(doctor__first_name__icontains=query) |
+            Q(doctor__last_name__icontains=query) |
             Q(token_no__icontains=query)
         )
+    appointments = paginate_keyset(request, appointments, APPOINTMENT_ORDERING)
             
     return render(request, "myapp/staff/receptionist/opd_list.html", {'appointments': appointments, 'search_query': query})
 
@@ -1392,47 +1268,30 @@ def receptionist_ipd_admit(request):
         
     patients = Patient.objects.all().order_by('-id')
     doctors = Doctor.objects.filter(availability_status='Available')
-    beds = Bed.objects.filter(status='Available')
     
     if request.method == 'POST':
-        patient_id = request.POST.get('patient')
-        doctor_id = request.POST.get('doctor')
-        admission_type = request.POST.get('admission_type')
-        reason = request.POST.get('reason')
-        bed_id = request.POST.get('bed')
-        
         try:
-             # Transaction atomic suggested but keeping simple
-            bed = Bed.objects.get(id=bed_id)
-            
-            # Create Admission
-            IPDAdmission.objects.create(
-                patient_id=patient_id,
-                doctor_id=doctor_id,
-                bed=bed, # Link to Bed model
-                ward_no=bed.ward_type, # redundancy for easy access
-                bed_no=bed.bed_number, # redundancy
-                reason=reason,
-                status='Admitted',
-                admission_type=admission_type
+            # Locks the bed and creates the admission in one transaction (beds.py)
+            admit_patient(
+                patient_id=request.POST.get('patient'),
+                doctor_id=request.POST.get('doctor'),
+                reason=request.POST.get('reason'),
+                admission_type=request.POST.get('admission_type'),
+                ward_type=request.POST.get('ward_type'),
+                bed_id=request.POST.get('bed') or None,
             )
-            
-            # Update Bed Status
-            bed.status = 'Occupied'
-            bed.save()
-            
             return redirect('receptionist_ipd_list')
             
         except Exception as e:
             return render(request, "myapp/staff/receptionist/ipd_admission.html", {
-                'patients': patients, 'doctors': doctors, 'beds': beds, 'error': str(e)
+                'patients': patients, 'doctors': doctors, 'wards': ward_availability(), 'error': str(e)
             })
 
+    # Beds are fetched per ward by the form (api_free_beds), not all listed here
     return render(request, "myapp/staff/receptionist/ipd_admission.html", {
         'patients': patients, 
         'doctors': doctors,
-        'beds': beds,
-        'ward_types': Bed.WARD_CHOICES
+        'wards': ward_availability(),
     })
 
 @login_required
@@ -1441,13 +1300,14 @@ def receptionist_ipd_list(request):
         return redirect('login')
         
     query = request.GET.get('search', '')
-    admissions = IPDAdmission.objects.filter(status='Admitted').order_by('-admission_date')
+    admissions = for_view('receptionist_ipd_list', IPDAdmission.objects.filter(status='Admitted')).order_by('-admission_date')
     
     if query:
         admissions = admissions.filter(
             Q(patient__name__icontains=query) |
             Q(patient__patient_id__icontains=query) |
-            Q(doctor__name__icontains=query) |
+            Q(doctor__first_name__icontains=query) |
+            Q(doctor__last_name__icontains=query) |
             Q(bed_no__icontains=query) |
             Q(ward_no__icontains=query)
         )
@@ -1476,19 +1336,11 @@ def receptionist_finalize_discharge(request, id):
     admission = get_object_or_404(IPDAdmission, id=id)
     
     if request.method == 'POST':
-        # 1. Update Admission Status
-        admission.status = 'Discharged'
-        # Check if discharge_date already set? If not use now.
-        if not admission.discharge_date:
-             admission.discharge_date = timezone.now()
-        admission.save()
-        
-        # 2. Free the Bed
-        if admission.bed:
-            admission.bed.status = 'Available'
-            admission.bed.save()
-            
-        messages.success(request, f'Patient {admission.patient.name} discharged successfully.')
+        # Sets the discharge date if the doctor's request did not, and frees the bed
+        if discharge_patient(admission):
+            messages.success(request, f'Patient {admission.patient.name} discharged successfully.')
+        else:
+            messages.error(request, f'Patient {admission.patient.name} has already been discharged.')
         return redirect('receptionist_ipd_list')
         
     # Confirmation Page (optional, but good practice)
@@ -1636,18 +1488,20 @@ def receptionist_billing_view(request):
         return redirect('login')
     
     # OPD Bills (Appointments with fees)
-    opd_bills = OPDAppointment.objects.all().order_by('-appointment_date')
+    opd_bills = for_view('receptionist_billing_view', OPDAppointment.objects.all()).order_by('-appointment_date')
     
-    # IPD Bills (Admitted patients) - In real app, separate Bill model linked to Admission
-    # For now, just listing admissions
-    ipd_bills = IPDAdmission.objects.all().order_by('-admission_date')
+    # IPD Bills (bed charges for each stay)
+    ipd_bills = with_ipd_charges(for_view('receptionist_billing_view', IPDAdmission.objects.all())).order_by('-admission_date')
     
     # Payments
-    payments = Payment.objects.all().order_by('-payment_date')
+    payments = list(for_view('receptionist_billing_view', Payment.objects.all()).order_by('-payment_date'))
+    
+    # Paid/Pending from the same matching the patient's bills page uses
+    bills = reconcile(opd_bills, ipd_bills, payments)
     
     return render(request, "myapp/staff/receptionist/billing_view.html", {
-        'opd_bills': opd_bills,
-        'ipd_bills': ipd_bills,
+        'opd_bills': [bill for bill in bills if bill['type'] == 'OPD'],
+        'ipd_bills': [bill for bill in bills if bill['type'] == 'IPD'],
         'payments': payments
     })
 
@@ -1901,9 +1755,9 @@ def patient_appointments(request):
             messages.error(request, 'Appointment not found')
         return redirect('patient_appointments')
     
-    appointments = OPDAppointment.objects.filter(
+    appointments = for_view('patient_appointments', OPDAppointment.objects.filter(
         patient=patient
-    ).order_by('-appointment_date')
+    )).order_by('-appointment_date')
     
     context = {
         'patient': patient,
@@ -1946,99 +1800,12 @@ def patient_bills(request):
     
     patient = request.user.patient_profile
     
-    # 1. Fetch Existing Payments
-    payments = Payment.objects.filter(patient=patient).order_by('-payment_date')
-    
-    # 2. Generate Bills from OPD Appointments
-    opd_appointments = OPDAppointment.objects.filter(patient=patient).order_by('-appointment_date')
-    bill_items = []
-    
-    for appt in opd_appointments:
-        # Check if already paid (simplistic check: look for payment with same amount ~approx time or description)
-        # Real system would link Payment to Appointment via ForeignKey
-        is_paid = False
-        matching_payment = None
-        
-        # Simple matching logic: Check if any payment description contains "OPD" and "Doctor Name" or generic match
-        # Ideally, we should add a OneToOne or ForeignKey to Payment, but for this existing schema:
-        # We will assume if status is 'Completed' it *might* be paid, but let's rely on Payment table.
-        # BETTER STRATEGY: Show "Pay Now" if no payment found for this amount on this day.
-        
-        # Checking if a payment exists for this amount and date (approx)
-        for payment in payments:
-            if payment.amount == appt.fee and payment.payment_date.date() == appt.appointment_date.date():
-                is_paid = True
-                matching_payment = payment
-                break
-        
-        bill_items.append({
-            'id': f"OPD-{appt.id}",
-            'type': 'OPD',
-            'date': appt.appointment_date,
-            'description': f"Consultation - Dr. {appt.doctor.name if appt.doctor else 'Unknown'}",
-            'amount': appt.fee,
-            'status': 'Paid' if is_paid else 'Pending',
-            'obj_id': appt.id,
-            'payment_id': matching_payment.id if matching_payment else None
-        })
-
-    # 3. Generate Bills from IPD Admissions
-    ipd_admissions = IPDAdmission.objects.filter(patient=patient).order_by('-admission_date')
-    
-    for admission in ipd_admissions:
-        # Calculate Bill Amount
-        if admission.discharge_date:
-            days = (admission.discharge_date.date() - admission.admission_date.date()).days
-        else:
-            days = (timezone.now().date() - admission.admission_date.date()).days
-            
-        if days == 0: days = 1 # Minimum 1 day charge
-        
-        # Get Bed Charge
-        daily_charge = 0
-        if admission.bed:
-             daily_charge = admission.bed.daily_charge
-        
-        total_amount = days * daily_charge
-        
-        # Check Payment Status
-        is_paid = False
-        matching_payment = None
-        # Simplified check
-        for payment in payments:
-            # Heuristic match
-            if payment.amount == total_amount and payment.description and "IPD" in payment.description:
-                is_paid = True
-                matching_payment = payment
-                break
-        
-        bill_items.append({
-            'id': f"IPD-{admission.id}",
-            'type': 'IPD',
-            'date': admission.admission_date,
-            'description': f"Inpatient Care - {days} Days (Ward: {admission.ward_no})",
-            'amount': total_amount,
-            'status': 'Paid' if is_paid else 'Pending',
-            'obj_id': admission.id,
-            'payment_id': matching_payment.id if matching_payment else None
-        })
-    
-    # Sort all items by date desc
-    bill_items.sort(key=lambda x: x['date'], reverse=True)
-    
-    total_billed = sum(item['amount'] for item in bill_items)
-    total_paid = sum(p.amount for p in payments)
-    total_pending = sum(item['amount'] for item in bill_items if item['status'] == 'Pending')
-    
-    context = {
+    # Bills from OPD fees and IPD stays, matched against this patient's payments
+    context = patient_bill_summary(patient)
+    context.update({
         'patient': patient,
-        'bill_items': bill_items,
-        'payments': payments,
-        'total_billed': total_billed,
-        'total_paid': total_paid,
-        'total_pending': total_pending,
         'RAZORPAY_KEY_ID': settings.RAZORPAY_KEY_ID,
-    }
+    })
     return render(request, "myapp/patient/bills.html", context)
 
 
@@ -2047,212 +1814,28 @@ def download_receipt(request, payment_id):
     if request.user.user_type != 'patient':
         return redirect('login')
         
-    payment = get_object_or_404(Payment, id=payment_id)
+    payment = get_object_or_404(Payment.objects.select_related('patient'), id=payment_id)
     # Ensure patient owns this payment
     if payment.patient != request.user.patient_profile:
         return redirect('patient_bills')
 
-    from django.http import HttpResponse
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-    from io import BytesIO
-    from num2words import num2words # You might need to install this or implement a helper, I'll use a simple fallback if not available
-
-    # Fallback for num2words if not installed, but for now assuming we can't install new packages easily, I will omit or use a simple placeholder.
-    # Ideally: pip install num2words
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30, title=f"Receipt #{payment.id}")
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # --- Header ---
-    # Hospital Name and Logo (if available) -> Using Text for now
-    header_style = ParagraphStyle('Header', parent=styles['Heading1'], fontSize=20, textColor=colors.HexColor('#2E86C1'), alignment=TA_CENTER)
-    address_style = ParagraphStyle('Address', parent=styles['Normal'], fontSize=10, alignment=TA_CENTER)
-    
-    elements.append(Paragraph("Sanjeevan Health Care", header_style))
-    elements.append(Paragraph("123 Medical Plaza, Health City, Gujarat, India - 380001", address_style))
-    elements.append(Paragraph("Phone: +91 1234567890 | Email: healthcaresanjeevani433@gmail.com", address_style))
-    elements.append(Spacer(1, 20))
-    
-    # --- Title ---
-    title_style = ParagraphStyle('Title', parent=styles['Heading2'], fontSize=16, alignment=TA_CENTER, textColor=colors.black, spaceAfter=20)
-    elements.append(Paragraph("PAYMENT RECEIPT / TAX INVOICE", title_style))
-    elements.append(Spacer(1, 10))
-
-    # --- Customer and Invoice Details (Two Columns) ---
-    # Left Column: Patient Details
-    patient_info = [
-        [Paragraph("<b>BILLED TO:</b>", styles['Normal'])],
-        [Paragraph(f"<b>Name:</b> {payment.patient.name}", styles['Normal'])],
-        [Paragraph(f"<b>Address:</b> {payment.patient.address or 'N/A'}", styles['Normal'])],
-        [Paragraph(f"<b>Phone:</b> {payment.patient.phone}", styles['Normal'])],
-        [Paragraph(f"<b>Email:</b> {payment.patient.email}", styles['Normal'])]
-    ]
-    
-    # Right Column: Invoice Details
-    invoice_info = [
-        [Paragraph(f"<b>Receipt No:</b> #{payment.id:05d}", styles['Normal'])],
-        [Paragraph(f"<b>Date:</b> {payment.payment_date.strftime('%d-%b-%Y')}", styles['Normal'])],
-        [Paragraph(f"<b>Payment Mode:</b> {payment.payment_method}", styles['Normal'])],
-        [Paragraph(f"<b>Transaction ID:</b> {payment.transaction_id}", styles['Normal'])],
-        [Paragraph(f"<b>Status:</b> PAID", styles['Normal'])]
-    ]
-
-    info_table_data = [[Table(patient_info, colWidths=[2.5*inch]), Table(invoice_info, colWidths=[2.5*inch])]]
-    info_table = Table(info_table_data, colWidths=[3.5*inch, 3.5*inch])
-    info_table.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LEFTPADDING', (0,0), (-1,-1), 0),
-        ('RIGHTPADDING', (0,0), (-1,-1), 0),
-    ]))
-    elements.append(info_table)
-    elements.append(Spacer(1, 20))
-
-    # --- Items Table ---
-    # Columns: Sl No, Description, Rate, Qty, Tax, Amount
-    table_data = [
-        ['Sr.', 'Description', 'Qty', 'Rate', 'Tax', 'Total']
-    ]
-    
-    # Since Payment model doesn't have individual items linked directly in a granular way for this receipt generation (it's a lump sum usually),
-    # we will use the description.
-    # If we had a related 'PaymentItem' model, we would iterate it.
-    # For now, treating the whole payment as one line item.
-    
-    table_data.append([
-        '1',
-        Paragraph(payment.description or "Medical Services / Hospital Bill", styles['Normal']),
-        '1',
-        f"{payment.amount}",
-        '0.00',
-        f"{payment.amount}"
-    ])
-    
-    # Add empty rows to fill space if needed, or just totals
-    
-    # Totals Row
-    table_data.append(['', '', '', '', 'Total', f"{payment.amount}"])
-
-    col_widths = [0.5*inch, 3*inch, 0.6*inch, 1*inch, 0.8*inch, 1.2*inch]
-    item_table = Table(table_data, colWidths=col_widths)
-    
-    item_table_style = TableStyle([
-        # Header
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f2f2f2')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('TOPPADDING', (0, 0), (-1, 0), 10),
-        ('GRID', (0, 0), (-1, -2), 0.5, colors.grey), # Grid for items
-        
-        # Content Alignment
-        ('ALIGN', (1, 1), (1, -1), 'LEFT'), # Description Left
-        ('ALIGN', (-1, 1), (-1, -1), 'RIGHT'), # Amounts Right
-        ('ALIGN', (-3, 1), (-3, -1), 'RIGHT'), # Rate Right
-        
-        # Total Row
-        ('LINEABOVE', (4, -1), (-1, -1), 1, colors.black),
-        ('FONTNAME', (4, -1), (-1, -1), 'Helvetica-Bold'),
-        ('BACKGROUND', (4, -1), (-1, -1), colors.HexColor('#f2f2f2')),
-    ])
-    item_table.setStyle(item_table_style)
-    elements.append(item_table)
-    elements.append(Spacer(1, 20))
-
-    # --- Total in Words (Static/Placeholder if library missing) ---
-    amount_text = f"Rs. {payment.amount} ONLY"
-    elements.append(Paragraph(f"<b>Total in words:</b> {amount_text}", styles['Normal']))
-    elements.append(Spacer(1, 20))
-
-    # --- Bank Details (Static) ---
-    bank_info = [
-        [Paragraph("<b>Bank Details:</b>", styles['Normal'])],
-        [Paragraph("Bank Name: HDFC Bank", styles['Normal'])],
-        [Paragraph("Account No: 1234567890", styles['Normal'])],
-        [Paragraph("IFSC Code: HDFC0001234", styles['Normal'])],
-        [Paragraph("Branch: Health City", styles['Normal'])]
-    ]
-    
-    # Signature box
-    signature_image_path = os.path.join(settings.BASE_DIR, 'myapp', 'static', 'images', 'signature.png')
-    if os.path.exists(signature_image_path):
-        signature = RLImage(signature_image_path, width=1.5*inch, height=0.5*inch)
-        signature_data = [
-            [signature],
-            [Paragraph("<b>Authorized Signatory</b>", styles['Normal'])]
-        ]
-    else:
-        signature_data = [
-            [Spacer(1, 0.5*inch)],
-            [Paragraph("<b>Authorized Signatory</b>", styles['Normal'])]
-        ]
-    
-    footer_table_data = [[Table(bank_info), Table(signature_data, colWidths=[2.5*inch])]]
-    footer_table = Table(footer_table_data, colWidths=[3.5*inch, 3.5*inch])
-    footer_table.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('ALIGN', (1,0), (1,0), 'RIGHT'),
-    ]))
-    elements.append(footer_table)
-    
-    elements.append(Spacer(1, 30))
-    
-    # --- Terms ---
-    # --- Terms ---
-    elements.append(Paragraph("<b>Terms and Conditions:</b>", styles['Normal']))
-    terms = [
-        "1. This receipt is valid as proof of payment only.",
-        "2. Consultation fees are non-refundable once the service is provided.",
-        "3. Medicines, tests, and services once billed will not be taken back or exchanged.",
-        "4. Any dispute shall be subject to Hospital Jurisdiction only.",
-        "5. This is a computer-generated receipt and does not require a physical signature.",
-        "6. For insurance claims, please submit this receipt along with the prescription/report.",
-        "7. Hospital is not responsible for loss of this receipt after issuance."
-    ]
-    for term in terms:
-        elements.append(Paragraph(term, styles['Normal']))
-
-    # --- Paid Stamp Linker ---
-    def add_stamp(canvas, doc):
-        canvas.saveState()
-        canvas.setStrokeColor(colors.green)
-        canvas.setFillColor(colors.green)
-        canvas.setLineWidth(3)
-        
-        # Translate to bottom right area usually, or near total
-        # x, y coordinates - trial and error or calculated
-        # A4 width ~ 595, height ~ 842. 
-        # Let's put it roughly middle-right
-        canvas.translate(400, 500) 
-        canvas.rotate(30)
-        
-        # Draw Box
-        canvas.roundRect(-50, -20, 100, 40, 4, stroke=1, fill=0)
-        
-        # Draw Text
-        canvas.setFont('Helvetica-Bold', 20)
-        canvas.drawCentredString(0, -7, "PAID")
-        
-        canvas.restoreState()
-
-    # Build
-    doc.build(elements, onFirstPage=add_stamp, onLaterPages=add_stamp)
-    
-    pdf = buffer.getvalue()
-    buffer.close()
-    
-    response = HttpResponse(content_type='application/pdf')
-    # Use 'inline' to view in browser, 'attachment' to force download
+    from django.http import FileResponse
+    from django.utils.cache import get_conditional_response, patch_cache_control
+
+    # The URL stays the same when a printed field changes, so the browser must
+    # revalidate every time; an unchanged receipt costs a digest and a 304
+    digest = receipt_digest(payment)
+    etag = f'"{digest}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        patch_cache_control(not_modified, private=True, no_cache=True)
+        return not_modified
+    
+    response = FileResponse(open(cached_receipt(payment, digest), 'rb'), content_type='application/pdf')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
     response['Content-Disposition'] = f'inline; filename="Receipt_{payment.id}.pdf"'
-    response.write(pdf)
     return response
 
 @login_required
@@ -2382,9 +1965,6 @@ def doctor_appointments(request):
         return redirect('login')
     doctor = request.user.doctor_profile
     
-    # All appointments (future and past)
-    appointments = OPDAppointment.objects.filter(doctor=doctor).order_by('-appointment_date')
-    
     if request.method == 'POST':
         appt_id = request.POST.get('appointment_id')
         action = request.POST.get('action')
@@ -2401,6 +1981,9 @@ def doctor_appointments(request):
             
         return redirect('doctor_appointments')
     
+    # All appointments (future and past), one page at a time
+    appointments = paginate_keyset(request, for_view('doctor_appointments', OPDAppointment.objects.filter(doctor=doctor)), APPOINTMENT_ORDERING)
+    
     return render(request, 'myapp/doctor/appointments.html', {'appointments': appointments, 'doctor': doctor})
 
 @login_required
@@ -2409,7 +1992,7 @@ def doctor_prescriptions(request):
         return redirect('login')
     doctor = request.user.doctor_profile
     
-    prescriptions = Prescription.objects.filter(doctor=doctor).order_by('-created_at')
+    prescriptions = for_view('doctor_prescriptions', Prescription.objects.filter(doctor=doctor)).order_by('-created_at')
     
     if request.method == 'POST':
         patient_id = request.POST.get('patient')
@@ -2430,8 +2013,7 @@ def doctor_prescriptions(request):
         )
         return redirect('doctor_prescriptions')
 
-    patients = Patient.objects.all() # For dropdown
-    patients = Patient.objects.all() # For dropdown
+    patients = for_view('doctor_prescriptions', Patient.objects.all()) # For dropdown
     return render(request, 'myapp/doctor/prescriptions.html', {'prescriptions': prescriptions, 'doctor': doctor, 'patients': patients})
 
 @login_required
@@ -2731,6 +2313,9 @@ def chat_api(request):
 
 # ============ BED MANAGEMENT VIEWS ============
 
+BED_LIST_FORECAST_DAYS = 7
+
+
 @login_required
 def bed_list(request):
     """List all beds (common for Admin and Receptionist)"""
@@ -2752,8 +2337,12 @@ def bed_list(request):
     if status:
         beds = beds.filter(status=status)
 
+    forecast = get_bed_forecast(BED_LIST_FORECAST_DAYS)
     return render(request, "myapp/beds/bed_list.html", {
         'beds': beds,
+        'wards': ward_availability(),
+        'forecast': forecast,
+        'forecast_days': [date.fromisoformat(day) for day in forecast['dates']],
         'base_template': base_template,
         'ward_types': Bed.WARD_CHOICES,
         'status_choices': Bed.STATUS_CHOICES,
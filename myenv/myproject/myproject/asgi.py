@@ -3,6 +3,11 @@ ASGI config for myproject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live statistics stream (Server-Sent Events, see myapp/live.py) must be
+served through this application, e.g.:
+
+    gunicorn myproject.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
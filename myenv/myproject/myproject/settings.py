@@ -84,6 +84,43 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared by every gunicorn worker: Redis when REDIS_URL is set, otherwise a
+# file-based cache on local disk (all workers of one instance see the same entries).
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / 'cache')),
+        }
+    }
+
+# Where login OTPs are kept until verified: 'cache' (no database writes) or 'db'.
+# The cache store needs an atomic incr() for its attempt limit, which the
+# file-based cache does not have, so it is only the default with Redis.
+# render.yaml provisions Redis and sets REDIS_URL on every service, so
+# production logins use the cache store; local runs without it use 'db'.
+OTP_STORE = os.environ.get('OTP_STORE', 'cache' if os.environ.get('REDIS_URL') else 'db')
+
+# Seconds the admin dashboard stats payload is reused before recomputing
+DASHBOARD_STATS_TTL = 15
+
+# Rendered payment receipts, reused until a field on the receipt changes.
+# Least recently downloaded files are evicted past the size limit.
+RECEIPT_CACHE_DIR = os.environ.get('RECEIPT_CACHE_DIR', str(BASE_DIR / 'cache' / 'receipts'))
+RECEIPT_CACHE_MAX_BYTES = int(os.environ.get('RECEIPT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# Processes rendering receipts for a bulk ZIP export
+RECEIPT_EXPORT_PROCESSES = int(os.environ.get('RECEIPT_EXPORT_PROCESSES', 2))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -134,18 +171,41 @@ AUTH_USER_MODEL = 'myapp.CustomUser'
 # Login URL
 LOGIN_URL = '/login/'
 
+# Logging: PDF render timings (myapp.pdf) and outbox delivery (myapp.outbox)
+# go to the console, i.e. the Render logs
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'myapp.pdf': {
+            'handlers': ['console'],
+            'level': os.environ.get('PDF_LOG_LEVEL', 'INFO'),
+        },
+        'myapp.outbox': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
 
 
 # Email Configuration for OTP
 # Email Configuration (SMTP)
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend' 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+# Overridable so the outbox worker can be pointed at a local SMTP server
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True') == 'True'
+# Seconds before a stalled SMTP server fails the batch, so it can be retried
+EMAIL_TIMEOUT = 20
 # REPLACE WITH YOUR ACTUAL CREDENTIALS
-EMAIL_HOST_USER = 'healthcaresanjeevani433@gmail.com' 
-EMAIL_HOST_PASSWORD = 'gvvp teip evea szdr' # IMPORTANT: Must be a Google App Password, not your login password
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', 'healthcaresanjeevani433@gmail.com')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', 'gvvp teip evea szdr') # IMPORTANT: Must be a Google App Password, not your login password
 
 # Razorpay Settings
 RAZORPAY_KEY_ID = 'rzp_test_S7dpbztOktGIVm'  # Replace with actual Key ID
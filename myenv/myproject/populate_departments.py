@@ -25,14 +25,15 @@ departments_data = [
     ("Oncology", "Cancer treatment"),
 ]
 
-for name, description in departments_data:
-    dept, created = Department.objects.get_or_create(
-        name=name, 
-        defaults={'description': description}
-    )
-    if created:
-        print(f"Created: {name}")
-    else:
-        print(f"Already exists: {name}")
+# One query for the names already present, one INSERT for the rest
+existing = set(Department.objects.filter(
+    name__in=[name for name, _ in departments_data]
+).values_list('name', flat=True))
+missing = [
+    Department(name=name, description=description)
+    for name, description in departments_data if name not in existing
+]
+Department.objects.bulk_create(missing)
 
+print(f"Created {len(missing)} departments, {len(existing)} already existed.")
 print("Departments population complete.")
@@ -7,7 +7,7 @@ sys.path.append(os.getcwd())
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 django.setup()
 
-from myapp.models import Bed
+from myapp.beds import provision_beds
 
 def populate_beds():
     ward_types = [
@@ -27,35 +27,16 @@ def populate_beds():
     ]
 
     print("Populating beds with 10 of each type...")
-    
-    total_count = 0
-    for ward, price in ward_types:
-        print(f"Processing {ward}...")
-        created_count = 0
-        
-        # Determine prefix for bed numbers e.g., GEN, ICU
-        prefix = ward[:3].upper()
-        
-        for i in range(1, 11): # Loop 1 to 10
-            # Format bed number e.g., GEN-01, ICU-10
-            bed_number = f"{prefix}-{str(i).zfill(2)}"
-            
-            # Check if this specific bed number exists
-            if not Bed.objects.filter(bed_number=bed_number).exists():
-                Bed.objects.create(
-                    ward_type=ward,
-                    bed_number=bed_number,
-                    daily_charge=price,
-                    status='Available'
-                )
-                print(f"  Created {bed_number}")
-                created_count += 1
-                total_count += 1
-        
-        if created_count == 0:
-            print(f"  All 10 beds for {ward} already exist (or collisions prevented creation).")
-            
-    print(f"Done! Created {total_count} new beds.")
+
+    # Bed numbers like GEN-01 .. GEN-10, ICU-01 .. ICU-10; existing beds are kept
+    plan = provision_beds([
+        {'ward_type': ward, 'count': 10, 'daily_charge': price}
+        for ward, price in ward_types
+    ])
+    for bed_number, current_ward, ward in plan['conflicts']:
+        print(f"  {bed_number} already belongs to {current_ward}, skipped for {ward}")
+
+    print(f"Done! Created {len(plan['create'])} new beds, repriced {len(plan['reprice'])}.")
 
 if __name__ == '__main__':
     populate_beds()
@@ -4,32 +4,21 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 django.setup()
 
-from myapp.models import Bed, Department
+from myapp.beds import provision_beds
 
 def seed_beds():
     print("Seeding Beds...")
-    
-    # Check if beds exist
-    if Bed.objects.exists():
-        print("Beds already exist. Skipping.")
-        return
 
+    # Safe to re-run: only missing bed numbers are created
     beds_data = [
-        {'ward': 'General Ward', 'prefix': 'GEN', 'count': 10, 'charge': 500},
-        {'ward': 'Private Room', 'prefix': 'PVT', 'count': 5, 'charge': 2000},
-        {'ward': 'ICU', 'prefix': 'ICU', 'count': 3, 'charge': 5000},
+        {'ward_type': 'General', 'prefix': 'GEN', 'count': 10, 'daily_charge': 500, 'digits': 3},
+        {'ward_type': 'Private', 'prefix': 'PVT', 'count': 5, 'daily_charge': 2000, 'digits': 3},
+        {'ward_type': 'ICU', 'prefix': 'ICU', 'count': 3, 'daily_charge': 5000, 'digits': 3},
     ]
 
-    for data in beds_data:
-        for i in range(1, data['count'] + 1):
-            bed_no = f"{data['prefix']}-{i:03d}"
-            Bed.objects.create(
-                ward_type=data['ward'],
-                bed_number=bed_no,
-                daily_charge=data['charge'],
-                status='Available'
-            )
-            print(f"Created {bed_no}")
+    plan = provision_beds(beds_data)
+    print(f"Created {len(plan['create'])} beds, repriced {len(plan['reprice'])}, "
+          f"{plan['unchanged']} already in place.")
 
     print("Seeding Complete.")
 